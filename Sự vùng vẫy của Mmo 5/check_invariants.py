@@ -0,0 +1,150 @@
+# check_invariants.py
+#
+# Kiểm tra các bất biến của những thao tác cơ bản đã được tối ưu, trên lời giải ban đầu của
+# một instance tổng hợp (cùng instance với run_microbenchmarks.py):
+#   - SERoute.remove_customers (xóa theo lô) cho cùng kết quả với remove_customer gọi tuần tự:
+#     nodes_id, tổng quãng đường/thời gian/tải, zobrist hash (của SE và FE route) và lịch trình.
+#   - ChangeContext.rollback (UNDO_LOG và MEMENTO) khôi phục đúng lời giải sau một nước đi
+#     destroy + repair: fingerprint, chi phí, customer map, danh sách khách chưa phục vụ và
+#     thứ tự các route trong se_routes/fe_routes.
+# Trả về mã thoát 1 nếu có bất biến bị vi phạm.
+#
+#   python check_invariants.py
+#   python check_invariants.py --size 200 --trials 500
+
+import io
+import os
+import sys
+import math
+import argparse
+import contextlib
+from typing import Callable, Dict, List
+
+from src import config
+from src.core.problem_parser import ProblemInstance
+from src.core.data_structures import SERoute, VRP2E_State
+from src.core.transaction import ChangeContext
+from src.algorithm.solution_generator import create_integrated_initial_solution
+from src.algorithm.lns.destroy_operators import random_removal, shaw_removal, route_removal, worst_cost_removal
+from src.algorithm.lns.repair_operators import greedy_repair, regret_insertion
+from src.utils.rng import make_rng
+from run_benchmark import generate_benchmark_instance
+
+# Số khách mặc định của instance (nhỏ hơn MICROBENCH_INSTANCE_SIZE để regret_insertion chạy nhanh)
+DEFAULT_INSTANCE_SIZE = 100
+
+_SE_TOTALS = ('total_dist', 'total_travel_time', 'total_load_pickup', 'total_load_delivery')
+_SE_SCHEDULE = ('service_start_times', 'waiting_times', 'forward_time_slacks')
+
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+def _se_route_snapshot(se_route: SERoute) -> Dict:
+    snapshot = {name: getattr(se_route, name) for name in _SE_TOTALS}
+    snapshot.update({name: dict(getattr(se_route, name)) for name in _SE_SCHEDULE})
+    snapshot.update(nodes_id=list(se_route.nodes_id), zobrist_hash=se_route.zobrist_hash,
+                    fe_hashes=sorted(fe.zobrist_hash for fe in se_route.serving_fe_routes))
+    return snapshot
+
+def compare_se_route_snapshots(batch: Dict, sequential: Dict) -> List[str]:
+    """Các điểm khác nhau giữa hai ảnh chụp SE route (rỗng nếu giống nhau)."""
+    diffs = []
+    for name in ('nodes_id', 'zobrist_hash', 'fe_hashes'):
+        if batch[name] != sequential[name]: diffs.append(f"{name} {batch[name]} != {sequential[name]}")
+    for name in _SE_TOTALS:
+        if not _close(batch[name], sequential[name]): diffs.append(f"{name} {batch[name]} != {sequential[name]}")
+    for name in _SE_SCHEDULE:
+        a, b = batch[name], sequential[name]
+        if a.keys() != b.keys() or any(not _close(a[k], b[k]) for k in a): diffs.append(name)
+    return diffs
+
+def check_batch_removal(state: VRP2E_State, trials: int, seed: int) -> List[str]:
+    """
+    SERoute.remove_customers trên các tập khách ngẫu nhiên so với remove_customer tuần tự.
+    Cả hai cách xóa chạy trên cùng route trong một giao dịch UNDO_LOG và được hoàn tác sau khi chụp.
+    """
+    rng = make_rng(seed)
+    solution = state.solution
+    route_indices = [k for k, se_route in enumerate(solution.se_routes) if se_route.num_customers > 0]
+    failures = []
+    for trial in range(trials):
+        se_route = solution.se_routes[route_indices[int(rng.integers(len(route_indices)))]]
+        customer_ids = se_route.nodes_id[1:-1]
+        size = int(rng.integers(1, len(customer_ids) + 1))
+        subset = [customer_ids[j] for j in rng.choice(len(customer_ids), size, replace=False).tolist()]
+        with ChangeContext(solution, "UNDO_LOG") as context:
+            se_route.remove_customers(set(subset))
+            batch = _se_route_snapshot(se_route)
+            context.rollback()
+        with ChangeContext(solution, "UNDO_LOG") as context:
+            for cust_id in subset: se_route.remove_customer(solution.problem.node_objects[cust_id])
+            sequential = _se_route_snapshot(se_route)
+            context.rollback()
+        diffs = compare_se_route_snapshots(batch, sequential)
+        if diffs: failures.append(f"trial {trial} (remove {subset} from {customer_ids}): " + "; ".join(diffs))
+    return failures
+
+def _solution_snapshot(state: VRP2E_State) -> Dict:
+    solution = state.solution
+    return {'fingerprint': solution.fingerprint(), 'cost': state.cost,
+            'customer_map': {cust_id: id(se_route) for cust_id, se_route in solution.customer_to_se_route_map.items()},
+            'unserved': [c.id for c in solution.unserved_customers],
+            'route_order': ([id(r) for r in solution.se_routes], [id(r) for r in solution.fe_routes])}
+
+def check_rollback(state: VRP2E_State, mode: str, trials: int, seed: int,
+                   destroy_operators: List[Callable], repair_operators: List[Callable]) -> List[str]:
+    """Một nước đi destroy + repair rồi ChangeContext.rollback phải trả lại đúng lời giải ban đầu."""
+    rng = make_rng(seed)
+    solution = state.solution
+    num_customers = len(solution.customer_to_se_route_map)
+    failures = []
+    for trial in range(trials):
+        destroy_op = destroy_operators[int(rng.integers(len(destroy_operators)))]
+        repair_op = repair_operators[int(rng.integers(len(repair_operators)))]
+        q = max(2, int(num_customers * rng.uniform(*config.Q_SMALL_RANGE)))
+        before = _solution_snapshot(state)
+        with ChangeContext(solution, mode) as context:
+            repair_op(solution, context, destroy_op(solution, context, q, rng=rng), rng=rng)
+            context.rollback()
+        after = _solution_snapshot(state)
+        diffs = [name for name in before if (not _close(before[name], after[name]) if name == 'cost' else before[name] != after[name])]
+        if diffs: failures.append(f"trial {trial} ({destroy_op.__name__} + {repair_op.__name__}, q={q}): " + ", ".join(diffs))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check invariants of batch removal and transaction rollback.")
+    parser.add_argument('--size', type=int, default=DEFAULT_INSTANCE_SIZE, help="Number of customers of the instance.")
+    parser.add_argument('--seed', type=int, default=config.RANDOM_SEED, help="Seed for instance generation and the checks.")
+    parser.add_argument('--trials', type=int, default=100, help="Random cases per check.")
+    args = parser.parse_args()
+
+    instance_dir = os.path.join(config.BENCHMARK_DIR, "instances")
+    os.makedirs(instance_dir, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        instance_path = generate_benchmark_instance(args.size, args.seed, instance_dir)
+        problem = ProblemInstance(file_path=instance_path, vehicle_speed=config.BENCHMARK_VEHICLE_SPEED)
+        state = create_integrated_initial_solution(problem, rng=make_rng(args.seed))
+
+    checks = [("SERoute.remove_customers == sequential remove_customer",
+               lambda: check_batch_removal(state, args.trials, args.seed))]
+    for mode in ("UNDO_LOG", "MEMENTO"):
+        checks.append((f"ChangeContext.rollback ({mode}) restores the solution",
+                       lambda mode=mode: check_rollback(state, mode, args.trials, args.seed,
+                                                        [random_removal, shaw_removal, route_removal, worst_cost_removal],
+                                                        [greedy_repair, regret_insertion])))
+
+    print(f"INVARIANT CHECKS | instance: {instance_path} | trials per check: {args.trials}")
+    failed = 0
+    for name, check in checks:
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = check()
+        print(f"  [{'FAIL' if failures else 'OK'}] {name}")
+        for failure in failures[:10]: print(f"      {failure}")
+        if len(failures) > 10: print(f"      ... {len(failures) - 10} more")
+        failed += bool(failures)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
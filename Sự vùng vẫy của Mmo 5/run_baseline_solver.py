@@ -5,7 +5,6 @@ import os
 import sys
 import shutil
 import datetime
-import random
 import matplotlib.pyplot as plt
 
 # --- Import từ cấu trúc src mới ---
@@ -13,7 +12,12 @@ from src import config
 from src.core.problem_parser import ProblemInstance
 from src.algorithm.solution_generator import generate_initial_solution
 from src.algorithm.lns_algorithm import run_alns_phase
+from src.algorithm.parallel_alns import run_parallel_alns, resolve_num_workers
 from src.utils.logger import Logger
+from src.utils.history import save_history
+from src.utils.profiler import enable_profiling, is_profiling_enabled, write_profile_report
+from src.utils.progress import create_progress_sink
+from src.utils.rng import make_rng
 from src.utils.solution_analyzer import print_solution_details, validate_solution_feasibility
 from src.utils.plotter import plot_solution_visualization, plot_alns_history
 
@@ -60,6 +64,7 @@ def main():
     log_file_path = os.path.join(run_dir, "log.txt")
     sys.stdout = Logger(log_file_path, sys.stdout)
     sys.stderr = Logger(log_file_path, sys.stderr)
+    if config.PROFILE_HOT_PATHS: enable_profiling()
 
     # Sao chép file config để lưu lại cấu hình đã chạy
     try:
@@ -68,7 +73,7 @@ def main():
         print("Warning: Could not find 'src/config.py' to create a snapshot.")
 
     start_time = time.time()
-    random.seed(config.RANDOM_SEED)
+    rng = make_rng(config.RANDOM_SEED)
 
     # In thông tin cấu hình ban đầu
     print("="*80)
@@ -106,17 +111,31 @@ def main():
     initial_state = generate_initial_solution(
         problem, 
         lns_iterations=config.LNS_INITIAL_ITERATIONS, 
-        q_percentage=config.Q_PERCENTAGE_INITIAL
+        q_percentage=config.Q_PERCENTAGE_INITIAL,
+        rng=rng
     )
     
     # Giai đoạn 2: Chạy ALNS
     print("\n" + "#"*70 + "\n### STAGE 2: ADAPTIVE LARGE NEIGHBORHOOD SEARCH ###\n" + "#"*70)
-    best_state, (run_history, op_history) = run_alns_phase(
-        initial_state=initial_state,
-        iterations=config.ALNS_MAIN_ITERATIONS,
-        destroy_operators=destroy_operators_map,
-        repair_operators=repair_operators_map
-    )
+    if resolve_num_workers() > 1:
+        best_state, (run_history, op_history) = run_parallel_alns(
+            initial_state=initial_state,
+            iterations=config.ALNS_MAIN_ITERATIONS,
+            destroy_operators=destroy_operators_map,
+            repair_operators=repair_operators_map,
+            log_dir=run_dir
+        )
+    else:
+        progress_sink = create_progress_sink(file_path=os.path.join(run_dir, "progress.bin"))
+        best_state, (run_history, op_history) = run_alns_phase(
+            initial_state=initial_state,
+            iterations=config.ALNS_MAIN_ITERATIONS,
+            destroy_operators=destroy_operators_map,
+            repair_operators=repair_operators_map,
+            progress_sink=progress_sink,
+            rng=rng
+        )
+        progress_sink.close()
     
     end_time = time.time()
     final_solution = best_state.solution
@@ -128,6 +147,15 @@ def main():
     # Kiểm tra tính khả thi của lời giải cuối cùng
     validate_solution_feasibility(final_solution)
     
+    # Lưu lịch sử ALNS dạng cột (.npz) để có thể phân tích/vẽ lại sau này (xem load_history)
+    save_history(os.path.join(run_dir, "alns_history.npz"), run_history, op_history)
+
+    # Bảng thời gian của các điểm nóng (chỉ khi bật PROFILE_HOT_PATHS); khi chạy song song,
+    # số liệu là tổng của các worker nên tỷ lệ được tính trên số worker * wall time
+    if is_profiling_enabled():
+        write_profile_report(os.path.join(run_dir, "profile.txt"), wall_time=end_time - start_time,
+                             processes=max(1, resolve_num_workers()))
+
     # Vẽ và lưu tất cả các biểu đồ
     print("\nGenerating and saving plots...")
     plot_solution_visualization(final_solution, save_dir=run_dir)
@@ -0,0 +1,252 @@
+# run_benchmark.py
+#
+# Đo hiệu năng bộ giải trên các instance tổng hợp (sinh bằng generate_cus.py với seed cố định):
+# thời gian đọc instance, thời gian tạo lời giải ban đầu (create_integrated_initial_solution),
+# số vòng lặp ALNS/giây với số vòng lặp cố định và chi phí cuối cùng. Kết quả được ghi vào
+# BENCHMARK_DIR/benchmark_<thời điểm>_<commit>.json để so sánh giữa các commit (--compare).
+#
+#   python run_benchmark.py                          # các kích thước trong config.BENCHMARK_SIZES
+#   python run_benchmark.py --sizes 100 500 --iterations 100
+#   python run_benchmark.py --compare benchmarks/benchmark_<...>.json
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+import contextlib
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# --- Import từ cấu trúc src mới ---
+from src import config
+from src.core.problem_parser import ProblemInstance
+from src.algorithm.solution_generator import create_integrated_initial_solution
+from src.algorithm.lns_algorithm import run_alns_phase
+from src.utils.progress import NullSink
+from src.utils.rng import make_rng
+
+# generate_cus.py nằm ở thư mục gốc của repo (cạnh thư mục dự án này)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import generate_cus
+
+# --- Import đầy đủ các toán tử ---
+from src.algorithm.lns.destroy_operators import (
+    random_removal, shaw_removal, worst_slack_removal,
+    worst_cost_removal, route_removal, satellite_removal,
+    least_utilized_route_removal
+)
+from src.algorithm.lns.repair_operators import (
+    greedy_repair, regret_insertion, earliest_deadline_first_insertion,
+    farthest_first_insertion, largest_first_insertion, closest_first_insertion,
+    earliest_time_window_insertion, latest_time_window_insertion,
+    latest_deadline_first_insertion
+)
+
+# Tâm khu vực sinh depot và vệ tinh (kinh độ, vĩ độ - TP.HCM, cùng múi UTM 48N với generate_cus)
+CITY_CENTER = (106.70, 10.78)
+# Vệ tinh nằm trong bán kính này (km) quanh depot
+SATELLITE_RADIUS_KM = 8.0
+# Thời điểm kết thúc ngày làm việc (phút, T=0 là 07:00) cho depot và vệ tinh
+PLANNING_HORIZON = 1440
+
+
+def _total_demand_for(num_customers: int) -> int:
+    """
+    Tổng demand cần truyền cho generate_customers_by_profiles để sinh xấp xỉ num_customers khách:
+    mỗi profile sinh khoảng (tổng demand * ratio) / demand trung bình khách hàng.
+    """
+    customers_per_demand = sum(p['ratio'] / (sum(p['demand_range']) / 2) for p in generate_cus.CUSTOMER_PROFILES.values())
+    return int(round(num_customers / customers_per_demand))
+
+def generate_benchmark_instance(num_customers: int, seed: int, output_dir: str) -> str:
+    """
+    Sinh (hoặc dùng lại nếu đã có) instance với đúng num_customers khách hàng và trả về đường dẫn file CSV.
+    Depot và vệ tinh được đặt ngẫu nhiên quanh CITY_CENTER, khách hàng được sinh theo
+    CUSTOMER_PROFILES của generate_cus.py, tọa độ được đổi sang UTM (mét).
+    Tên file chứa mọi tham số BENCHMARK_* dùng khi sinh, nên đổi config sẽ sinh instance mới
+    thay vì dùng lại file cũ.
+    """
+    file_name = (f"bench_{num_customers}_s{seed}"
+                 f"_cps{config.BENCHMARK_CUSTOMERS_PER_SATELLITE}_min{config.BENCHMARK_MIN_SATELLITES}"
+                 f"_fe{config.BENCHMARK_FE_CAPACITY}_se{config.BENCHMARK_SE_CAPACITY}.csv")
+    file_path = os.path.join(output_dir, file_name)
+    if os.path.exists(file_path): return file_path
+
+    random.seed(seed); np.random.seed(seed)
+    rng = random.Random(seed)
+    num_satellites = max(config.BENCHMARK_MIN_SATELLITES, num_customers // config.BENCHMARK_CUSTOMERS_PER_SATELLITE)
+    spread = SATELLITE_RADIUS_KM / 111.0
+
+    depot = {'Type': 0, 'X': CITY_CENTER[0], 'Y': CITY_CENTER[1], 'Service Time': 0, 'Early': 0,
+             'Latest': PLANNING_HORIZON, 'Demand': 0, 'Deadline': 0,
+             'FE Cap': config.BENCHMARK_FE_CAPACITY, 'SE Cap': config.BENCHMARK_SE_CAPACITY}
+    satellites = [{'Type': 1, 'X': CITY_CENTER[0] + rng.uniform(-spread, spread), 'Y': CITY_CENTER[1] + rng.uniform(-spread, spread),
+                   'Early': 0, 'Latest': PLANNING_HORIZON, 'Demand': 0, 'Deadline': 0}
+                  for _ in range(num_satellites)]
+
+    # Sinh dư một chút rồi lấy mẫu đúng num_customers khách (giữ tỷ lệ giữa các profile)
+    customers = generate_cus.generate_customers_by_profiles(
+        [{'X': s['X'], 'Y': s['Y']} for s in satellites], int(_total_demand_for(num_customers) * 1.05),
+        generate_cus.CUSTOMER_PROFILES, generate_cus.GLOBAL_PARAMS["distribution_radius_km"])
+    if len(customers) > num_customers:
+        keep = sorted(rng.sample(range(len(customers)), num_customers))
+        customers = [customers[k] for k in keep]
+
+    df = pd.DataFrame([depot] + satellites + customers)
+    utm_coords = df.apply(lambda row: generate_cus.convert_wgs84_to_utm(row['X'], row['Y']), axis=1)
+    df[['X', 'Y']] = pd.DataFrame(utm_coords.tolist(), index=df.index)
+    generate_cus.process_and_save_dataframe(df, output_dir, file_name)
+    return file_path
+
+
+def run_benchmark_case(instance_path: str, iterations: int, seed: int,
+                       destroy_operators: Dict, repair_operators: Dict) -> Dict:
+    """Đo một instance: đọc file, tạo lời giải ban đầu, chạy ALNS `iterations` vòng lặp."""
+    result = {'instance': os.path.basename(instance_path)}
+
+    start = time.perf_counter()
+    problem = ProblemInstance(file_path=instance_path, vehicle_speed=config.BENCHMARK_VEHICLE_SPEED)
+    result['load_time_s'] = time.perf_counter() - start
+    result['num_customers'] = len(problem.customers)
+    result['num_satellites'] = len(problem.satellites)
+
+    rng = make_rng(seed)
+    start = time.perf_counter()
+    initial_state = create_integrated_initial_solution(problem, rng=rng)
+    result['construction_time_s'] = time.perf_counter() - start
+    result['initial_cost'] = initial_state.cost
+    result['initial_unserved'] = len(initial_state.solution.unserved_customers)
+
+    start = time.perf_counter()
+    best_state, (run_history, _) = run_alns_phase(initial_state, iterations, destroy_operators, repair_operators,
+                                                  progress_sink=NullSink(), rng=rng)
+    alns_time = time.perf_counter() - start
+    completed = int(run_history.move_counts.sum())
+    result['alns_iterations'] = completed
+    result['alns_time_s'] = alns_time
+    result['iterations_per_s'] = completed / alns_time if alns_time > 0 else None
+    result['final_cost'] = best_state.cost
+    result['final_unserved'] = len(best_state.solution.unserved_customers)
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _peak_rss_mb() -> Optional[float]:
+    # Bộ nhớ đỉnh của cả tiến trình tính đến thời điểm gọi (không có trên Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def get_git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return output.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_results(results: List[Dict], baseline: Optional[List[Dict]] = None) -> str:
+    """Bảng kết quả; khi có baseline, thêm cột tỷ lệ so với baseline (cùng số khách hàng)."""
+    by_size = {row['num_customers']: row for row in (baseline or [])}
+    lines = [f"{'Customers':>9}| {'Load (s)':>9}| {'Init (s)':>9}| {'ALNS it/s':>10}| {'Final cost':>12}| {'Unserved':>8}"
+             + (f"| {'Speed vs base':>13}| {'Cost vs base':>12}" if baseline else "")]
+    for row in results:
+        it_s = row['iterations_per_s'] or 0.0
+        line = (f"{row['num_customers']:>9}| {row['load_time_s']:>9.2f}| {row['construction_time_s']:>9.2f}| "
+                f"{it_s:>10.2f}| {row['final_cost']:>12.2f}| {row['final_unserved']:>8}")
+        base = by_size.get(row['num_customers'])
+        if base is not None and base.get('iterations_per_s') and base.get('final_cost'):
+            line += f"| {it_s / base['iterations_per_s']:>12.2f}x| {row['final_cost'] / base['final_cost']:>11.3f}x"
+        elif baseline:
+            line += f"| {'-':>13}| {'-':>12}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the 2E-VRP-PDD solver on seeded synthetic instances.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(config.BENCHMARK_SIZES),
+                        help="Numbers of customers of the generated instances.")
+    parser.add_argument('--iterations', type=int, default=config.BENCHMARK_ALNS_ITERATIONS,
+                        help="Fixed number of ALNS iterations per instance.")
+    parser.add_argument('--seed', type=int, default=config.RANDOM_SEED, help="Seed for instance generation and the solver.")
+    parser.add_argument('--output', type=str, default=None, help="Path of the JSON results file.")
+    parser.add_argument('--compare', type=str, default=None, help="Previous results file to compare against.")
+    args = parser.parse_args()
+
+    # Số vòng lặp cố định: tắt các điều kiện dừng theo thời gian / không cải thiện
+    config.ALNS_TIME_LIMIT = None
+    config.ALNS_MAX_NO_IMPROVEMENT = None
+
+    destroy_operators_map = {
+        "random_removal": random_removal, "shaw_removal": shaw_removal,
+        "worst_slack_removal": worst_slack_removal, "worst_cost_removal": worst_cost_removal,
+        "route_removal": route_removal, "satellite_removal": satellite_removal,
+        "least_utilized_route_removal": least_utilized_route_removal,
+    }
+    repair_operators_map = {
+        "greedy_repair": greedy_repair, "regret_insertion": regret_insertion,
+        "earliest_deadline_first_insertion": earliest_deadline_first_insertion, "farthest_first_insertion": farthest_first_insertion,
+        "largest_first_insertion": largest_first_insertion, "closest_first_insertion": closest_first_insertion,
+        "earliest_time_window_insertion": earliest_time_window_insertion, "latest_time_window_insertion": latest_time_window_insertion,
+        "latest_deadline_first_insertion": latest_deadline_first_insertion,
+    }
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    commit = get_git_commit()
+    instance_dir = os.path.join(config.BENCHMARK_DIR, "instances")
+    os.makedirs(instance_dir, exist_ok=True)
+    base_name = f"benchmark_{timestamp}" + (f"_{commit}" if commit else "")
+    output_path = args.output or os.path.join(config.BENCHMARK_DIR, base_name + ".json")
+    log_path = os.path.splitext(output_path)[0] + ".log"
+
+    print("=" * 80)
+    print(f"BENCHMARK | commit: {commit or 'unknown'} | sizes: {args.sizes} | ALNS iterations: {args.iterations} | seed: {args.seed}")
+    print(f"Solver output is written to {log_path}")
+    print("=" * 80)
+
+    results = []
+    with open(log_path, 'w', encoding='utf-8') as solver_log:
+        for num_customers in args.sizes:
+            print(f"  {num_customers} customers ...", end=' ', flush=True)
+            with contextlib.redirect_stdout(solver_log):
+                instance_path = generate_benchmark_instance(num_customers, args.seed, instance_dir)
+                result = run_benchmark_case(instance_path, args.iterations, args.seed, destroy_operators_map, repair_operators_map)
+            results.append(result)
+            print(f"load {result['load_time_s']:.2f}s, init {result['construction_time_s']:.2f}s, "
+                  f"{result['iterations_per_s'] or 0.0:.2f} it/s, final cost {result['final_cost']:.2f}")
+
+    report = {
+        'timestamp': timestamp, 'commit': commit,
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+        'settings': {
+            'iterations': args.iterations, 'seed': args.seed, 'vehicle_speed': config.BENCHMARK_VEHICLE_SPEED,
+            'transaction_mode': config.TRANSACTION_MODE, 'time_normalized_weights': config.TIME_NORMALIZED_WEIGHTS,
+        },
+        'results': results,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        baseline = previous['results']
+        print(f"\nCompared with {args.compare} (commit {previous.get('commit') or 'unknown'}):")
+    print("\n" + format_results(results, baseline))
+    print(f"\nBenchmark results saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,13 @@ import os
 import sys
 import shutil
 import datetime
-import random
 import copy
 import math
+import numpy as np
 import pandas as pd
-from typing import List
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
 
 # --- Import từ cấu trúc src mới ---
 from src import config
@@ -17,10 +19,14 @@ from src.core.problem_parser import ProblemInstance, Customer, Depot, Satellite,
 from src.core.data_structures import Solution
 from src.algorithm.solution_generator import generate_initial_solution
 from src.algorithm.lns_algorithm import run_alns_phase
+from src.algorithm.parallel_alns import encode_solution, decode_solution, resolve_num_workers, get_mp_context
 from src.utils.logger import Logger
+from src.utils.profiler import (enable_profiling, is_profiling_enabled, reset_profiling,
+                                get_profile_stats, merge_profile_stats, write_profile_report)
 from src.utils.solution_analyzer import print_solution_details, validate_solution_feasibility
 from src.utils.plotter import plot_solution_visualization, plot_customer_clusters # <--- IMPORT MỚI
-from src.utils.solution_merger import merge_solutions
+from src.utils.solution_merger import merge_into
+from src.utils.rng import stream_seed, make_rng
 from src.algorithm.clustering.preprocessor import preprocess_and_add_effective_deadline
 from src.algorithm.clustering.dissimilarity import create_dissimilarity_matrix
 from src.algorithm.clustering.engine import analyze_k_and_suggest_optimal, run_clustering
@@ -85,6 +91,60 @@ def export_subproblem_to_csv(sub_problem: ProblemInstance, cluster_id: int, save
     df.to_csv(file_path, index=False)
 
 
+# --- ƯỚC LƯỢNG KHỐI LƯỢNG VÀ LẬP LỊCH CÁC CỤM ---
+def estimate_cluster_work(sub_problem: ProblemInstance) -> float:
+    """
+    Ước lượng khối lượng công việc ALNS của một cụm: n^CLUSTER_WORK_EXPONENT * (1 + độ chặt),
+    với độ chặt là trung bình (1 - độ rộng time window / MAX_SCHEDULING_FLEXIBILITY) của các khách hàng.
+    """
+    n = len(sub_problem.customers)
+    if n == 0: return 0.0
+    tightness = sum(1.0 - min(1.0, (c.due_time - c.ready_time) / config.MAX_SCHEDULING_FLEXIBILITY) for c in sub_problem.customers) / n
+    return (n ** config.CLUSTER_WORK_EXPONENT) * (1.0 + max(0.0, tightness))
+
+def plan_cluster_schedule(sub_problems: Dict[int, ProblemInstance]) -> List[Dict]:
+    """
+    Trả về danh sách các cụm theo thứ tự nặng trước (Longest Processing Time first) cùng
+    số vòng lặp ALNS của từng cụm. Nếu SCALE_CLUSTER_ITERATIONS bật, số vòng lặp tỉ lệ
+    nghịch với chi phí ước lượng của một vòng lặp (work / n) để các cụm kết thúc gần cùng lúc.
+    """
+    plan = [{'cluster_id': cid, 'num_customers': len(sp.customers), 'work': estimate_cluster_work(sp),
+             'iterations': config.ALNS_MAIN_ITERATIONS} for cid, sp in sub_problems.items()]
+    if config.SCALE_CLUSTER_ITERATIONS and plan:
+        per_iteration = {p['cluster_id']: p['work'] / p['num_customers'] for p in plan}
+        mean_per_iteration = sum(per_iteration.values()) / len(per_iteration)
+        low, high = config.CLUSTER_ITERATION_SCALE_BOUNDS
+        for p in plan:
+            scale = min(high, max(low, mean_per_iteration / per_iteration[p['cluster_id']]))
+            p['iterations'] = max(1, int(round(config.ALNS_MAIN_ITERATIONS * scale)))
+            p['work'] *= p['iterations'] / config.ALNS_MAIN_ITERATIONS
+    plan.sort(key=lambda p: p['work'], reverse=True)
+    return plan
+
+
+# --- GIẢI TỪNG CỤM ---
+# Mỗi tác vụ chỉ mang bài toán con của chính cụm đó (toán tử được pickle theo tên hàm),
+# nên mỗi bài toán con chỉ được gửi một lần, kể cả với start method "spawn" (Windows).
+def _solve_cluster(cluster_id: int, sub_problem: ProblemInstance, seed: np.random.SeedSequence, iterations: int,
+                   log_path: str, destroy_operators: Dict, repair_operators: Dict) -> Dict:
+    """Giải bài toán con của một cụm (output ghi vào file log riêng của cụm) và trả về bản ghi gọn của lời giải."""
+    start_time = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log_stream, contextlib.redirect_stdout(log_stream):
+        rng = make_rng(seed)
+        print("="*60 + f"\nSOLVING SUB-PROBLEM FOR CLUSTER {cluster_id} ({len(sub_problem.customers)} customers, stream {seed.spawn_key[-1]} of seed {seed.entropy})\n" + "="*60)
+        initial_state = generate_initial_solution(sub_problem, lns_iterations=config.LNS_INITIAL_ITERATIONS, q_percentage=config.Q_PERCENTAGE_INITIAL, rng=rng)
+        best_state, (_, _) = run_alns_phase(initial_state=initial_state, iterations=iterations, destroy_operators=destroy_operators, repair_operators=repair_operators, rng=rng)
+    return {'cluster_id': cluster_id, 'record': encode_solution(best_state.solution), 'cost': best_state.cost,
+            'elapsed_time': time.time() - start_time}
+
+def _solve_cluster_in_worker(*args) -> Dict:
+    """_solve_cluster trên tiến trình con, kèm số liệu profiling của riêng tác vụ này."""
+    reset_profiling()  # Tiến trình con (fork) thừa hưởng số liệu của tiến trình cha hoặc của tác vụ trước
+    result = _solve_cluster(*args)
+    result['profile'] = get_profile_stats()
+    return result
+
+
 def main():
     # --- 1. SETUP MÔI TRƯỜNG ---
     # (Giữ nguyên như phiên bản trước)
@@ -96,9 +156,9 @@ def main():
     log_file_path = os.path.join(run_dir, "log.txt")
     sys.stdout = Logger(log_file_path, sys.stdout)
     sys.stderr = Logger(log_file_path, sys.stderr)
+    if config.PROFILE_HOT_PATHS: enable_profiling()
     shutil.copy('src/config.py', os.path.join(run_dir, 'config_snapshot.py'))
     start_time = time.time()
-    random.seed(config.RANDOM_SEED)
     print("="*70 + "\nRUNNING CLUSTERED SOLVER\n" + "="*70)
 
     # --- 2. GIAI ĐOẠN PHÂN CỤM ---
@@ -123,7 +183,6 @@ def main():
         clusters[labels[i]].append(customer)
 
     # --- 3. GIAI ĐOẠN GIẢI QUYẾT TỪNG CỤM ---
-    sub_solutions = []
     destroy_operators_map = { "random_removal": random_removal, "shaw_removal": shaw_removal, "worst_slack_removal": worst_slack_removal, "worst_cost_removal": worst_cost_removal, "route_removal": route_removal, "satellite_removal": satellite_removal, "least_utilized_route_removal": least_utilized_route_removal }
     repair_operators_map = { "greedy_repair": greedy_repair, "regret_insertion": regret_insertion, "earliest_deadline_first_insertion": earliest_deadline_first_insertion, "farthest_first_insertion": farthest_first_insertion, "largest_first_insertion": largest_first_insertion, "closest_first_insertion": closest_first_insertion, "earliest_time_window_insertion": earliest_time_window_insertion, "latest_time_window_insertion": latest_time_window_insertion, "latest_deadline_first_insertion": latest_deadline_first_insertion }
     
@@ -131,34 +190,60 @@ def main():
     sub_solutions_plots_dir = os.path.join(run_dir, "subproblem_solutions")
     os.makedirs(sub_solutions_plots_dir, exist_ok=True)
 
+    # Dựng trước tất cả bài toán con; mỗi cụm được giải (trên tiến trình con nếu có nhiều worker) với
+    # luồng ngẫu nhiên riêng stream_seed(RANDOM_SEED, cluster_id), log riêng tại cluster_logs/cluster_<id>.log.
+    sub_problems = {}
     for cluster_id, customer_list in clusters.items():
         if not customer_list: continue
-            
-        print("\n" + "="*60 + f"\nSOLVING SUB-PROBLEM FOR CLUSTER {cluster_id} ({len(customer_list)} customers)\n" + "="*60)
-        sub_problem = create_subproblem_instance(full_problem, customer_list)
+        sub_problems[cluster_id] = create_subproblem_instance(full_problem, customer_list)
         
         # === NÂNG CẤP: XUẤT FILE CSV CHO BÀI TOÁN CON ===
-        export_subproblem_to_csv(sub_problem, cluster_id, save_dir=run_dir)
-        
-        initial_state = generate_initial_solution(sub_problem, lns_iterations=config.LNS_INITIAL_ITERATIONS, q_percentage=config.Q_PERCENTAGE_INITIAL)
-        best_state, (_, _) = run_alns_phase(initial_state=initial_state, iterations=config.ALNS_MAIN_ITERATIONS, destroy_operators=destroy_operators_map, repair_operators=repair_operators_map)
-        
-        sub_solution = best_state.solution
+        export_subproblem_to_csv(sub_problems[cluster_id], cluster_id, save_dir=run_dir)
+
+    cluster_logs_dir = os.path.join(run_dir, "cluster_logs")
+    os.makedirs(cluster_logs_dir, exist_ok=True)
+    num_workers = min(resolve_num_workers(), len(sub_problems)) or 1
+    print(f"\nSolving {len(sub_problems)} sub-problems on {num_workers} worker process(es) (largest estimated work first)...")
+    schedule = plan_cluster_schedule(sub_problems)
+    for p in schedule:
+        print(f"  Cluster {p['cluster_id']:>2}: {p['num_customers']:>5} customers | est. work {p['work']:>12.1f} | iterations {p['iterations']}")
+
+    # Lời giải của từng cụm được hợp nhất ngay khi có kết quả
+    merged_solution = Solution(full_problem)
+
+    def merge_cluster_result(result: Dict):
+        cluster_id = result['cluster_id']
+        if 'profile' in result and is_profiling_enabled(): merge_profile_stats(result['profile'])
+        sub_solution = decode_solution(result['record'], sub_problems[cluster_id]).solution
         
         # === NÂNG CẤP: TẠO TIÊU ĐỀ VÀ VẼ LỜI GIẢI CỦA CỤM ===
         sub_solution.custom_title = f"Solution for Cluster {cluster_id} (Cost: {sub_solution.get_objective_cost():.2f})"
         plot_solution_visualization(sub_solution, save_dir=sub_solutions_plots_dir)
         
-        print(f"--- Finished solving for cluster {cluster_id}. Sub-problem cost: {best_state.cost:.2f} ---")
-        sub_solutions.append(sub_solution)
+        print(f"--- Finished solving for cluster {cluster_id} in {result['elapsed_time']:.2f}s. Sub-problem cost: {result['cost']:.2f} ---")
+        merge_into(merged_solution, sub_solution)
+
+    cluster_tasks = [(p['cluster_id'], sub_problems[p['cluster_id']], stream_seed(config.RANDOM_SEED, p['cluster_id']), p['iterations'],
+                      os.path.join(cluster_logs_dir, f"cluster_{p['cluster_id']}.log"), destroy_operators_map, repair_operators_map)
+                     for p in schedule]
+    if num_workers == 1:
+        # Một worker: giải ngay trong tiến trình này, không tạo pool và không pickle bài toán con
+        for task in cluster_tasks: merge_cluster_result(_solve_cluster(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=get_mp_context()) as executor:
+            # Executor xử lý hàng đợi theo thứ tự nộp, nên nộp cụm nặng trước là lập lịch LPT
+            futures = [executor.submit(_solve_cluster_in_worker, *task) for task in cluster_tasks]
+            for future in as_completed(futures): merge_cluster_result(future.result())
 
     # --- 4. GIAI ĐOẠN HỢP NHẤT VÀ BÁO CÁO ---
-    merged_solution = merge_solutions(sub_solutions, full_problem)
+    print(f"\n--- Merged {len(sub_problems)} sub-solutions into one final solution ---")
     end_time = time.time()
 
     print("\n" + "="*70 + "\nEVALUATING FINAL MERGED SOLUTION\n" + "="*70)
     print_solution_details(merged_solution, execution_time=end_time - start_time)
     validate_solution_feasibility(merged_solution)
+    if is_profiling_enabled():
+        write_profile_report(os.path.join(run_dir, "profile.txt"), wall_time=end_time - start_time, processes=num_workers)
     
     # === NÂNG CẤP: VẼ LỜI GIẢI TỔNG THỂ ===
     plot_solution_visualization(merged_solution, save_dir=run_dir)
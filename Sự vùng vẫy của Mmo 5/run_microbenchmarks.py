@@ -0,0 +1,253 @@
+# run_microbenchmarks.py
+#
+# Micro-benchmark cho các thao tác cơ bản của bộ giải: tìm vị trí chèn trong một SE route,
+# tính lại FE route, chèn/xóa khách trong SE route, tạo RouteMemento, ChangeContext.rollback
+# và VRP2E_State.copy. Mỗi phép đo báo cáo số lần gọi/giây, thời gian trung bình và bộ nhớ
+# cấp phát (tracemalloc) trên mỗi lần gọi. Kết quả được ghi vào
+# BENCHMARK_DIR/microbench_<thời điểm>_<commit>.json (so sánh giữa các commit bằng --compare).
+#
+#   python run_microbenchmarks.py
+#   python run_microbenchmarks.py --only rollback --compare benchmarks/microbench_<...>.json
+
+import io
+import os
+import json
+import time
+import argparse
+import datetime
+import platform
+import contextlib
+import tracemalloc
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src import config
+from src.core.problem_parser import ProblemInstance, PickupCustomer
+from src.core.data_structures import SERoute, FERoute
+from src.core.transaction import ChangeContext, RouteMemento
+from src.algorithm.solution_generator import create_integrated_initial_solution
+from src.algorithm.lns.insertion_logic import InsertionProcessor, _recalculate_fe_route_and_check_feasibility
+from src.algorithm.lns.destroy_operators import random_removal
+from src.algorithm.lns.repair_operators import greedy_repair
+from src.utils.rng import make_rng
+from run_benchmark import generate_benchmark_instance, get_git_commit
+
+# Số khách của mỗi SE route trong phép đo _recalculate_fe_route_and_check_feasibility
+CUSTOMERS_PER_SE_ROUTE = 10
+
+
+def measure(name: str, params: Dict, op: Callable, setup: Optional[Callable] = None,
+            teardown: Optional[Callable] = None) -> Dict:
+    """
+    Đo op(arg), với arg = setup() (hoặc None). setup và teardown(arg) chạy trước/sau mỗi lần
+    gọi và không được tính giờ. Chạy ít nhất MICROBENCH_MIN_OPS lần và MICROBENCH_MIN_TIME giây,
+    sau đó đo cấp phát bộ nhớ của MICROBENCH_ALLOC_SAMPLES lần gọi với tracemalloc:
+    alloc_peak_bytes là bộ nhớ cấp phát trong lúc gọi lớn nhất tại một thời điểm (gồm cả đối
+    tượng tạm), alloc_net_bytes là phần còn giữ lại sau khi gọi (ví dụ bản sao được trả về, undo log).
+    """
+    perf_counter = time.perf_counter
+    timed, ops = 0.0, 0
+    wall_start = perf_counter()
+    while ops < config.MICROBENCH_MIN_OPS or perf_counter() - wall_start < config.MICROBENCH_MIN_TIME:
+        arg = setup() if setup is not None else None
+        start = perf_counter()
+        op(arg)
+        timed += perf_counter() - start
+        if teardown is not None: teardown(arg)
+        ops += 1
+
+    # tracemalloc chỉ bật trong lúc gọi op: setup/teardown chạy với tốc độ bình thường và
+    # bộ nhớ được giải phóng nhưng cấp phát từ trước không bị tính (không có số âm).
+    peak_total, net_total = 0, 0
+    samples = config.MICROBENCH_ALLOC_SAMPLES
+    for _ in range(samples):
+        arg = setup() if setup is not None else None
+        tracemalloc.start()
+        try:
+            result = op(arg)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+        peak_total += peak; net_total += current
+        if teardown is not None: teardown(arg)
+
+    return {
+        'name': name, 'params': params, 'ops': ops,
+        'ops_per_s': ops / timed if timed > 0 else None, 'mean_us': timed / ops * 1e6,
+        'alloc_peak_bytes': peak_total / samples if samples else None,
+        'alloc_net_bytes': net_total / samples if samples else None,
+    }
+
+
+# ==============================================================================
+# DỰNG DỮ LIỆU CHO CÁC PHÉP ĐO
+# ==============================================================================
+
+def relax_constraints(problem: ProblemInstance):
+    """
+    Bỏ giới hạn tải trọng, time window và deadline của instance, để route dài tùy ý vẫn được
+    xét đầy đủ (các thao tác không dừng sớm ở vị trí/route vi phạm đầu tiên): phép đo trên
+    route dài là chi phí trường hợp xấu nhất của thao tác.
+    """
+    problem.fe_vehicle_capacity = problem.se_vehicle_capacity = float('inf')
+    for customer in problem.customers:
+        customer.due_time = float('inf')
+        if isinstance(customer, PickupCustomer): customer.deadline = float('inf')
+
+def build_se_route(problem: ProblemInstance, satellite, customers) -> SERoute:
+    route = SERoute(satellite, problem)
+    for customer in customers: route.insert_customer_at_pos(customer, len(route.nodes_id) - 1)
+    return route
+
+def nearest_customers(problem: ProblemInstance, satellite, count: int, exclude=()) -> List:
+    candidates = [c for c in problem.customers if c.id not in exclude]
+    return sorted(candidates, key=lambda c: problem.get_distance(satellite.id, c.id))[:count]
+
+
+# Các hàm bench_* trả về từng phép đo dưới dạng partial(measure, ...) chưa chạy, để main()
+# có thể bỏ qua phép đo không được chọn. Phép đo phải được chạy trước khi lấy phép đo tiếp theo.
+
+def bench_se_route_primitives(problem: ProblemInstance) -> Iterator[Callable[[], Dict]]:
+    """Các thao tác trên một SE route, theo độ dài route (instance đã relax_constraints)."""
+    processor = InsertionProcessor(problem)
+    satellite = problem.satellites[0]
+    for length in config.MICROBENCH_ROUTE_LENGTHS:
+        customers = nearest_customers(problem, satellite, length + 1)
+        route, customer = build_se_route(problem, satellite, customers[:length]), customers[length]
+        pos = len(route.nodes_id) // 2
+        params = {'route_length': length}
+        yield partial(measure, "InsertionProcessor.find_all_feasible_insertions_for_se_route", params,
+                      lambda _: processor.find_all_feasible_insertions_for_se_route(route, customer))
+        yield partial(measure, "SERoute.insert_customer_at_pos", params,
+                      lambda _: route.insert_customer_at_pos(customer, pos),
+                      teardown=lambda _: route.remove_customer(customer))
+        yield partial(measure, "SERoute.remove_customer", params,
+                      lambda _: route.remove_customer(customer),
+                      setup=lambda: route.insert_customer_at_pos(customer, pos))
+        yield partial(measure, "RouteMemento", params, lambda _: RouteMemento(route))
+
+def bench_fe_recalculation(problem: ProblemInstance) -> Iterator[Callable[[], Dict]]:
+    """_recalculate_fe_route_and_check_feasibility theo số SE route do một FE route phục vụ."""
+    se_routes, used = [], set()
+    for k in range(max(config.MICROBENCH_SE_ROUTES_PER_FE)):
+        satellite = problem.satellites[k % len(problem.satellites)]
+        customers = nearest_customers(problem, satellite, CUSTOMERS_PER_SE_ROUTE, exclude=used)
+        used.update(c.id for c in customers)
+        se_routes.append(build_se_route(problem, satellite, customers))
+
+    for count in config.MICROBENCH_SE_ROUTES_PER_FE:
+        fe_route = FERoute(problem)
+        for se_route in se_routes[:count]:
+            fe_route.add_serviced_se_route(se_route); se_route.add_serving_fe_route(fe_route)
+        yield partial(measure, "_recalculate_fe_route_and_check_feasibility",
+                      {'se_routes': count, 'satellites': len({se.satellite.id for se in se_routes[:count]})},
+                      lambda _: _recalculate_fe_route_and_check_feasibility(fe_route, problem))
+        for se_route in se_routes[:count]:
+            se_route.remove_serving_fe_route(fe_route)
+
+def bench_solution_primitives(problem: ProblemInstance, seed: int) -> Iterator[Callable[[], Dict]]:
+    """VRP2E_State.copy và ChangeContext.rollback trên lời giải ban đầu của instance."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = create_integrated_initial_solution(problem, rng=make_rng(seed))
+    solution = state.solution
+    served = len(solution.customer_to_se_route_map)
+
+    yield partial(measure, "VRP2E_State.copy", {'customers': served, 'se_routes': len(solution.se_routes)},
+                  lambda _: state.copy())
+
+    for mode in ("UNDO_LOG", "MEMENTO"):
+        for q in config.MICROBENCH_ROLLBACK_Q:
+            q = min(q, served)
+            def destroy_and_repair():
+                # Một nước đi ALNS (random_removal + greedy_repair) để rollback hoàn tác
+                context = ChangeContext(solution, mode)
+                greedy_repair(solution, context, random_removal(solution, context, q, rng=rng), rng=rng)
+                return context
+            rng = make_rng(seed)
+            yield partial(measure, "ChangeContext.rollback", {'mode': mode, 'q': q},
+                          lambda context: context.rollback(), setup=destroy_and_repair)
+
+
+# ==============================================================================
+# BÁO CÁO
+# ==============================================================================
+
+def _result_key(row: Dict) -> str:
+    return row['name'] + json.dumps(row['params'], sort_keys=True)
+
+def format_results(results: List[Dict], baseline: Optional[List[Dict]] = None) -> str:
+    """Bảng kết quả; khi có baseline, thêm cột tốc độ so với baseline (cùng phép đo và tham số)."""
+    by_key = {_result_key(row): row for row in (baseline or [])}
+    lines = [f"{'Primitive':<62}| {'Params':<30}| {'ops/s':>11}| {'Mean (us)':>10}| {'Peak KiB/op':>11}| {'Net B/op':>9}"
+             + (f"| {'vs base':>8}" if baseline else "")]
+    for row in results:
+        params = ", ".join(f"{key}={value}" for key, value in row['params'].items())
+        line = (f"{row['name']:<62}| {params:<30}| {row['ops_per_s'] or 0.0:>11.1f}| {row['mean_us']:>10.2f}| "
+                f"{(row['alloc_peak_bytes'] or 0.0) / 1024:>11.2f}| {row['alloc_net_bytes'] or 0.0:>9.0f}")
+        base = by_key.get(_result_key(row))
+        if base is not None and base.get('ops_per_s') and row['ops_per_s']:
+            line += f"| {row['ops_per_s'] / base['ops_per_s']:>7.2f}x"
+        elif baseline:
+            line += f"| {'-':>8}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the solver's insertion, removal and rollback primitives.")
+    parser.add_argument('--size', type=int, default=config.MICROBENCH_INSTANCE_SIZE, help="Number of customers of the instance.")
+    parser.add_argument('--seed', type=int, default=config.RANDOM_SEED, help="Seed for instance generation and the solver.")
+    parser.add_argument('--only', type=str, default=None, help="Only run primitives whose name contains this text (case-insensitive).")
+    parser.add_argument('--output', type=str, default=None, help="Path of the JSON results file.")
+    parser.add_argument('--compare', type=str, default=None, help="Previous results file to compare against.")
+    args = parser.parse_args()
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    commit = get_git_commit()
+    instance_dir = os.path.join(config.BENCHMARK_DIR, "instances")
+    os.makedirs(instance_dir, exist_ok=True)
+    output_path = args.output or os.path.join(config.BENCHMARK_DIR, f"microbench_{timestamp}" + (f"_{commit}" if commit else "") + ".json")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        instance_path = generate_benchmark_instance(args.size, args.seed, instance_dir)
+        problem = ProblemInstance(file_path=instance_path, vehicle_speed=config.BENCHMARK_VEHICLE_SPEED)
+        relaxed_problem = ProblemInstance(file_path=instance_path, vehicle_speed=config.BENCHMARK_VEHICLE_SPEED)
+    relax_constraints(relaxed_problem)
+
+    print("=" * 80)
+    print(f"MICRO-BENCHMARKS | commit: {commit or 'unknown'} | instance: {os.path.basename(instance_path)} | "
+          f"transaction mode: {config.TRANSACTION_MODE}")
+    print("=" * 80)
+
+    results = []
+    benchmarks = (bench_se_route_primitives(relaxed_problem), bench_fe_recalculation(relaxed_problem),
+                  bench_solution_primitives(problem, args.seed))
+    for benchmark in benchmarks:
+        for case in benchmark:
+            if args.only and args.only.lower() not in case.args[0].lower(): continue
+            result = case()
+            results.append(result)
+            print(f"  {result['name']} {result['params']}: {result['ops_per_s'] or 0.0:.1f} ops/s")
+
+    report = {
+        'timestamp': timestamp, 'commit': commit,
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'settings': {'instance': os.path.basename(instance_path), 'seed': args.seed,
+                     'min_time': config.MICROBENCH_MIN_TIME, 'alloc_samples': config.MICROBENCH_ALLOC_SAMPLES},
+        'results': results,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        baseline = previous['results']
+        print(f"\nCompared with {args.compare} (commit {previous.get('commit') or 'unknown'}):")
+    print("\n" + format_results(results, baseline))
+    print(f"\nMicro-benchmark results saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
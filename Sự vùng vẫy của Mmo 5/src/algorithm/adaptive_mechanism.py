@@ -1,7 +1,11 @@
 # --- START OF FILE adaptive_mechanism.py ---
 
-import random
-from typing import List, Dict, Callable
+from typing import List, Dict, Callable, Optional
+
+import numpy as np
+
+from .. import config
+from ..utils.rng import resolve_rng
 
 class Operator:
     """
@@ -13,36 +17,85 @@ class Operator:
         self.weight = 1.0             # Trọng số, ban đầu bằng nhau
         self.score = 0.0              # Điểm số trong segment hiện tại
         self.times_used = 0           # Số lần sử dụng trong segment hiện tại
+        self.segment_time = 0.0       # Thời gian chạy (giây) trong segment hiện tại
+        self.calls = 0                # Tổng số lần gọi có đo thời gian (cả lượt chạy)
+        self.total_time = 0.0         # Tổng thời gian chạy (giây, cả lượt chạy)
+        self._durations: List[float] = []  # OPERATOR_TIMING_SAMPLES thời lượng gần nhất (vòng tròn)
+
+    def record_time(self, duration: float):
+        self.segment_time += duration
+        self.total_time += duration
+        if len(self._durations) < config.OPERATOR_TIMING_SAMPLES: self._durations.append(duration)
+        elif self._durations: self._durations[self.calls % len(self._durations)] = duration
+        self.calls += 1
+
+    def timing_summary(self) -> Dict[str, float]:
+        """Số lần gọi, tổng thời gian (s), trung bình và các phân vị p50/p90/p99 (ms)."""
+        p50, p90, p99 = np.percentile(self._durations, [50, 90, 99]) * 1000 if self._durations else (0.0, 0.0, 0.0)
+        return {'calls': self.calls, 'total_time': self.total_time,
+                'mean_ms': self.total_time / self.calls * 1000 if self.calls else 0.0, 'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99}
+
+class _AliasTable:
+    """
+    Bảng alias (phương pháp Vose) để rút một chỉ số theo trọng số trong O(1).
+    Dựng lại mỗi khi trọng số thay đổi (O(n)). Tổng trọng số bằng 0 -> chọn đều.
+    """
+    def __init__(self, weights: List[float]):
+        n = len(weights); total = sum(weights)
+        scaled = [w * n / total for w in weights] if total > 0 else [1.0] * n
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [k for k, p in enumerate(scaled) if p < 1.0]
+        large = [k for k, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Các chỉ số còn lại (do sai số làm tròn) giữ xác suất 1
+
+    def sample(self, rng: np.random.Generator) -> int:
+        x = rng.random() * self.n
+        k = min(int(x), self.n - 1)
+        return k if x - k < self.prob[k] else self.alias[k]
+
 
 class AdaptiveOperatorSelector:
     """
     Quản lý việc lựa chọn và cập nhật trọng số cho các toán tử destroy và repair.
+    Việc chọn theo trọng số (roulette wheel) dùng bảng alias nên tốn O(1) mỗi lần rút
+    với bất kỳ số toán tử nào; bảng được dựng lại trong update_weights() (hoặc rebuild_tables()
+    nếu trọng số bị gán từ bên ngoài). Các lần rút dùng `rng` riêng (mặc định là một luồng con
+    của bộ sinh dùng chung, xem utils.rng) để không phụ thuộc vào số lần rút ngẫu nhiên của các toán tử.
     """
-    def __init__(self, destroy_operators: Dict[str, Callable], repair_operators: Dict[str, Callable], reaction_factor: float = 0.1):
+    def __init__(self, destroy_operators: Dict[str, Callable], repair_operators: Dict[str, Callable], reaction_factor: float = 0.1,
+                 rng: Optional[np.random.Generator] = None, time_normalized: Optional[bool] = None):
         self.destroy_ops = [Operator(name, func) for name, func in destroy_operators.items()]
         self.repair_ops = [Operator(name, func) for name, func in repair_operators.items()]
         self.reaction_factor = reaction_factor
+        self.time_normalized = config.TIME_NORMALIZED_WEIGHTS if time_normalized is None else time_normalized
+        self.rng = rng if rng is not None else resolve_rng().spawn(1)[0]
+        self.rebuild_tables()
 
-    def _select_operator(self, operators: List[Operator]) -> Operator:
+    def rebuild_tables(self):
+        """Dựng lại bảng alias từ trọng số hiện tại của các toán tử."""
+        self._destroy_table = _AliasTable([op.weight for op in self.destroy_ops])
+        self._repair_table = _AliasTable([op.weight for op in self.repair_ops])
+
+    def _select_operator(self, operators: List[Operator], table: _AliasTable) -> Operator:
         """
-        Thực hiện Roulette Wheel Selection để chọn một toán tử.
+        Thực hiện Roulette Wheel Selection (qua bảng alias) để chọn một toán tử.
         """
-        total_weight = sum(op.weight for op in operators)
-        pick = random.uniform(0, total_weight)
-        current = 0
-        for op in operators:
-            current += op.weight
-            if current > pick:
-                op.times_used += 1
-                return op
-        # Fallback in case of rounding errors
-        return operators[-1]
+        op = operators[table.sample(self.rng)]
+        op.times_used += 1
+        return op
 
     def select_destroy_operator(self) -> Operator:
-        return self._select_operator(self.destroy_ops)
+        return self._select_operator(self.destroy_ops, self._destroy_table)
 
     def select_repair_operator(self) -> Operator:
-        return self._select_operator(self.repair_ops)
+        return self._select_operator(self.repair_ops, self._repair_table)
 
     def update_scores(self, destroy_op: Operator, repair_op: Operator, sigma: float):
         """
@@ -51,18 +104,40 @@ class AdaptiveOperatorSelector:
         destroy_op.score += sigma
         repair_op.score += sigma
 
+    def record_time(self, op: Operator, duration: float):
+        """Ghi nhận thời gian (giây) của một lần gọi toán tử."""
+        op.record_time(duration)
+
     def update_weights(self):
         """
         Cập nhật trọng số cho tất cả các toán tử sau khi kết thúc một segment.
+        Với time_normalized, hiệu quả của toán tử là điểm / thời gian chạy trong segment,
+        nhân với thời gian trung bình mỗi lần gọi của cả nhóm (để cùng thang đo với điểm / lần dùng).
         """
         for op_list in [self.destroy_ops, self.repair_ops]:
+            group_calls = sum(op.times_used for op in op_list)
+            mean_call_time = sum(op.segment_time for op in op_list) / group_calls if group_calls else 0.0
             for op in op_list:
                 if op.times_used > 0:
+                    if self.time_normalized and op.segment_time > 0 and mean_call_time > 0:
+                        performance = op.score / op.segment_time * mean_call_time
+                    else:
+                        performance = op.score / op.times_used
                     op.weight = (1 - self.reaction_factor) * op.weight + \
-                                self.reaction_factor * (op.score / op.times_used)
-                # Reset score và times_used cho segment tiếp theo
+                                self.reaction_factor * performance
+                # Reset score, times_used và thời gian cho segment tiếp theo
                 op.score = 0
                 op.times_used = 0
+                op.segment_time = 0.0
+        self.rebuild_tables()
+
+    def timing_report(self) -> str:
+        """Bảng thống kê thời gian chạy của từng toán tử (dùng để in cuối pha ALNS)."""
+        lines = [f"  {'Operator':<34}| {'Calls':>7}| {'Total (s)':>10}| {'Mean (ms)':>10}| {'p50':>8}| {'p90':>8}| {'p99':>8}"]
+        for op in self.destroy_ops + self.repair_ops:
+            t = op.timing_summary()
+            lines.append(f"  {op.name:<34}| {t['calls']:>7}| {t['total_time']:>10.2f}| {t['mean_ms']:>10.2f}| {t['p50_ms']:>8.2f}| {t['p90_ms']:>8.2f}| {t['p99_ms']:>8.2f}")
+        return "\n".join(lines)
 
 # --- END OF FILE adaptive_mechanism.py ---
 
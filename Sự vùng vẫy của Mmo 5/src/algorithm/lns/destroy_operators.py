@@ -1,11 +1,15 @@
 # --- START OF FILE destroy_operators.py ---
 
-import random
-from typing import List, Tuple, TYPE_CHECKING, Set
+import bisect
+import heapq
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING, Set
+
+import numpy as np
 
 from ... import config
 from .insertion_logic import _recalculate_fe_route_and_check_feasibility
 from ...core.transaction import ChangeContext
+from ...utils.rng import resolve_rng
 
 if TYPE_CHECKING:
     from ...core.data_structures import Solution, SERoute, FERoute
@@ -22,12 +26,14 @@ def _perform_removal(solution: "Solution", context: "ChangeContext", to_remove_i
         context.backup_route(fe_route)
         for se_route in fe_route.serviced_se_routes:
             context.backup_route(se_route)
+    # Gom các khách hàng theo route để mỗi route chỉ bị xóa (và tính lại lịch trình) một lần
+    ids_by_route: Dict["SERoute", Set[int]] = {}
     for cust_id in to_remove_ids:
         if cust_id in cust_map_snapshot:
-            se_route = cust_map_snapshot[cust_id]
-            customer_obj = solution.problem.node_objects[cust_id]
-            removed_objs.append(customer_obj)
-            se_route.remove_customer(customer_obj)
+            ids_by_route.setdefault(cust_map_snapshot[cust_id], set()).add(cust_id)
+            removed_objs.append(solution.problem.node_objects[cust_id])
+    for se_route, route_cust_ids in ids_by_route.items():
+        se_route.remove_customers(route_cust_ids)
     solution.update_customer_map()
     for fe_route in affected_fes:
         for se_route_in_fe in list(fe_route.serviced_se_routes):
@@ -43,116 +49,170 @@ def _perform_removal(solution: "Solution", context: "ChangeContext", to_remove_i
     return removed_objs
 
 # (Các toán tử random_removal, shaw_removal và các hàm liên quan giữ nguyên)
-def random_removal(solution: "Solution", context: "ChangeContext", q: int) -> List["Customer"]:
+def _sample_ranks(n: int, k: int, p: float, rng: np.random.Generator) -> List[int]:
+    """
+    Chọn k hạng khác nhau trong [0, n), mỗi lần lấy hạng thứ int(random()^p * số hạng còn lại)
+    trong các hạng chưa chọn (ưu tiên hạng nhỏ) - tương đương `candidates.pop(index)` lặp lại
+    nhưng không xóa phần tử khỏi list: hạng thực được suy ra từ danh sách các hạng đã chọn (đã sắp xếp).
+    Cả k số ngẫu nhiên được rút một lần bằng rng.
+    """
+    taken: List[int] = []
+    draws = (rng.random(k) ** p).tolist()
+    for remaining, draw in zip(range(n, n - k, -1), draws):
+        rank = int(draw * remaining)
+        for t in taken:
+            if t > rank: break
+            rank += 1
+        bisect.insort(taken, rank)
+    return taken
+
+def random_removal(solution: "Solution", context: "ChangeContext", q: int,
+                   rng: Optional[np.random.Generator] = None) -> List["Customer"]:
     served_ids = list(solution.customer_to_se_route_map.keys())
     if not served_ids: return []
     q = min(q, len(served_ids))
-    to_remove_ids = set(random.sample(served_ids, q))
+    to_remove_ids = {served_ids[k] for k in resolve_rng(rng).choice(len(served_ids), q, replace=False).tolist()}
     return _perform_removal(solution, context, to_remove_ids)
 
 W_DIST = 9; W_TIME = 3; W_DEMAND = 2; W_ROUTE = 5
-def _calculate_relatedness(cust1: "Customer", cust2: "Customer", solution: "Solution") -> float:
-    problem = solution.problem; dist = problem.get_distance(cust1.id, cust2.id)
-    norm_dist = dist / problem._max_dist if problem._max_dist > 0 else 0
-    se_route1 = solution.customer_to_se_route_map.get(cust1.id); se_route2 = solution.customer_to_se_route_map.get(cust2.id)
-    if not se_route1 or not se_route2: return float('inf')
-    start_time1 = se_route1.service_start_times.get(cust1.id, 0.0); start_time2 = se_route2.service_start_times.get(cust2.id, 0.0)
-    time_diff = abs(start_time1 - start_time2)
-    norm_time = time_diff / problem._max_due_time if problem._max_due_time > 0 else 0
-    demand_diff = abs(cust1.demand - cust2.demand)
-    norm_demand = demand_diff / problem._max_demand if problem._max_demand > 0 else 0
-    same_route_flag = 0 if se_route1 is se_route2 else 1
-    return (W_DIST * norm_dist + W_TIME * norm_time + W_DEMAND * norm_demand + W_ROUTE * same_route_flag)
-
-def shaw_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 6) -> List["Customer"]:
-    all_served_cust_ids = list(solution.customer_to_se_route_map.keys())
-    if not all_served_cust_ids: return []
-    q = min(q, len(all_served_cust_ids)); to_remove_ids = set()
-    seed_id = random.choice(all_served_cust_ids); to_remove_ids.add(seed_id)
-    while len(to_remove_ids) < q:
-        bait_id = random.choice(list(to_remove_ids)); bait_obj = solution.problem.node_objects[bait_id]
-        unselected_cust_ids = [cid for cid in all_served_cust_ids if cid not in to_remove_ids]
-        candidates = sorted([(cid, _calculate_relatedness(bait_obj, solution.problem.node_objects[cid], solution)) for cid in unselected_cust_ids], key=lambda x: x[1])
-        index = int(pow(random.random(), p) * len(candidates))
-        to_remove_ids.add(candidates[index][0])
-    return _perform_removal(solution, context, to_remove_ids)
+def _static_relatedness(problem: "ProblemInstance") -> np.ndarray:
+    """
+    Phần tĩnh của độ liên quan Shaw giữa mọi cặp nút: W_DIST * khoảng cách / _max_dist
+    + W_DEMAND * |chênh lệch demand| / _max_demand, dạng ma trận float32 đánh chỉ số theo
+    problem.get_node_index(). Được tính một lần cho mỗi ProblemInstance (tính lại nếu W_DIST/W_DEMAND thay đổi).
+    """
+    array_cache = problem.get_array_cache()
+    cached = array_cache.get('shaw_static_relatedness')
+    if cached is None or cached[0] != (W_DIST, W_DEMAND):
+        dist_scale = 1.0 / problem._max_dist if problem._max_dist > 0 else 0.0
+        demand_scale = 1.0 / problem._max_demand if problem._max_demand > 0 else 0.0
+        demands = problem.get_node_arrays()['demand'] * demand_scale
+        matrix = (W_DIST * dist_scale) * problem.get_distance_array() + W_DEMAND * np.abs(demands[:, None] - demands[None, :])
+        cached = ((W_DIST, W_DEMAND), matrix.astype(np.float32))
+        array_cache['shaw_static_relatedness'] = cached
+    return cached[1]
+
+def _shaw_features(solution: "Solution") -> Tuple[List[int], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Phần động của các khách hàng đang được phục vụ (theo thứ tự customer_to_se_route_map):
+    node id, hàng trong các mảng của problem (get_node_index), thời điểm bắt đầu phục vụ
+    (chia _max_due_time) và chỉ số SE route.
+    """
+    problem = solution.problem
+    cust_ids = list(solution.customer_to_se_route_map.keys())
+    route_index = {}
+    start_times = np.empty(len(cust_ids)); route_ids = np.empty(len(cust_ids), dtype=np.int64)
+    for k, (cust_id, se_route) in enumerate(solution.customer_to_se_route_map.items()):
+        start_times[k] = se_route.service_start_times.get(cust_id, 0.0)
+        route_ids[k] = route_index.setdefault(id(se_route), len(route_index))
+    time_scale = 1.0 / problem._max_due_time if problem._max_due_time > 0 else 0.0
+    return cust_ids, problem.get_node_index()[cust_ids], start_times * time_scale, route_ids
+
+def shaw_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 6,
+                 rng: Optional[np.random.Generator] = None) -> List["Customer"]:
+    """
+    Xóa các khách hàng "liên quan" nhau (Shaw). Phần tĩnh (khoảng cách, demand) lấy từ ma trận
+    tính sẵn của ProblemInstance; chỉ phần thời gian và cùng-route được tính lúc phá hủy, bằng NumPy
+    cho mọi khách hàng. Ứng viên thứ `index` (theo độ liên quan tăng dần) được lấy bằng
+    argpartition thay vì sắp xếp toàn bộ -> O(N) mỗi bước. Các số ngẫu nhiên của mọi bước được rút trước.
+    """
+    cust_ids, ids, starts, route_ids = _shaw_features(solution)
+    if not cust_ids: return []
+    rng = resolve_rng(rng)
+    static_relatedness = _static_relatedness(solution.problem)
+    q = min(q, len(cust_ids))
+    selected = [int(rng.integers(len(cust_ids)))]
+    is_selected = np.zeros(len(cust_ids), dtype=bool); is_selected[selected[0]] = True
+    # Mỗi bước: một số để chọn khách gốc b trong các khách đã chọn, một số cho hạng (lũy thừa p)
+    base_draws, rank_draws = rng.random(q - 1).tolist(), (rng.random(q - 1) ** p).tolist()
+    while len(selected) < q:
+        step = len(selected) - 1
+        b = selected[int(base_draws[step] * len(selected))]
+        relatedness = (static_relatedness[ids[b], ids] + W_TIME * np.abs(starts - starts[b])
+                       + W_ROUTE * (route_ids != route_ids[b]))
+        relatedness[is_selected] = np.inf
+        index = int(rank_draws[step] * (len(cust_ids) - len(selected)))
+        chosen = int(np.argpartition(relatedness, index)[index])
+        selected.append(chosen); is_selected[chosen] = True
+    return _perform_removal(solution, context, {cust_ids[k] for k in selected})
 
-def worst_slack_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 3) -> List["Customer"]:
+def worst_slack_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 3,
+                        rng: Optional[np.random.Generator] = None) -> List["Customer"]:
     candidates = []
     for cust_id, se_route in solution.customer_to_se_route_map.items():
         candidates.append((cust_id, se_route.forward_time_slacks.get(cust_id, 0.0)))
     if not candidates: return []
     candidates.sort(key=lambda x: x[1])
-    to_remove_ids = set(); q = min(q, len(candidates))
-    while len(to_remove_ids) < q and candidates:
-        index = int(pow(random.random(), p) * len(candidates))
-        to_remove_ids.add(candidates.pop(index)[0])
+    to_remove_ids = {candidates[rank][0] for rank in _sample_ranks(len(candidates), min(q, len(candidates)), p, resolve_rng(rng))}
     return _perform_removal(solution, context, to_remove_ids)
 
 # <<< HÀM NÀY ĐƯỢC CẬP NHẬT >>>
-def worst_cost_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 3) -> List["Customer"]:
+def worst_cost_removal(solution: "Solution", context: "ChangeContext", q: int, p: int = 3,
+                       rng: Optional[np.random.Generator] = None) -> List["Customer"]:
     """
     Xóa các khách hàng có chi phí tiết kiệm được (cost saving) cao nhất, dựa trên
     hàm mục tiêu chính (DISTANCE hoặc TRAVEL_TIME) được cấu hình.
+    Cost saving của mọi khách hàng trong một route được tính một lần trên các mảng
+    (node trước, khách hàng, node sau) dịch nhau một vị trí của nodes_id, nên vị trí
+    của khách hàng chính là chỉ số trong mảng (không cần nodes_id.index).
     """
     problem = solution.problem
-    candidates = []
     
-    # Xác định hàm chi phí dựa trên config
-    cost_func = problem.get_distance if config.PRIMARY_OBJECTIVE == "DISTANCE" else problem.get_travel_time
+    # Xác định ma trận chi phí dựa trên config
+    cost_matrix = problem.get_distance_array() if config.PRIMARY_OBJECTIVE == "DISTANCE" else problem.get_travel_time_array()
+    node_index = problem.get_node_index()
 
-    for cust_id, se_route in solution.customer_to_se_route_map.items():
-        if cust_id not in se_route.nodes_id: continue
-        pos = se_route.nodes_id.index(cust_id)
-        if pos == 0 or pos == len(se_route.nodes_id) - 1: continue
-            
-        prev_node_id = se_route.nodes_id[pos - 1]
-        next_node_id = se_route.nodes_id[pos + 1]
-        
-        cost_prev_cust = cost_func(prev_node_id % problem.total_nodes, cust_id)
-        cost_cust_next = cost_func(cust_id, next_node_id % problem.total_nodes)
-        cost_prev_next = cost_func(prev_node_id % problem.total_nodes, next_node_id % problem.total_nodes)
-        
-        cost_saving = cost_prev_cust + cost_cust_next - cost_prev_next
-        candidates.append((cust_id, cost_saving))
+    cust_chunks, saving_chunks = [], []
+    for se_route in solution.se_routes:
+        if len(se_route.nodes_id) < 3: continue
+        node_ids = np.array(se_route.nodes_id, dtype=np.int64) % problem.total_nodes
+        nodes = node_index[node_ids]
+        prev_nodes, custs, next_nodes = nodes[:-2], nodes[1:-1], nodes[2:]
+        cust_chunks.append(node_ids[1:-1])
+        saving_chunks.append(cost_matrix[prev_nodes, custs] + cost_matrix[custs, next_nodes] - cost_matrix[prev_nodes, next_nodes])
 
-    if not candidates: return []
+    if not cust_chunks: return []
 
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    to_remove_ids = set(); q = min(q, len(candidates))
-    while len(to_remove_ids) < q and candidates:
-        index = int(pow(random.random(), p) * len(candidates))
-        to_remove_ids.add(candidates.pop(index)[0])
+    cust_ids = np.concatenate(cust_chunks)
+    order = np.argsort(-np.concatenate(saving_chunks), kind='stable')
+    ranks = _sample_ranks(len(order), min(q, len(order)), p, resolve_rng(rng))
+    to_remove_ids = set(cust_ids[order[ranks]].tolist())
             
     return _perform_removal(solution, context, to_remove_ids)
 
 # (Các toán tử còn lại giữ nguyên)
-def route_removal(solution: "Solution", context: "ChangeContext", q: int) -> List["Customer"]:
+def route_removal(solution: "Solution", context: "ChangeContext", q: int,
+                  rng: Optional[np.random.Generator] = None) -> List["Customer"]:
     se_routes = list(solution.se_routes)
     if not se_routes: return []
+    rng = resolve_rng(rng)
     to_remove_ids = set()
     while len(to_remove_ids) < q and se_routes:
-        route_to_remove = random.choice(se_routes)
-        to_remove_ids.update({c.id for c in route_to_remove.get_customers()})
+        route_to_remove = se_routes[int(rng.integers(len(se_routes)))]
+        to_remove_ids.update(route_to_remove.nodes_id[1:-1])
         se_routes.remove(route_to_remove)
     return _perform_removal(solution, context, to_remove_ids)
 
-def satellite_removal(solution: "Solution", context: "ChangeContext", q: int) -> List["Customer"]:
-    active_satellites = list({se_route.satellite for se_route in solution.se_routes})
-    if not active_satellites: return []
-    satellite_to_clear = random.choice(active_satellites)
-    to_remove_ids = {c.id for se in solution.se_routes if se.satellite.id == satellite_to_clear.id for c in se.get_customers()}
+def satellite_removal(solution: "Solution", context: "ChangeContext", q: int,
+                      rng: Optional[np.random.Generator] = None) -> List["Customer"]:
+    # Dùng chỉ mục satellite -> SE route của Solution thay vì duyệt mọi route/khách hàng
+    if not solution.satellite_to_se_routes: return []
+    satellite_ids = list(solution.satellite_to_se_routes)
+    satellite_id = satellite_ids[int(resolve_rng(rng).integers(len(satellite_ids)))]
+    to_remove_ids = {cust_id for se in solution.satellite_to_se_routes[satellite_id] for cust_id in se.nodes_id[1:-1]}
     return _perform_removal(solution, context, to_remove_ids)
 
-def least_utilized_route_removal(solution: "Solution", context: "ChangeContext", q: int) -> List["Customer"]:
+def least_utilized_route_removal(solution: "Solution", context: "ChangeContext", q: int,
+                                 rng: Optional[np.random.Generator] = None) -> List["Customer"]:
     if not solution.se_routes: return []
-    sorted_routes = sorted(solution.se_routes, key=lambda r: len(r.get_customers()))
-    pool_size = max(1, int(len(sorted_routes) * 0.25))
-    candidate_pool = sorted_routes[:pool_size]
+    rng = resolve_rng(rng)
+    pool_size = max(1, int(len(solution.se_routes) * 0.25))
+    # nsmallest (ổn định như sorted) trên số khách hàng O(1) của mỗi route, không sắp xếp toàn bộ
+    candidate_pool = heapq.nsmallest(pool_size, solution.se_routes, key=lambda r: r.num_customers)
     to_remove_ids = set()
     while len(to_remove_ids) < q and candidate_pool:
-        route_to_remove = random.choice(candidate_pool)
-        to_remove_ids.update({c.id for c in route_to_remove.get_customers()})
+        route_to_remove = candidate_pool[int(rng.integers(len(candidate_pool)))]
+        to_remove_ids.update(route_to_remove.nodes_id[1:-1])
         candidate_pool.remove(route_to_remove)
     return _perform_removal(solution, context, to_remove_ids)
 
@@ -1,6 +1,5 @@
 # --- START OF FILE insertion_logic.py ---
 
-import copy
 import heapq
 import itertools
 from typing import Dict, Optional, List, Tuple, TYPE_CHECKING
@@ -8,10 +7,10 @@ from typing import Dict, Optional, List, Tuple, TYPE_CHECKING
 from ... import config
 from ...core.data_structures import SERoute, FERoute, Solution
 from ...core.problem_parser import Customer
+from ...core.transaction import ChangeContext, active_log_context
 
 if TYPE_CHECKING:
     from ...core.problem_parser import ProblemInstance, Satellite
-    from ...core.transaction import RouteMemento
     
 class InsertionProcessor:
     def __init__(self, problem: "ProblemInstance"):
@@ -44,9 +43,7 @@ class InsertionProcessor:
 # <<< HÀM NÀY ĐÃ ĐƯỢỢC SỬA LỖI >>>
 def _recalculate_fe_route_and_check_feasibility(fe_route: FERoute, problem: "ProblemInstance") -> Tuple[bool, Optional[float], Optional[float]]:
     if not fe_route.serviced_se_routes:
-        fe_route.total_dist = 0.0
-        fe_route.schedule = []
-        fe_route.calculate_route_properties()
+        fe_route.set_schedule([])
         return True, 0.0, 0.0
         
     depot = problem.depot
@@ -78,8 +75,7 @@ def _recalculate_fe_route_and_check_feasibility(fe_route: FERoute, problem: "Pro
         schedule.append({'activity': 'UNLOAD_DELIV', 'node_id': satellite.id, 'load_change': -del_load_at_sat, 'load_after': current_load, 'arrival_time': arrival_at_sat, 'start_svc_time': arrival_at_sat, 'departure_time': arrival_at_sat})
         latest_se_finish = 0
         for se_route in se_routes_at_sat:
-            se_route.service_start_times[se_route.nodes_id[0]] = arrival_at_sat
-            se_route.calculate_full_schedule_and_slacks()
+            se_route.set_start_time(arrival_at_sat)
             for cust in se_route.get_customers():
                 if hasattr(cust, 'due_time') and se_route.service_start_times.get(cust.id, float('inf')) > cust.due_time + 1e-6:
                     return False, None, None
@@ -95,8 +91,7 @@ def _recalculate_fe_route_and_check_feasibility(fe_route: FERoute, problem: "Pro
     arrival_at_depot = current_time + problem.get_travel_time(last_node_id, depot.id)
     schedule.append({'activity': 'ARRIVE_DEPOT', 'node_id': depot.id, 'load_change': -current_load, 'load_after': 0, 'arrival_time': arrival_at_depot, 'start_svc_time': arrival_at_depot, 'departure_time': arrival_at_depot})
     
-    fe_route.schedule = schedule
-    fe_route.calculate_route_properties()
+    fe_route.set_schedule(schedule)
     
     effective_deadline = min(route_deadlines) if route_deadlines else float('inf')
     if arrival_at_depot > effective_deadline + 1e-6:
@@ -109,6 +104,19 @@ def _calculate_route_proximity(customer: "Customer", se_route: SERoute, problem:
     return min(problem.get_distance(customer.id, c.id) for c in se_route.get_customers())
 
 def find_k_best_global_insertion_options_combined(customer: "Customer", solution: Solution, insertion_processor: InsertionProcessor, k: int) -> List[Dict]:
+    # Mọi phép thử chèn đều chạy dưới savepoint của giao dịch undo log đang mở
+    # (hoặc một giao dịch tạm nếu chưa có) và được hoàn tác bằng rollback_to().
+    context = active_log_context()
+    own_context = context is None
+    if own_context: context = ChangeContext(solution, mode="UNDO_LOG")
+    outer_sp = context.savepoint()
+    try:
+        return _find_k_best_global_insertion_options(customer, solution, insertion_processor, k, context)
+    finally:
+        context.rollback_to(outer_sp); context.release(outer_sp)
+        if own_context: context.commit()
+
+def _find_k_best_global_insertion_options(customer: "Customer", solution: Solution, insertion_processor: InsertionProcessor, k: int, context: ChangeContext) -> List[Dict]:
     problem = solution.problem
     best_options_heap = []
     counter = itertools.count()
@@ -124,19 +132,18 @@ def find_k_best_global_insertion_options_combined(customer: "Customer", solution
         if not local_insertions: continue
         for local_option in local_insertions:
             fe_route = list(se_route.serving_fe_routes)[0]
-            fe_memento = fe_route.backup(); se_mementos = {se: se.backup() for se in fe_route.serviced_se_routes}
+            se_primary_before, fe_primary_before = getattr(se_route, primary_route_attr), getattr(fe_route, primary_route_attr)
+            sp = context.savepoint()
             try:
-                se_route_to_modify = next(se for se in fe_route.serviced_se_routes if se is se_route)
-                se_route_to_modify.insert_customer_at_pos(customer, local_option['pos'])
+                se_route.insert_customer_at_pos(customer, local_option['pos'])
                 is_feasible, _, _ = _recalculate_fe_route_and_check_feasibility(fe_route, problem)
                 if is_feasible:
-                    primary_increase = (getattr(se_route_to_modify, primary_route_attr) - getattr(se_mementos[se_route_to_modify], primary_route_attr)) + (getattr(fe_route, primary_route_attr) - getattr(fe_memento, primary_route_attr))
+                    primary_increase = (getattr(se_route, primary_route_attr) - se_primary_before) + (getattr(fe_route, primary_route_attr) - fe_primary_before)
                     objective_increase = config.WEIGHT_PRIMARY * primary_increase
                     option = {'objective_increase': objective_increase, 'type': 'insert_into_existing_se', 'se_route': se_route, 'se_pos': local_option['pos']}
                     add_option_to_heap(objective_increase, option)
             finally:
-                fe_route.restore(fe_memento)
-                for se, memento in se_mementos.items(): se.restore(memento)
+                context.rollback_to(sp); context.release(sp)
     candidate_satellites = problem.satellite_neighbors.get(customer.id, problem.satellites)
     for satellite in candidate_satellites:
         temp_new_se = SERoute(satellite, problem)
@@ -154,20 +161,20 @@ def find_k_best_global_insertion_options_combined(customer: "Customer", solution
                 add_option_to_heap(objective_increase, option)
         for fe_route in solution.fe_routes:
             if sum(r.total_load_delivery for r in fe_route.serviced_se_routes) + temp_new_se.total_load_delivery > problem.fe_vehicle_capacity + 1e-6: continue
-            fe_memento_expand = fe_route.backup(); se_mementos_expand = {se: se.backup() for se in fe_route.serviced_se_routes}
+            fe_primary_before = getattr(fe_route, primary_route_attr)
+            sp = context.savepoint()
             try:
                 fe_route.add_serviced_se_route(temp_new_se)
                 is_feasible_expand, _, _ = _recalculate_fe_route_and_check_feasibility(fe_route, problem)
                 if is_feasible_expand:
-                    delta_fe_primary = getattr(fe_route, primary_route_attr) - getattr(fe_memento_expand, primary_route_attr)
+                    delta_fe_primary = getattr(fe_route, primary_route_attr) - fe_primary_before
                     primary_increase = getattr(temp_new_se, primary_route_attr) + delta_fe_primary
                     objective_increase = config.WEIGHT_PRIMARY * primary_increase
                     if config.OPTIMIZE_VEHICLE_COUNT: objective_increase += config.WEIGHT_SE_VEHICLE
                     option = {'objective_increase': objective_increase, 'type': 'create_new_se_expand_fe', 'new_satellite': satellite, 'fe_route': fe_route}
                     add_option_to_heap(objective_increase, option)
             finally:
-                fe_route.restore(fe_memento_expand)
-                for se, memento in se_mementos_expand.items(): se.restore(memento)
+                context.rollback_to(sp); context.release(sp)
     sorted_options = sorted([opt for cost, count, opt in best_options_heap], key=lambda x: x['objective_increase'])
     return sorted_options
 
@@ -1,12 +1,14 @@
 # --- START OF FILE repair_operators.py ---
 
-import random
-from typing import List, TYPE_CHECKING, Dict
+from typing import List, Optional, TYPE_CHECKING, Dict
+
+import numpy as np
 
 from ...core.data_structures import SERoute, FERoute
 from .insertion_logic import InsertionProcessor, find_best_global_insertion_option, find_k_best_global_insertion_options, _recalculate_fe_route_and_check_feasibility
 from ...core.problem_parser import PickupCustomer
 from ...core.transaction import ChangeContext
+from ...utils.rng import resolve_rng
 
 if TYPE_CHECKING:
     from ...core.data_structures import Solution
@@ -16,15 +18,20 @@ def _perform_insertion(solution: "Solution", context: "ChangeContext", customer_
     problem = solution.problem
     option_type = best_option.get('type')
 
+    # Việc tính lại FE route sẽ dời lịch của mọi SE route "anh em" nên phải đăng ký
+    # tất cả. Với sao lưu copy-on-write, route không bị đổi sẽ không tốn chi phí.
+    fe_route_to_backup = None
     if option_type == 'insert_into_existing_se':
         se_route = best_option['se_route']
         if se_route.serving_fe_routes:
-            fe_route = list(se_route.serving_fe_routes)[0]
+            fe_route_to_backup = list(se_route.serving_fe_routes)[0]
             context.backup_route(se_route)
-            context.backup_route(fe_route)
     elif option_type == 'create_new_se_expand_fe':
-        fe_route = best_option['fe_route']
-        context.backup_route(fe_route)
+        fe_route_to_backup = best_option['fe_route']
+    if fe_route_to_backup is not None:
+        context.backup_route(fe_route_to_backup)
+        for sibling_se in fe_route_to_backup.serviced_se_routes:
+            context.backup_route(sibling_se)
     
     if option_type == 'insert_into_existing_se':
         se_route, pos = best_option['se_route'], best_option['se_pos']
@@ -64,17 +71,21 @@ def _perform_insertion(solution: "Solution", context: "ChangeContext", customer_
     solution.update_customer_map()
 
 
-def greedy_repair(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+# Mọi toán tử repair nhận rng (Generator của lượt chạy) để có cùng cách gọi; toán tử
+# có thứ tự chèn xác định bỏ qua tham số này.
+def greedy_repair(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                  rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     
     customers = list(customers_to_insert)
-    random.shuffle(customers)
+    resolve_rng(rng).shuffle(customers)
 
     for customer in customers:
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
                 
-def regret_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"], k: int = 4):
+def regret_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"], k: int = 4,
+                     rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     remaining_customers = list(customers_to_insert)
 
@@ -102,14 +113,16 @@ def regret_insertion(solution: "Solution", context: "ChangeContext", customers_t
         _perform_insertion(solution, context, best_customer_to_insert, best_option_for_max_regret_customer)
         remaining_customers.remove(best_customer_to_insert)
 
-def earliest_deadline_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def earliest_deadline_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                                      rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: getattr(c, 'deadline', float('inf')))
     for customer in sorted_customers:
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
 
-def farthest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def farthest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                             rng: Optional[np.random.Generator] = None):
     problem = solution.problem
     insertion_processor = InsertionProcessor(problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: problem.get_distance(c.id, problem.depot.id), reverse=True)
@@ -117,14 +130,16 @@ def farthest_first_insertion(solution: "Solution", context: "ChangeContext", cus
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
 
-def largest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def largest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                            rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: c.demand, reverse=True)
     for customer in sorted_customers:
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
 
-def closest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def closest_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                            rng: Optional[np.random.Generator] = None):
     problem = solution.problem
     insertion_processor = InsertionProcessor(problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: problem.get_distance(c.id, problem.depot.id))
@@ -133,21 +148,24 @@ def closest_first_insertion(solution: "Solution", context: "ChangeContext", cust
         _perform_insertion(solution, context, customer, best_option)
 
 # <<< DÒNG NÀY ĐÃ ĐƯỢC SỬA LỖI >>>
-def earliest_time_window_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def earliest_time_window_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                                   rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: c.ready_time)
     for customer in sorted_customers:
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
 
-def latest_time_window_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def latest_time_window_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                                 rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: c.due_time, reverse=True)
     for customer in sorted_customers:
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         _perform_insertion(solution, context, customer, best_option)
 
-def latest_deadline_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"]):
+def latest_deadline_first_insertion(solution: "Solution", context: "ChangeContext", customers_to_insert: List["Customer"],
+                                    rng: Optional[np.random.Generator] = None):
     insertion_processor = InsertionProcessor(solution.problem)
     sorted_customers = sorted(customers_to_insert, key=lambda c: getattr(c, 'deadline', float('-inf')), reverse=True)
     for customer in sorted_customers:
@@ -1,66 +1,152 @@
 # --- START OF FILE lns_algorithm.py ---
 
 import math
-import random
-from typing import Callable, List, Tuple, Dict, TYPE_CHECKING
+import time
+from collections import OrderedDict
+from typing import Callable, Generator, List, Optional, Tuple, Dict, TYPE_CHECKING
+
+import numpy as np
 
 from .. import config
 from .adaptive_mechanism import AdaptiveOperatorSelector
 from ..core.transaction import ChangeContext
+from ..utils.solution_analyzer import check_solution_feasibility
+from ..utils.logger import LogLevel, log
+from ..utils.history import RunHistory, OperatorHistory
+from ..utils.progress import MoveType, NullSink, ProgressEvent, create_progress_sink
+from ..utils.rng import resolve_rng
 
 if TYPE_CHECKING:
     from ..core.data_structures import VRP2E_State, Solution
     from ..core.problem_parser import Customer
+    from .parallel_alns import IslandExchange
+
+# Toán tử được gọi là op(solution, context, q hoặc danh sách khách, rng=Generator của lượt chạy)
+DestroyOperatorFunc = Callable[..., List['Customer']]
+RepairOperatorFunc = Callable[..., None]
+NewBestCallback = Callable[['VRP2E_State', int], None]
+
+
+class VisitedStateCache:
+    """
+    Tập có giới hạn các fingerprint (Solution.fingerprint) của những lời giải đã
+    được chấp nhận. Khi đầy, fingerprint lâu nhất chưa được thêm hoặc gặp lại
+    (kiểm tra `in` trúng) sẽ bị loại (LRU).
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, None]" = OrderedDict()
+
+    def __contains__(self, fingerprint: int) -> bool:
+        if fingerprint not in self._entries: return False
+        self._entries.move_to_end(fingerprint)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, fingerprint: int):
+        self._entries[fingerprint] = None
+        self._entries.move_to_end(fingerprint)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class StoppingCriteria:
+    """
+    Điều kiện dừng của một pha tìm kiếm: số vòng lặp tối đa, ngân sách thời gian thực
+    (giây) và số vòng lặp liên tiếp không tìm được lời giải tốt nhất mới. None = không giới hạn.
+    """
+    def __init__(self, iterations: Optional[int] = None, time_limit: Optional[float] = None,
+                 max_no_improvement: Optional[int] = None):
+        if iterations is None and time_limit is None and max_no_improvement is None:
+            raise ValueError("At least one of iterations, time_limit or max_no_improvement must be set.")
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.max_no_improvement = max_no_improvement
+        self.start_time = time.perf_counter()
 
-DestroyOperatorFunc = Callable[['Solution', 'ChangeContext', int], List['Customer']]
-RepairOperatorFunc = Callable[['Solution', 'ChangeContext', List['Customer']], None]
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
 
+    def time_fraction(self) -> Optional[float]:
+        """Tỉ lệ ngân sách thời gian đã dùng (0..1), hoặc None nếu không giới hạn thời gian."""
+        if self.time_limit is None: return None
+        return min(1.0, self.elapsed() / self.time_limit) if self.time_limit > 0 else 1.0
 
-def run_local_search_phase(initial_state: "VRP2E_State", iterations: int, q_percentage: float, 
-                           destroy_op: Callable, repair_op: Callable) -> "VRP2E_State":
+    def stop_reason(self, completed_iterations: int, iterations_since_best: int) -> Optional[str]:
+        if self.iterations is not None and completed_iterations >= self.iterations: return "iteration limit"
+        if self.max_no_improvement is not None and iterations_since_best >= self.max_no_improvement: return "no improvement"
+        if self.time_limit is not None and self.elapsed() >= self.time_limit: return "time limit"
+        return None
+
+    def describe(self) -> str:
+        parts = [f"Iterations: {self.iterations}" if self.iterations is not None else "Iterations: unlimited"]
+        if self.time_limit is not None: parts.append(f"Time limit: {self.time_limit:.1f}s")
+        if self.max_no_improvement is not None: parts.append(f"Max no-improvement: {self.max_no_improvement}")
+        return ", ".join(parts)
+
+
+def run_local_search_phase(initial_state: "VRP2E_State", iterations: Optional[int], q_percentage: float, 
+                           destroy_op: Callable, repair_op: Callable,
+                           time_limit: Optional[float] = None, max_no_improvement: Optional[int] = None,
+                           on_new_best: Optional[NewBestCallback] = None,
+                           progress_sink: Optional[NullSink] = None,
+                           rng: Optional[np.random.Generator] = None) -> "VRP2E_State":
+    """
+    Tìm kiếm cục bộ (chỉ chấp nhận nước đi cải thiện). Dừng khi đạt `iterations`, hết
+    `time_limit` giây hoặc sau `max_no_improvement` vòng lặp không có best mới;
+    on_new_best(best_state, iteration) được gọi mỗi khi tìm thấy lời giải tốt nhất mới.
+    Tiến trình từng vòng lặp được gửi tới progress_sink (mặc định theo config.PROGRESS_SINK).
+    rng được truyền xuống các toán tử (mặc định: bộ sinh dùng chung, xem utils.rng).
+    """
+    rng = resolve_rng(rng)
     current_state = initial_state
     best_state = initial_state.copy()
+    stopping = StoppingCriteria(iterations, time_limit, max_no_improvement)
+    iterations_since_best = 0
+    sink = progress_sink if progress_sink is not None else create_progress_sink()
+    sink.start("LNS", [getattr(destroy_op, '__name__', 'destroy')], [getattr(repair_op, '__name__', 'repair')])
 
     print("--- Starting Local Search Refinement ---")
-    for i in range(iterations):
-        context = ChangeContext(current_state.solution)
-        cost_before = current_state.cost
+    try:
+        i = 0
+        while stopping.stop_reason(i, iterations_since_best) is None:
+            cost_before = current_state.cost
 
-        num_cust = len(current_state.solution.customer_to_se_route_map)
-        if num_cust == 0:
-            print("No customers to optimize. Stopping."); break
-        
-        q = max(2, int(num_cust * q_percentage))
-        
-        removed_customers = destroy_op(current_state.solution, context, q)
-        repair_op(current_state.solution, context, removed_customers)
-
-        cost_after = current_state.cost
-        best_cost = best_state.cost
-        log_str = f"  LNS Iter {i+1:>4}/{iterations} | Current: {cost_before:>10.2f}, New: {cost_after:>10.2f}, Best: {best_cost:>10.2f}"
-
-        if cost_after < cost_before:
-            log_str += " -> ACCEPTED"
-            if cost_after < best_cost:
-                best_state = current_state.copy()
-                log_str += " (NEW BEST!)"
-        else:
-            context.rollback()
-            assert abs(current_state.cost - cost_before) < 1e-9
-
-        print(log_str)
+            num_cust = len(current_state.solution.customer_to_se_route_map)
+            if num_cust == 0:
+                print("No customers to optimize. Stopping."); break
+            q = max(2, int(num_cust * q_percentage))
+
+            with ChangeContext(current_state.solution) as context:
+                removed_customers = destroy_op(current_state.solution, context, q, rng=rng)
+                repair_op(current_state.solution, context, removed_customers, rng=rng)
+
+                cost_after = current_state.cost
+                i += 1; iterations_since_best += 1
+                move_type = MoveType.REJECTED
+
+                if cost_after < cost_before:
+                    context.commit()
+                    move_type = MoveType.BETTER
+                    if cost_after < best_state.cost:
+                        best_state = current_state.copy(); iterations_since_best = 0
+                        move_type = MoveType.NEW_BEST
+                        if on_new_best is not None: on_new_best(best_state, i)
+                else:
+                    context.rollback()
+                    assert abs(current_state.cost - cost_before) < 1e-9
+
+            if sink.enabled: sink.emit(ProgressEvent(i, best_state.cost, current_state.cost, cost_after, 0.0, 0, 0, move_type, q))
         
+    finally:
+        if progress_sink is None: sink.close()
     print(f"--- Local Search complete. Best cost found: {best_state.cost:.2f} ---")
     return best_state
 
 
-def run_alns_phase(initial_state: "VRP2E_State", iterations: int, 
-                   destroy_operators: Dict[str, DestroyOperatorFunc], 
-                   repair_operators: Dict[str, RepairOperatorFunc]) -> Tuple["VRP2E_State", Tuple[Dict, Dict]]:
-    current_state = initial_state
-    best_state = initial_state.copy()
-    operator_selector = AdaptiveOperatorSelector(destroy_operators, repair_operators, config.REACTION_FACTOR)
-    
+def calculate_initial_temperature(initial_state: "VRP2E_State") -> float:
     # <<< THAY ĐỔI LOGIC TÍNH NHIỆT ĐỘ >>>
     T_start = 0
     # Lấy chi phí chính (chỉ distance/time) để tính toán, tránh bị ảnh hưởng bởi trọng số xe
@@ -70,96 +156,187 @@ def run_alns_phase(initial_state: "VRP2E_State", iterations: int,
         delta_for_temp_calc = config.START_TEMP_WORSENING_PCT * primary_cost
         T_start = -delta_for_temp_calc / math.log(config.START_TEMP_ACCEPT_PROB)
     
-    T = T_start if T_start > 0 else 1.0
+    return T_start if T_start > 0 else 1.0
+
+def run_alns_phase(initial_state: "VRP2E_State", iterations: Optional[int], 
+                   destroy_operators: Dict[str, DestroyOperatorFunc], 
+                   repair_operators: Dict[str, RepairOperatorFunc],
+                   island: Optional["IslandExchange"] = None,
+                   time_limit: Optional[float] = None, max_no_improvement: Optional[int] = None,
+                   on_new_best: Optional[NewBestCallback] = None,
+                   progress_sink: Optional[NullSink] = None,
+                   rng: Optional[np.random.Generator] = None) -> Tuple["VRP2E_State", Tuple[RunHistory, OperatorHistory]]:
+    """
+    Vòng lặp ALNS chính (chạy hết iterate_alns_phase). on_new_best(best_state, iteration)
+    được gọi mỗi khi tìm thấy lời giải tốt nhất mới; các tham số khác xem iterate_alns_phase.
+    """
+    generator = iterate_alns_phase(initial_state, iterations, destroy_operators, repair_operators,
+                                   island=island, time_limit=time_limit, max_no_improvement=max_no_improvement,
+                                   progress_sink=progress_sink, rng=rng)
+    while True:
+        try:
+            best_state, iteration = next(generator)
+        except StopIteration as finished:
+            return finished.value
+        if on_new_best is not None: on_new_best(best_state, iteration)
+
+def iterate_alns_phase(initial_state: "VRP2E_State", iterations: Optional[int], 
+                       destroy_operators: Dict[str, DestroyOperatorFunc], 
+                       repair_operators: Dict[str, RepairOperatorFunc],
+                       island: Optional["IslandExchange"] = None,
+                       time_limit: Optional[float] = None,
+                       max_no_improvement: Optional[int] = None,
+                       progress_sink: Optional[NullSink] = None,
+                       rng: Optional[np.random.Generator] = None
+                       ) -> Generator[Tuple["VRP2E_State", int], None, Tuple["VRP2E_State", Tuple[RunHistory, OperatorHistory]]]:
+    """
+    Vòng lặp ALNS dạng generator (anytime): mỗi khi tìm thấy lời giải tốt nhất mới sẽ
+    yield (best_state, iteration); người gọi có thể dừng bất cứ lúc nào và dùng best_state
+    (không được sửa đổi nó). Khi kết thúc, giá trị trả về (StopIteration.value) có cùng
+    dạng với run_alns_phase: (best_state, (history, operator_history)).
+
+    Điều kiện dừng (mặc định lấy từ config.ALNS_TIME_LIMIT, config.ALNS_MAX_NO_IMPROVEMENT):
+    `iterations` vòng lặp, `time_limit` giây hoặc `max_no_improvement` vòng lặp liên tiếp
+    không có best mới. Khi có time_limit, nhiệt độ giảm theo thời gian đã dùng
+    (T = T0 * TIME_BUDGET_FINAL_TEMP_RATIO^(t / time_limit)) thay vì COOLING_RATE mỗi vòng.
+    Nếu truyền `island` (chế độ ISLAND của parallel_alns), việc khởi động lại do trì trệ
+    được thay bằng trao đổi lời giải với các đảo khác.
+    Mỗi vòng lặp phát một ProgressEvent tới progress_sink (mặc định theo config.PROGRESS_SINK;
+    sink tự tạo sẽ được đóng khi kết thúc, kể cả khi người gọi dừng generator sớm hoặc có
+    ngoại lệ; sink truyền vào do người gọi đóng).
+    Mọi lựa chọn ngẫu nhiên (tỷ lệ phá hủy, tiêu chí SA, các toán tử) dùng `rng` (numpy Generator
+    của lượt chạy, mặc định: bộ sinh dùng chung, xem utils.rng); bộ chọn toán tử dùng một luồng
+    con riêng của rng. Cùng rng (cùng seed) cho cùng kết quả khi không giới hạn thời gian.
+    """
+    rng = resolve_rng(rng)
+    time_limit = config.ALNS_TIME_LIMIT if time_limit is None else time_limit
+    max_no_improvement = config.ALNS_MAX_NO_IMPROVEMENT if max_no_improvement is None else max_no_improvement
+    stopping = StoppingCriteria(iterations, time_limit, max_no_improvement)
+
+    current_state = initial_state
+    best_state = initial_state.copy()
+    operator_selector = AdaptiveOperatorSelector(destroy_operators, repair_operators, config.REACTION_FACTOR, rng=rng.spawn(1)[0])
+    T = T_start = calculate_initial_temperature(initial_state)
+    sink = progress_sink if progress_sink is not None else create_progress_sink()
+    sink.start("ALNS", [op.name for op in operator_selector.destroy_ops], [op.name for op in operator_selector.repair_ops])
+    destroy_ids = {op.name: k for k, op in enumerate(operator_selector.destroy_ops)}
+    repair_ids = {op.name: k for k, op in enumerate(operator_selector.repair_ops)}
     
-    history = {
-        "iteration": [], "best_cost": [], "current_cost": [], "temperature": [],
-        "accepted_move_type": [], "q_removed": [], "is_large_destroy": []
-    }
-    operator_history = {
-        "iteration": [], "destroy_weights": [], "repair_weights": []
-    }
+    history = RunHistory(capacity=iterations)
+    operator_history = OperatorHistory([op.name for op in operator_selector.destroy_ops],
+                                       [op.name for op in operator_selector.repair_ops], capacity=iterations)
     
     print(f"\n--- Starting ALNS Phase ---")
-    print(f"  Iterations: {iterations}, Initial Temp: {T:.2f}, Initial Cost: {current_state.cost:.2f}")
+    print(f"  {stopping.describe()}, Initial Temp: {T:.2f}, Initial Cost: {current_state.cost:.2f}")
 
     small_destroy_counter = 0
     iterations_without_improvement = 0
+    # Lời giải đã từng được chấp nhận sẽ không được SA chấp nhận lại và không
+    # mang lại điểm thưởng cho toán tử (tránh dao động giữa các trạng thái giống nhau).
+    visited_states = VisitedStateCache(config.VISITED_STATE_CACHE_SIZE) if config.VISITED_STATE_CACHE_SIZE > 0 else None
+    if visited_states is not None: visited_states.add(current_state.solution.fingerprint())
+    revisits_skipped = 0
+    iterations_since_best = 0
 
-    for i in range(1, iterations + 1):
-        context = ChangeContext(current_state.solution)
-        cost_before_change = current_state.cost
-
-        destroy_op_obj = operator_selector.select_destroy_operator()
-        repair_op_obj = operator_selector.select_repair_operator()
-        num_cust = len(current_state.solution.customer_to_se_route_map)
-        if num_cust == 0: break
+    try:
+        i = 0
+        while (stop_reason := stopping.stop_reason(i, iterations_since_best)) is None:
+            i += 1
+            cost_before_change = current_state.cost
 
-        is_large_destroy = (small_destroy_counter >= config.SMALL_DESTROY_SEGMENT_LENGTH)
+            destroy_op_obj = operator_selector.select_destroy_operator()
+            repair_op_obj = operator_selector.select_repair_operator()
+            num_cust = len(current_state.solution.customer_to_se_route_map)
+            if num_cust == 0: stop_reason = "no customers"; break
+            is_large_destroy = (small_destroy_counter >= config.SMALL_DESTROY_SEGMENT_LENGTH)
         
-        if is_large_destroy:
-            q_percentage = random.uniform(*config.Q_LARGE_RANGE); small_destroy_counter = 0
-        else:
-            q_percentage = random.uniform(*config.Q_SMALL_RANGE); small_destroy_counter += 1
+            if is_large_destroy:
+                q_percentage = rng.uniform(*config.Q_LARGE_RANGE); small_destroy_counter = 0
+            else:
+                q_percentage = rng.uniform(*config.Q_SMALL_RANGE); small_destroy_counter += 1
         
-        q = max(2, int(num_cust * q_percentage))
+            q = max(2, int(num_cust * q_percentage))
 
-        history["q_removed"].append(q)
-        history["is_large_destroy"].append(is_large_destroy)
+            with ChangeContext(current_state.solution) as context:
+                start_time = time.perf_counter()
+                removed_customers = destroy_op_obj.function(current_state.solution, context, q, rng=rng)
+                destroy_done_time = time.perf_counter()
+                repair_op_obj.function(current_state.solution, context, removed_customers, rng=rng)
+                operator_selector.record_time(destroy_op_obj, destroy_done_time - start_time)
+                operator_selector.record_time(repair_op_obj, time.perf_counter() - destroy_done_time)
 
-        removed_customers = destroy_op_obj.function(current_state.solution, context, q)
-        repair_op_obj.function(current_state.solution, context, removed_customers)
+                cost_after_change = current_state.cost
+                sigma_update = 0
+                accepted = False
+                fingerprint = current_state.solution.fingerprint() if visited_states is not None else None
+                is_revisit = fingerprint is not None and fingerprint in visited_states
 
-        cost_after_change = current_state.cost
-        sigma_update = 0
-        log_msg = ""; accepted = False
+                if cost_after_change < cost_before_change:
+                    accepted = True
+                    if cost_after_change < best_state.cost:
+                        sigma_update = config.SIGMA_1_NEW_BEST
+                    elif not is_revisit:
+                        sigma_update = config.SIGMA_2_BETTER
+                elif is_revisit:
+                    revisits_skipped += 1
+                elif T > 1e-6 and rng.random() < math.exp(-(cost_after_change - cost_before_change) / T):
+                    accepted = True
+                    sigma_update = config.SIGMA_3_ACCEPTED
 
-        if cost_after_change < cost_before_change:
-            accepted = True
-            if cost_after_change < best_state.cost:
-                sigma_update = config.SIGMA_1_NEW_BEST; log_msg = f"(NEW BEST: {cost_after_change:.2f})"
-            else:
-                sigma_update = config.SIGMA_2_BETTER; log_msg = f"(Accepted: {cost_after_change:.2f})"
-        elif T > 1e-6 and random.random() < math.exp(-(cost_after_change - cost_before_change) / T):
-            accepted = True
-            sigma_update = config.SIGMA_3_ACCEPTED; log_msg = f"(SA Accepted: {cost_after_change:.2f})"
-
-        if accepted:
-            operator_selector.update_scores(destroy_op_obj, repair_op_obj, sigma_update)
-            if cost_after_change < best_state.cost: best_state = current_state.copy()
-        else:
-            context.rollback()
-
-        if sigma_update == config.SIGMA_1_NEW_BEST: iterations_without_improvement = 0
-        else: iterations_without_improvement += 1
+                if accepted:
+                    context.commit()
+                    if visited_states is not None: visited_states.add(fingerprint)
+                    operator_selector.update_scores(destroy_op_obj, repair_op_obj, sigma_update)
+                    if cost_after_change < best_state.cost: best_state = current_state.copy()
+                else:
+                    context.rollback()
+
+            found_new_best = sigma_update == config.SIGMA_1_NEW_BEST
+            if found_new_best: iterations_without_improvement = 0; iterations_since_best = 0
+            else: iterations_without_improvement += 1; iterations_since_best += 1
         
-        if iterations_without_improvement >= config.RESTART_THRESHOLD:
-            print(f"  >>> Restart triggered at iter {i}. Resetting to best known solution. <<<")
-            current_state = best_state.copy(); iterations_without_improvement = 0
+            if island is not None:
+                if i % island.interval == 0:
+                    restart_state = island.synchronize(best_state, operator_selector, iterations_without_improvement)
+                    if restart_state is not None:
+                        log(f"  >>> Island restart at iter {i}. Continuing from solution with cost {restart_state.cost:.2f}. <<<", LogLevel.DEBUG)
+                        current_state = restart_state; iterations_without_improvement = 0
+                        if current_state.cost < best_state.cost:
+                            best_state = current_state.copy(); iterations_since_best = 0; found_new_best = True
+                        if visited_states is not None: visited_states.add(current_state.solution.fingerprint())
+            elif iterations_without_improvement >= config.RESTART_THRESHOLD:
+                log(f"  >>> Restart triggered at iter {i}. Resetting to best known solution. <<<", LogLevel.DEBUG)
+                current_state = best_state.copy(); iterations_without_improvement = 0
         
-        T *= config.COOLING_RATE
+            time_fraction = stopping.time_fraction()
+            if time_fraction is None: T *= config.COOLING_RATE
+            else: T = T_start * config.TIME_BUDGET_FINAL_TEMP_RATIO ** time_fraction
         
-        if i % config.SEGMENT_LENGTH == 0:
-            operator_selector.update_weights()
-            operator_history["iteration"].append(i)
-            d_weights = {op.name: op.weight for op in operator_selector.destroy_ops}
-            r_weights = {op.name: op.weight for op in operator_selector.repair_ops}
-            operator_history["destroy_weights"].append(d_weights)
-            operator_history["repair_weights"].append(r_weights)
-            
-        if i % 100 == 0 or log_msg:
-            print(f"  Iter {i:>5}/{iterations} | Best: {best_state.cost:<10.2f} | Current: {current_state.cost:<10.2f} | Temp: {T:<8.2f} | Ops: {destroy_op_obj.name}/{repair_op_obj.name} | {log_msg}")
+            if config.VALIDATION_INTERVAL > 0 and i % config.VALIDATION_INTERVAL == 0:
+                report = check_solution_feasibility(current_state.solution)
+                if not report.is_feasible:
+                    raise AssertionError(f"Iter {i}: infeasible current solution ({report.summary()})\n  " + "\n  ".join(report.messages()))
+
+            if i % config.SEGMENT_LENGTH == 0:
+                operator_selector.update_weights()
+                operator_history.append(i, [op.weight for op in operator_selector.destroy_ops],
+                                        [op.weight for op in operator_selector.repair_ops])
+
+            move_type = MoveType.REJECTED
+            if sigma_update == config.SIGMA_1_NEW_BEST: move_type = MoveType.NEW_BEST
+            elif accepted and cost_after_change < cost_before_change: move_type = MoveType.BETTER
+            elif accepted: move_type = MoveType.SA_ACCEPTED
+            if sink.enabled:
+                sink.emit(ProgressEvent(i, best_state.cost, current_state.cost, cost_after_change, T,
+                                        destroy_ids[destroy_op_obj.name], repair_ids[repair_op_obj.name], move_type, q))
     
-        history["iteration"].append(i)
-        history["best_cost"].append(best_state.cost)
-        history["current_cost"].append(current_state.cost)
-        history["temperature"].append(T)
-        log_move_type = 'rejected'
-        if sigma_update == config.SIGMA_1_NEW_BEST: log_move_type = 'new_best'
-        elif sigma_update == config.SIGMA_2_BETTER: log_move_type = 'better'
-        elif accepted: log_move_type = 'sa_accepted'
-        history["accepted_move_type"].append(log_move_type)
-
-    print(f"\n--- ALNS phase complete. Best cost found: {best_state.cost:.2f} ---")
+            history.append(i, best_state.cost, current_state.cost, T, move_type, q, is_large_destroy)
+            if found_new_best: yield best_state, i
+
+    finally:
+        if progress_sink is None: sink.close()
+    print(f"\n--- ALNS phase complete ({stop_reason}, {i} iterations, {stopping.elapsed():.2f}s). Best cost found: {best_state.cost:.2f} ---")
+    if visited_states is not None: print(f"  Revisited states skipped: {revisits_skipped}")
+    print("  Operator timing:\n" + operator_selector.timing_report())
     return best_state, (history, operator_history)
 # --- END OF FILE lns_algorithm.py ---
\ No newline at end of file
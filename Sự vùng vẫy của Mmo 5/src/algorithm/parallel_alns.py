@@ -0,0 +1,471 @@
+# --- START OF FILE parallel_alns.py ---
+
+import os
+import sys
+import math
+import time
+import contextlib
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from .. import config
+from ..core.data_structures import VRP2E_State, Solution, SERoute, FERoute
+from ..core.transaction import ChangeContext
+from ..utils.logger import LogLevel, log
+from ..utils.profiler import get_profile_stats, is_profiling_enabled, merge_profile_stats, reset_profiling
+from ..utils.history import RunHistory, OperatorHistory
+from ..utils.progress import MoveType, NullSink, ProgressEvent, create_progress_sink
+from ..utils.rng import SeedLike, make_rng, stream_seed
+from .adaptive_mechanism import AdaptiveOperatorSelector
+from .lns.insertion_logic import _recalculate_fe_route_and_check_feasibility
+from .lns_algorithm import (run_alns_phase, calculate_initial_temperature, StoppingCriteria, VisitedStateCache,
+                            DestroyOperatorFunc, RepairOperatorFunc)
+
+if TYPE_CHECKING:
+    from ..core.problem_parser import ProblemInstance
+
+
+# ==============================================================================
+# BIỂU DIỄN GỌN CỦA LỜI GIẢI (để truyền giữa các tiến trình)
+# ==============================================================================
+
+def encode_solution(solution: "Solution") -> Dict:
+    """
+    Mã hóa lời giải thành một bản ghi gọn chỉ gồm các id (không chứa ProblemInstance),
+    để gửi qua lại giữa các tiến trình với chi phí pickle nhỏ.
+    """
+    se_index = {se_route: i for i, se_route in enumerate(solution.se_routes)}
+    return {
+        'se_routes': [(se.satellite.id, tuple(se.nodes_id[1:-1])) for se in solution.se_routes],
+        'fe_routes': [tuple(se_index[se] for se in fe.serviced_se_routes) for fe in solution.fe_routes],
+        'unserved': tuple(c.id for c in solution.unserved_customers),
+    }
+
+def decode_solution(record: Dict, problem: "ProblemInstance") -> VRP2E_State:
+    """Dựng lại lời giải đầy đủ (route, lịch trình, liên kết) từ bản ghi của encode_solution."""
+    solution = Solution(problem)
+    se_routes = []
+    for satellite_id, customer_ids in record['se_routes']:
+        se_route = SERoute(problem.node_objects[satellite_id], problem)
+        for cust_id in customer_ids:
+            se_route.insert_customer_at_pos(problem.node_objects[cust_id], len(se_route.nodes_id) - 1)
+        se_routes.append(se_route)
+        solution.se_routes.append(se_route)
+    for se_indices in record['fe_routes']:
+        fe_route = FERoute(problem)
+        solution.add_fe_route(fe_route)
+        for idx in se_indices: solution.link_routes(fe_route, se_routes[idx])
+        _recalculate_fe_route_and_check_feasibility(fe_route, problem)
+    solution.unserved_customers = [problem.node_objects[cid] for cid in record['unserved']]
+    solution.update_customer_map()
+    return VRP2E_State(solution)
+
+def _solution_delta(solution: "Solution", base_record: Dict, base_se_routes: List["SERoute"]) -> Dict:
+    """
+    Phần khác biệt gọn giữa lời giải hiện tại và bản ghi gốc: chỉ số các SE route giữ
+    nguyên trình tự, trình tự của các SE route mới/bị thay đổi, nhóm FE (theo chỉ số
+    trong danh sách giữ nguyên + mới) và danh sách khách chưa phục vụ.
+    """
+    base_index = {se_route: i for i, se_route in enumerate(base_se_routes)}
+    kept, changed = [], []
+    for se_route in solution.se_routes:
+        i = base_index.get(se_route)
+        if i is not None and base_record['se_routes'][i][1] == tuple(se_route.nodes_id[1:-1]): kept.append((i, se_route))
+        else: changed.append(se_route)
+    combined_index = {se_route: k for k, (_, se_route) in enumerate(kept)}
+    combined_index.update((se_route, len(kept) + k) for k, se_route in enumerate(changed))
+    return {
+        'kept_se': [i for i, _ in kept],
+        'new_se': [(se.satellite.id, tuple(se.nodes_id[1:-1])) for se in changed],
+        'fe_routes': [tuple(combined_index[se] for se in fe.serviced_se_routes) for fe in solution.fe_routes],
+        'unserved': tuple(c.id for c in solution.unserved_customers),
+    }
+
+def apply_solution_delta(base_record: Dict, delta: Dict) -> Dict:
+    """Áp dụng phần khác biệt của _solution_delta lên bản ghi gốc, trả về bản ghi mới."""
+    return {
+        'se_routes': [base_record['se_routes'][i] for i in delta['kept_se']] + list(delta['new_se']),
+        'fe_routes': list(delta['fe_routes']),
+        'unserved': delta['unserved'],
+    }
+
+
+# ==============================================================================
+# MÔ HÌNH ĐẢO (ISLAND MODEL)
+# ==============================================================================
+
+class IslandExchange:
+    """
+    Kênh trao đổi của một đảo (worker) với bộ điều phối dùng chung (Manager).
+    Cứ mỗi `interval` vòng lặp, run_alns_phase gọi synchronize():
+      - công bố bản ghi gọn của lời giải tốt nhất nếu nó tốt hơn lời giải toàn cục,
+      - gộp trọng số toán tử của mọi đảo (trung bình) và gán lại cho bộ chọn cục bộ,
+      - nếu đảo bị trì trệ (>= stagnation_threshold vòng không cải thiện), trả về
+        lời giải để khởi động lại: lời giải toàn cục nếu tốt hơn, ngược lại best cục bộ.
+    """
+    def __init__(self, worker_id: int, problem: "ProblemInstance", shared_best, shared_weights, lock,
+                 interval: int, stagnation_threshold: int):
+        self.worker_id = worker_id
+        self.problem = problem
+        self.shared_best = shared_best
+        self.shared_weights = shared_weights
+        self.lock = lock
+        self.interval = interval
+        self.stagnation_threshold = stagnation_threshold
+        self.adoptions = 0
+
+    def synchronize(self, best_state: "VRP2E_State", operator_selector: "AdaptiveOperatorSelector",
+                    iterations_without_improvement: int) -> Optional["VRP2E_State"]:
+        local_weights = ({op.name: op.weight for op in operator_selector.destroy_ops},
+                         {op.name: op.weight for op in operator_selector.repair_ops})
+        with self.lock:
+            if best_state.cost < self.shared_best['cost'] - 1e-9:
+                self.shared_best.update(cost=best_state.cost, record=encode_solution(best_state.solution), owner=self.worker_id)
+            self.shared_weights[self.worker_id] = local_weights
+            all_weights = list(self.shared_weights.values())
+            global_best = dict(self.shared_best) if iterations_without_improvement >= self.stagnation_threshold else None
+
+        for ops, k in ((operator_selector.destroy_ops, 0), (operator_selector.repair_ops, 1)):
+            for op in ops: op.weight = sum(w[k][op.name] for w in all_weights) / len(all_weights)
+        operator_selector.rebuild_tables()
+
+        if global_best is None: return None
+        if global_best['owner'] != self.worker_id and global_best['cost'] < best_state.cost - 1e-9:
+            self.adoptions += 1
+            return decode_solution(global_best['record'], self.problem)
+        return best_state.copy()
+
+
+# ==============================================================================
+# TIẾN TRÌNH CON (WORKER)
+# ==============================================================================
+
+# Dữ liệu dùng chung của mỗi tiến trình con, được gán một lần bởi _init_worker.
+# Với start method "fork", ProblemInstance được kế thừa từ tiến trình cha mà không cần pickle.
+_worker_data: Dict = {}
+
+def _init_worker(problem: "ProblemInstance", destroy_operators: Dict[str, DestroyOperatorFunc],
+                 repair_operators: Dict[str, RepairOperatorFunc]):
+    _worker_data['problem'] = problem
+    _worker_data['destroy_operators'] = destroy_operators
+    _worker_data['repair_operators'] = repair_operators
+
+@contextlib.contextmanager
+def _worker_output(worker_id: int, log_dir: Optional[str]):
+    """Chuyển output của worker vào file log riêng (hoặc bỏ đi) để không trộn lẫn trên console."""
+    path = os.path.join(log_dir, f"worker_{worker_id}.log") if log_dir else os.devnull
+    with open(path, 'w', encoding='utf-8') as stream, contextlib.redirect_stdout(stream):
+        yield
+
+def _init_batch_worker(problem: "ProblemInstance", destroy_operators: Dict[str, DestroyOperatorFunc],
+                       repair_operators: Dict[str, RepairOperatorFunc], shared_state, log_dir: Optional[str]):
+    _init_worker(problem, destroy_operators, repair_operators)
+    _worker_data['shared_state'] = shared_state
+    reset_profiling()  # Tiến trình con (fork) thừa hưởng số liệu của tiến trình cha
+    path = os.path.join(log_dir, f"batch_worker_{os.getpid()}.log") if log_dir else os.devnull
+    sys.stdout = open(path, 'w', encoding='utf-8')
+    # Finalize có exitpriority được multiprocessing chạy ngay trước khi tiến trình con thoát
+    multiprocessing.util.Finalize(None, _close_batch_worker_output, exitpriority=0)
+
+def _close_batch_worker_output():
+    stream, sys.stdout = sys.stdout, sys.__stdout__
+    stream.close()
+
+def _evaluate_candidate(version: int, destroy_name: str, repair_name: str,
+                        seed: np.random.SeedSequence, q: int) -> Dict:
+    """
+    Đánh giá thử một cặp (destroy, repair) trên lời giải hiện tại của master rồi hoàn tác.
+    Bản ghi của lời giải được đọc từ shared_state và giải mã một lần cho mỗi phiên bản
+    (version), rồi dùng lại cho các ứng viên sau; tác vụ chỉ mang số phiên bản.
+    Kết quả kèm thời gian chạy (giây) của destroy và repair để master ghi nhận cho bộ chọn toán tử.
+    Khi profiling bật, kết quả kèm số liệu đo được kể từ ứng viên trước của worker này.
+    """
+    if _worker_data.get('state_version') != version:
+        record_version, record = _worker_data['shared_state']['current']
+        if record_version != version: raise RuntimeError(f"Batch worker expected solution version {version}, found {record_version}")
+        state = decode_solution(record, _worker_data['problem'])
+        _worker_data.update(state_version=version, record=record, state=state, base_se_routes=list(state.solution.se_routes))
+    state, record = _worker_data['state'], _worker_data['record']
+    rng = make_rng(seed)
+    context = ChangeContext(state.solution)
+    try:
+        start_time = time.perf_counter()
+        removed_customers = _worker_data['destroy_operators'][destroy_name](state.solution, context, q, rng=rng)
+        destroy_done_time = time.perf_counter()
+        _worker_data['repair_operators'][repair_name](state.solution, context, removed_customers, rng=rng)
+        result = {'cost': state.cost, 'fingerprint': state.solution.fingerprint(),
+                  'delta': _solution_delta(state.solution, record, _worker_data['base_se_routes']),
+                  'destroy_time': destroy_done_time - start_time, 'repair_time': time.perf_counter() - destroy_done_time}
+    finally:
+        context.rollback()
+    if is_profiling_enabled():
+        result['profile'] = get_profile_stats()
+        reset_profiling()
+    return result
+
+def _run_alns_worker(worker_id: int, seed: np.random.SeedSequence, initial_record: Dict, iterations: Optional[int], log_dir: Optional[str],
+                     island_args: Optional[Tuple] = None, time_limit: Optional[float] = None,
+                     max_no_improvement: Optional[int] = None) -> Dict:
+    problem = _worker_data['problem']
+    start_time = time.time()
+    island = IslandExchange(worker_id, problem, *island_args) if island_args is not None else None
+    reset_profiling()  # Tiến trình con (fork) thừa hưởng số liệu của tiến trình cha
+    with _worker_output(worker_id, log_dir):
+        initial_state = decode_solution(initial_record, problem)
+        best_state, (history, operator_history) = run_alns_phase(
+            initial_state, iterations, _worker_data['destroy_operators'], _worker_data['repair_operators'],
+            island=island, time_limit=time_limit, max_no_improvement=max_no_improvement, rng=make_rng(seed))
+    return {
+        'worker_id': worker_id, 'seed': seed.entropy, 'stream': seed.spawn_key[-1], 'best_cost': best_state.cost,
+        'best_record': encode_solution(best_state.solution), 'elapsed_time': time.time() - start_time,
+        'history': history, 'operator_history': operator_history,
+        'adoptions': island.adoptions if island is not None else 0,
+        'profile': get_profile_stats(),
+    }
+
+
+# ==============================================================================
+# HÀM CÔNG KHAI (PUBLIC)
+# ==============================================================================
+
+def get_mp_context():
+    """Ưu tiên 'fork' để các worker kế thừa ProblemInstance thay vì nhận bản pickle."""
+    if 'fork' in multiprocessing.get_all_start_methods(): return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+def resolve_num_workers(num_workers: Optional[int] = None) -> int:
+    num_workers = config.PARALLEL_WORKERS if num_workers is None else num_workers
+    return num_workers if num_workers > 0 else (os.cpu_count() or 1)
+
+def run_parallel_alns(initial_state: "VRP2E_State", iterations: Optional[int],
+                      destroy_operators: Dict[str, DestroyOperatorFunc],
+                      repair_operators: Dict[str, RepairOperatorFunc],
+                      num_workers: Optional[int] = None, base_seed: SeedLike = None,
+                      log_dir: Optional[str] = None,
+                      worker_results: Optional[List[Dict]] = None,
+                      mode: Optional[str] = None,
+                      time_limit: Optional[float] = None,
+                      max_no_improvement: Optional[int] = None) -> Tuple["VRP2E_State", Tuple[RunHistory, OperatorHistory]]:
+    """
+    Chạy nhiều quỹ đạo ALNS song song trên các tiến trình, mỗi quỹ đạo xuất phát
+    từ cùng lời giải ban đầu nhưng với luồng ngẫu nhiên khác nhau: worker k dùng luồng con
+    stream_seed(base_seed, k) (xem utils.rng), nên kết quả của từng worker tái lập được
+    bit-for-bit với cùng base_seed, không phụ thuộc số worker hay thứ tự hoàn thành
+    (riêng ISLAND còn phụ thuộc thời điểm trao đổi giữa các đảo).
+    mode (mặc định config.PARALLEL_MODE):
+      - "INDEPENDENT": các quỹ đạo chạy độc lập (multi-start).
+      - "ISLAND": các đảo trao đổi lời giải tốt nhất và gộp trọng số toán tử mỗi
+        ISLAND_EXCHANGE_INTERVAL vòng lặp (xem IslandExchange).
+      - "BATCHED": một quỹ đạo duy nhất, đánh giá song song nhiều ứng viên mỗi vòng
+        lặp (xem run_batched_alns_phase).
+
+    Trả về cùng dạng với run_alns_phase: (best_state, (history, operator_history)),
+    trong đó history/operator_history là của worker tìm được lời giải tốt nhất.
+    Nếu truyền vào list worker_results, kết quả của từng worker (seed, stream, best_cost,
+    history, operator_history, ...) sẽ được thêm vào đó theo thứ tự worker_id.
+    Nếu log_dir khác None, output của worker k được ghi vào log_dir/worker_k.log.
+    time_limit/max_no_improvement (mặc định config.ALNS_TIME_LIMIT, config.ALNS_MAX_NO_IMPROVEMENT)
+    là điều kiện dừng của mỗi quỹ đạo, như trong run_alns_phase.
+    """
+    problem = initial_state.solution.problem
+    num_workers = resolve_num_workers(num_workers)
+    base_seed = config.RANDOM_SEED if base_seed is None else base_seed
+    mode = (mode or config.PARALLEL_MODE).upper()
+    if mode not in ("INDEPENDENT", "ISLAND", "BATCHED"): raise ValueError(f"Unknown parallel mode: {mode}")
+    if mode == "BATCHED":
+        return run_batched_alns_phase(initial_state, iterations, destroy_operators, repair_operators,
+                                      num_workers=num_workers, seed=base_seed, log_dir=log_dir,
+                                      time_limit=time_limit, max_no_improvement=max_no_improvement)
+    initial_record = encode_solution(initial_state.solution)
+
+    print(f"\n--- Starting Parallel ALNS ({num_workers} workers, mode: {mode}) ---")
+    print(f"  Iterations per worker: {iterations}, Initial Cost: {initial_state.cost:.2f}")
+
+    results = []
+    mp_context = get_mp_context()
+    with contextlib.ExitStack() as stack:
+        island_args = None
+        if mode == "ISLAND":
+            manager = stack.enter_context(mp_context.Manager())
+            shared_best = manager.dict(cost=initial_state.cost, record=initial_record, owner=-1)
+            island_args = (shared_best, manager.dict(), manager.Lock(),
+                           config.ISLAND_EXCHANGE_INTERVAL, config.RESTART_THRESHOLD)
+        executor = stack.enter_context(ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=mp_context, initializer=_init_worker,
+            initargs=(problem, destroy_operators, repair_operators)))
+        futures = [executor.submit(_run_alns_worker, k, stream_seed(base_seed, k), initial_record, iterations, log_dir, island_args,
+                                   time_limit, max_no_improvement)
+                   for k in range(num_workers)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if is_profiling_enabled(): merge_profile_stats(result['profile'])
+            print(f"  Worker {result['worker_id']:>2} (stream {result['stream']} of seed {result['seed']}) finished in {result['elapsed_time']:.2f}s | Best: {result['best_cost']:.2f}"
+                  + (f" | Adopted global best: {result['adoptions']}x" if mode == "ISLAND" else ""))
+
+    results.sort(key=lambda r: r['worker_id'])
+    best_result = min(results, key=lambda r: r['best_cost'])
+    best_state = decode_solution(best_result['best_record'], problem)
+    if worker_results is not None: worker_results.extend(results)
+
+    print(f"\n--- Parallel ALNS complete. Best cost: {best_state.cost:.2f} (worker {best_result['worker_id']}) ---")
+    return best_state, (best_result['history'], best_result['operator_history'])
+
+def run_batched_alns_phase(initial_state: "VRP2E_State", iterations: Optional[int],
+                           destroy_operators: Dict[str, DestroyOperatorFunc],
+                           repair_operators: Dict[str, RepairOperatorFunc],
+                           batch_size: Optional[int] = None,
+                           num_workers: Optional[int] = None,
+                           progress_sink: Optional[NullSink] = None,
+                           seed: SeedLike = None,
+                           log_dir: Optional[str] = None,
+                           time_limit: Optional[float] = None,
+                           max_no_improvement: Optional[int] = None) -> Tuple["VRP2E_State", Tuple[RunHistory, OperatorHistory]]:
+    """
+    ALNS với đánh giá suy đoán theo lô: mỗi vòng lặp gửi batch_size ứng viên
+    (destroy, repair, seed) từ lời giải hiện tại tới các tiến trình con. Worker chỉ trả về
+    chi phí và phần khác biệt gọn (các SE route thay đổi); master chọn ứng viên tốt nhất
+    (bỏ qua trạng thái đã thăm nếu không cải thiện) và áp dụng tiêu chí chấp nhận SA như
+    run_alns_phase. `iterations` là số lô; trả về cùng dạng với run_alns_phase.
+    Điều kiện dừng và lịch nhiệt độ giống iterate_alns_phase: `iterations` lô, `time_limit` giây
+    hoặc `max_no_improvement` lô liên tiếp không có best mới (mặc định config.ALNS_TIME_LIMIT,
+    config.ALNS_MAX_NO_IMPROVEMENT); khi có time_limit, nhiệt độ giảm theo thời gian đã dùng.
+    Master dùng luồng stream_seed(seed, 0); ứng viên nhận các luồng con lần lượt của
+    stream_seed(seed, 1), nên cả quỹ đạo tái lập được với cùng seed bất kể số worker.
+    Lời giải hiện tại chỉ được công bố (qua Manager) khi nó đổi phiên bản; mỗi worker đọc
+    nó một lần cho mỗi phiên bản. Nếu log_dir khác None, output của các worker được ghi vào
+    log_dir/batch_worker_<pid>.log. Sink tự tạo (khi progress_sink là None) được đóng khi kết thúc,
+    kể cả khi có ngoại lệ từ worker hoặc Manager.
+    """
+    problem = initial_state.solution.problem
+    time_limit = config.ALNS_TIME_LIMIT if time_limit is None else time_limit
+    max_no_improvement = config.ALNS_MAX_NO_IMPROVEMENT if max_no_improvement is None else max_no_improvement
+    stopping = StoppingCriteria(iterations, time_limit, max_no_improvement)
+    num_workers = resolve_num_workers(num_workers)
+    batch_size = batch_size or config.SPECULATIVE_BATCH_SIZE or num_workers
+    rng, candidate_seeds = make_rng(stream_seed(seed, 0)), stream_seed(seed, 1)
+    operator_selector = AdaptiveOperatorSelector(destroy_operators, repair_operators, config.REACTION_FACTOR, rng=rng.spawn(1)[0])
+    T = T_start = calculate_initial_temperature(initial_state)
+    sink = progress_sink if progress_sink is not None else create_progress_sink()
+    sink.start("BATCHED ALNS", [op.name for op in operator_selector.destroy_ops], [op.name for op in operator_selector.repair_ops])
+    destroy_ids = {op.name: k for k, op in enumerate(operator_selector.destroy_ops)}
+    repair_ids = {op.name: k for k, op in enumerate(operator_selector.repair_ops)}
+
+    current_record, current_cost, version = encode_solution(initial_state.solution), initial_state.cost, 0
+    best_record, best_cost = current_record, current_cost
+    history = RunHistory(capacity=iterations)
+    operator_history = OperatorHistory([op.name for op in operator_selector.destroy_ops],
+                                       [op.name for op in operator_selector.repair_ops], capacity=iterations)
+
+    print(f"\n--- Starting Batched ALNS Phase ({num_workers} workers, {batch_size} candidates/iteration) ---")
+    print(f"  {stopping.describe()}, Initial Temp: {T:.2f}, Initial Cost: {current_cost:.2f}")
+
+    small_destroy_counter = 0
+    iterations_without_improvement = 0
+    iterations_since_best = 0
+    visited_states = VisitedStateCache(config.VISITED_STATE_CACHE_SIZE) if config.VISITED_STATE_CACHE_SIZE > 0 else None
+    if visited_states is not None: visited_states.add(initial_state.solution.fingerprint())
+    evaluated, start_time = 0, time.time()
+
+    try:
+        mp_context = get_mp_context()
+        with contextlib.ExitStack() as stack:
+            shared_state = stack.enter_context(mp_context.Manager()).dict(current=(version, current_record))
+            published_version = version
+            executor = stack.enter_context(ProcessPoolExecutor(
+                max_workers=num_workers, mp_context=mp_context, initializer=_init_batch_worker,
+                initargs=(problem, destroy_operators, repair_operators, shared_state, log_dir)))
+            i = 0
+            while (stop_reason := stopping.stop_reason(i, iterations_since_best)) is None:
+                i += 1
+                num_cust = sum(len(customer_ids) for _, customer_ids in current_record['se_routes'])
+                if num_cust == 0: stop_reason = "no customers"; break
+                is_large_destroy = (small_destroy_counter >= config.SMALL_DESTROY_SEGMENT_LENGTH)
+                if is_large_destroy:
+                    q_percentage = rng.uniform(*config.Q_LARGE_RANGE); small_destroy_counter = 0
+                else:
+                    q_percentage = rng.uniform(*config.Q_SMALL_RANGE); small_destroy_counter += 1
+                q = max(2, int(num_cust * q_percentage))
+
+                candidates = [(operator_selector.select_destroy_operator(), operator_selector.select_repair_operator(), candidate_seed)
+                              for candidate_seed in candidate_seeds.spawn(batch_size)]
+                if version != published_version:
+                    shared_state['current'] = (version, current_record); published_version = version
+                futures = [executor.submit(_evaluate_candidate, version, d.name, r.name, seed, q) for d, r, seed in candidates]
+                results = [future.result() for future in futures]
+                evaluated += len(results)
+                # Mọi ứng viên đều đã được tính vào times_used khi chọn, nên thời gian của từng ứng viên đều được ghi nhận
+                for (destroy_op, repair_op, _), result in zip(candidates, results):
+                    operator_selector.record_time(destroy_op, result['destroy_time'])
+                    operator_selector.record_time(repair_op, result['repair_time'])
+                    if 'profile' in result: merge_profile_stats(result['profile'])
+
+                # Ứng viên tốt nhất không phải trạng thái đã thăm (trừ khi nó cải thiện lời giải hiện tại)
+                order = sorted(range(len(results)), key=lambda k: results[k]['cost'])
+                chosen = next((k for k in order if results[k]['cost'] < current_cost or visited_states is None
+                               or results[k]['fingerprint'] not in visited_states), None)
+                destroy_op_obj, repair_op_obj, _ = candidates[order[0] if chosen is None else chosen]
+                cost_after_change = results[chosen]['cost'] if chosen is not None else current_cost
+                is_revisit = chosen is not None and visited_states is not None and results[chosen]['fingerprint'] in visited_states
+                sigma_update = 0
+                accepted = False
+
+                if chosen is None:
+                    pass
+                elif cost_after_change < current_cost:
+                    accepted = True
+                    if cost_after_change < best_cost:
+                        sigma_update = config.SIGMA_1_NEW_BEST
+                    elif not is_revisit:
+                        sigma_update = config.SIGMA_2_BETTER
+                elif T > 1e-6 and rng.random() < math.exp(-(cost_after_change - current_cost) / T):
+                    accepted = True
+                    sigma_update = config.SIGMA_3_ACCEPTED
+
+                cost_before_change = current_cost
+                if accepted:
+                    current_record, current_cost, version = apply_solution_delta(current_record, results[chosen]['delta']), cost_after_change, version + 1
+                    if visited_states is not None: visited_states.add(results[chosen]['fingerprint'])
+                    operator_selector.update_scores(destroy_op_obj, repair_op_obj, sigma_update)
+                    if cost_after_change < best_cost: best_record, best_cost = current_record, cost_after_change
+
+                if sigma_update == config.SIGMA_1_NEW_BEST: iterations_without_improvement = 0; iterations_since_best = 0
+                else: iterations_without_improvement += 1; iterations_since_best += 1
+                if iterations_without_improvement >= config.RESTART_THRESHOLD:
+                    log(f"  >>> Restart triggered at iter {i}. Resetting to best known solution. <<<", LogLevel.DEBUG)
+                    current_record, current_cost, version = best_record, best_cost, version + 1
+                    iterations_without_improvement = 0
+
+                time_fraction = stopping.time_fraction()
+                if time_fraction is None: T *= config.COOLING_RATE
+                else: T = T_start * config.TIME_BUDGET_FINAL_TEMP_RATIO ** time_fraction
+
+                if i % config.SEGMENT_LENGTH == 0:
+                    operator_selector.update_weights()
+                    operator_history.append(i, [op.weight for op in operator_selector.destroy_ops],
+                                            [op.weight for op in operator_selector.repair_ops])
+
+                move_type = MoveType.REJECTED
+                if sigma_update == config.SIGMA_1_NEW_BEST: move_type = MoveType.NEW_BEST
+                elif accepted and cost_after_change < cost_before_change: move_type = MoveType.BETTER
+                elif accepted: move_type = MoveType.SA_ACCEPTED
+                if sink.enabled:
+                    sink.emit(ProgressEvent(i, best_cost, current_cost, cost_after_change, T,
+                                            destroy_ids[destroy_op_obj.name], repair_ids[repair_op_obj.name], move_type, q))
+
+                history.append(i, best_cost, current_cost, T, move_type, q, is_large_destroy)
+
+    finally:
+        if progress_sink is None: sink.close()
+    elapsed = time.time() - start_time
+    best_state = decode_solution(best_record, problem)
+    print(f"\n--- Batched ALNS phase complete ({stop_reason}, {i} iterations, {stopping.elapsed():.2f}s). Best cost found: {best_state.cost:.2f} ---")
+    print(f"  Evaluated neighbors: {evaluated} ({evaluated / elapsed if elapsed > 0 else 0.0:.1f}/s)")
+    print("  Operator timing (summed over workers):\n" + operator_selector.timing_report())
+    return best_state, (history, operator_history)
+
+# --- END OF FILE parallel_alns.py ---
@@ -1,33 +1,37 @@
 # --- START OF FILE solution_generator.py (UPDATED) ---
 
-import random
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
 
 # Sử dụng relative import để trỏ đến các module khác
 from ..core.data_structures import VRP2E_State, Solution, SERoute, FERoute
 from .lns.insertion_logic import InsertionProcessor, find_best_global_insertion_option, _recalculate_fe_route_and_check_feasibility
 from .lns_algorithm import run_local_search_phase
+from ..utils.logger import LogLevel, log
+from ..utils.rng import resolve_rng
 from .lns.destroy_operators import random_removal
 from .lns.repair_operators import greedy_repair
 
 if TYPE_CHECKING:
     from ..core.problem_parser import ProblemInstance
 
-def create_integrated_initial_solution(problem: "ProblemInstance", random_customers: bool = True) -> VRP2E_State:
+def create_integrated_initial_solution(problem: "ProblemInstance", random_customers: bool = True,
+                                       rng: Optional[np.random.Generator] = None) -> VRP2E_State:
     """
-    Tạo lời giải ban đầu bằng cách chèn tham lam tuần tự.
+    Tạo lời giải ban đầu bằng cách chèn tham lam tuần tự (thứ tự khách hàng xáo trộn bằng rng).
     """
     solution = Solution(problem)
     insertion_processor = InsertionProcessor(problem)
     customers_to_serve = list(problem.customers)
     if random_customers:
-        random.shuffle(customers_to_serve)
+        resolve_rng(rng).shuffle(customers_to_serve)
     
     solution.unserved_customers = []
 
     print("--- Phase 1a: Greedy Insertion Construction ---")
     for i, customer in enumerate(customers_to_serve):
-        print(f"  -> Processing customer {i+1}/{len(customers_to_serve)} (ID: {customer.id})...", end='\r')
+        log(f"  -> Processing customer {i+1}/{len(customers_to_serve)} (ID: {customer.id})...", LogLevel.DEBUG, end='\r')
         
         best_option = find_best_global_insertion_option(customer, solution, insertion_processor)
         option_type = best_option.get('type')
@@ -56,19 +60,22 @@ def create_integrated_initial_solution(problem: "ProblemInstance", random_custom
             _recalculate_fe_route_and_check_feasibility(fe_route, problem)
         else: 
             solution.unserved_customers.append(customer)
-            print(f"\nWarning: Could not serve customer {customer.id}")
+            log(f"\nWarning: Could not serve customer {customer.id}", LogLevel.WARNING)
 
     print("\n\n>>> Greedy construction complete!")
     return VRP2E_State(solution)
 
 
 # ĐỔI TÊN HÀM NÀY
-def generate_initial_solution(problem: "ProblemInstance", lns_iterations: int, q_percentage: float) -> VRP2E_State:
+def generate_initial_solution(problem: "ProblemInstance", lns_iterations: int, q_percentage: float,
+                              rng: Optional[np.random.Generator] = None) -> VRP2E_State:
     """
     Hàm điều phối chính để tạo lời giải ban đầu, bao gồm xây dựng và tinh chỉnh cục bộ.
+    Mọi lựa chọn ngẫu nhiên dùng rng của lượt chạy (mặc định: bộ sinh dùng chung, xem utils.rng).
     """
+    rng = resolve_rng(rng)
     # Bước 1: Tạo lời giải rất cơ bản bằng chèn tham lam
-    initial_state = create_integrated_initial_solution(problem)
+    initial_state = create_integrated_initial_solution(problem, rng=rng)
     initial_cost = initial_state.cost
     print(f"--- Phase 1a Complete. Pre-LNS Cost: {initial_cost:.2f} ---")
 
@@ -80,7 +87,8 @@ def generate_initial_solution(problem: "ProblemInstance", lns_iterations: int, q
             iterations=lns_iterations,
             q_percentage=q_percentage,
             destroy_op=random_removal,
-            repair_op=greedy_repair
+            repair_op=greedy_repair,
+            rng=rng
         )
     else:
         final_state = initial_state
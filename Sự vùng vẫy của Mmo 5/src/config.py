@@ -47,6 +47,12 @@ SIGMA_1_NEW_BEST = 9
 SIGMA_2_BETTER = 5
 # Điểm thưởng khi chấp nhận một lời giải (kể cả tệ hơn)
 SIGMA_3_ACCEPTED = 2
+# True: trọng số được cập nhật theo điểm trên mỗi giây chạy của toán tử trong segment (quy về
+# cùng thang đo bằng thời gian trung bình mỗi lần gọi của nhóm destroy/repair) thay vì điểm
+# trên mỗi lần dùng, để ưu tiên toán tử cải thiện nhiều nhất trên mỗi giây CPU.
+TIME_NORMALIZED_WEIGHTS = False
+# Số thời lượng gần nhất của mỗi toán tử được giữ lại để tính phân vị (p50/p90/p99).
+OPERATOR_TIMING_SAMPLES = 10000
 
 # ----- 3.3. Các tham số cho Logic Điều khiển ALNS Nâng cao (GIAI ĐOẠN 2) -----
 # Khoảng tỷ lệ phá hủy cho chế độ "phá hủy nhỏ"
@@ -58,11 +64,74 @@ SMALL_DESTROY_SEGMENT_LENGTH = 500
 # Số lần lặp không cải thiện lời giải tốt nhất trước khi khởi động lại
 RESTART_THRESHOLD = 5000
 
+# Số fingerprint lời giải đã chấp nhận được ghi nhớ để phát hiện trạng thái lặp lại.
+# Lời giải lặp lại không được SA chấp nhận và không được cộng điểm cho toán tử. 0 = tắt.
+VISITED_STATE_CACHE_SIZE = 10000
+
+# ----- 3.4. Cơ chế giao dịch (ChangeContext) -----
+# "UNDO_LOG": ghi lại các thao tác cơ bản và hoàn tác bằng thao tác nghịch đảo
+#             (chi phí rollback tỉ lệ với số thao tác của nước đi).
+# "MEMENTO":  sao lưu copy-on-write toàn bộ trạng thái route khi bị thay đổi.
+TRANSACTION_MODE = "UNDO_LOG"
+
+# ----- 3.5. Chế độ debug -----
+# Cứ mỗi N vòng lặp ALNS, kiểm tra tính khả thi của lời giải hiện tại bằng
+# check_solution_feasibility và dừng (AssertionError) nếu có vi phạm. 0 = tắt.
+VALIDATION_INTERVAL = 0
+# True: đo số lần gọi và thời gian của các điểm nóng (chèn, tính lại FE route, lịch trình SE,
+# sao chép trạng thái, customer map, rollback) và ghi profile.txt cạnh log.txt.
+# False: không có chi phí đo nào (các hàm gốc không bị bọc).
+PROFILE_HOT_PATHS = False
+
+# ----- 3.6. Song song hóa -----
+# Số tiến trình chạy ALNS song song (multi-start với các seed khác nhau).
+# 1 = chạy tuần tự như cũ, 0 = dùng toàn bộ số lõi CPU (os.cpu_count()).
+PARALLEL_WORKERS = 1
+# "INDEPENDENT": các worker chạy độc lập, lấy kết quả tốt nhất.
+# "ISLAND": mô hình đảo - các worker công bố lời giải tốt nhất và gộp trọng số toán tử
+#           mỗi ISLAND_EXCHANGE_INTERVAL vòng lặp; worker trì trệ (RESTART_THRESHOLD vòng
+#           không cải thiện) sẽ nhận lời giải tốt nhất toàn cục thay cho việc tự khởi động lại.
+PARALLEL_MODE = "INDEPENDENT"
+ISLAND_EXCHANGE_INTERVAL = 500
+# "BATCHED": một quỹ đạo duy nhất; mỗi vòng lặp đánh giá song song SPECULATIVE_BATCH_SIZE
+#            ứng viên (destroy, repair, seed) và chỉ giữ lại ứng viên tốt nhất (0 = bằng số worker).
+SPECULATIVE_BATCH_SIZE = 0
+
+# ----- 3.7. Điều kiện dừng theo thời gian -----
+# Ngân sách thời gian thực (giây) cho một pha ALNS; None = chỉ dừng theo số vòng lặp.
+# Khi có ngân sách, nhiệt độ giảm theo thời gian đã dùng: T = T0 * RATIO^(t / ngân sách).
+ALNS_TIME_LIMIT = None
+TIME_BUDGET_FINAL_TEMP_RATIO = 1e-3
+# Dừng sau số vòng lặp liên tiếp không tìm được lời giải tốt nhất mới; None = tắt.
+ALNS_MAX_NO_IMPROVEMENT = None
+
+# ----- 3.8. Báo cáo tiến trình -----
+# Nơi nhận sự kiện tiến trình của từng vòng lặp ALNS/LNS:
+# "null" (tắt, gần như không tốn chi phí), "console" (in tối đa 1 dòng mỗi
+# PROGRESS_CONSOLE_INTERVAL giây), "binary" (ghi progress.bin trong thư mục kết quả).
+PROGRESS_SINK = "console"
+PROGRESS_CONSOLE_INTERVAL = 1.0
+# Lịch sử ALNS (dùng để vẽ biểu đồ, lưu alns_history.npz) chỉ giữ 1 trong mỗi N vòng lặp
+# (cùng mọi vòng lặp tìm được best mới). Thống kê loại nước đi vẫn tính trên mọi vòng lặp.
+HISTORY_DECIMATION = 1
+
+# ----- 3.9. Ghi log -----
+# Mức thông báo tối thiểu được in: "DEBUG" (tất cả, kể cả tiến trình từng vòng lặp và các
+# thông báo khởi động lại), "INFO", "WARNING", "ERROR". Dùng "INFO" khi chạy thực tế.
+LOG_LEVEL = "DEBUG"
+# log.txt được ghi bởi một luồng nền: hàng đợi tối đa LOG_QUEUE_SIZE thông điệp (đầy thì
+# luồng giải phải chờ), mỗi lần ghi tối đa LOG_BATCH_SIZE thông điệp, file được đẩy xuống
+# đĩa tối đa một lần mỗi LOG_FLUSH_INTERVAL giây.
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 1.0
+
 
 # ==============================================================================
 # 4. CẤU HÌNH CHUNG
 # ==============================================================================
-# Hạt giống cho bộ sinh số ngẫu nhiên để đảm bảo kết quả có thể lặp lại
+# Hạt giống cho bộ sinh số ngẫu nhiên để đảm bảo kết quả có thể lặp lại. Mỗi lượt chạy dùng một
+# numpy Generator riêng (utils.rng); worker song song và các cụm nhận luồng con qua SeedSequence
 RANDOM_SEED = 42
 
 # ==============================================================================
@@ -110,6 +179,15 @@ K_CLUSTERS_RANGE = range(2, 10)
 # (ví dụ: 15 giờ * 60 phút = 900 phút)
 MAX_SCHEDULING_FLEXIBILITY = 900.0
 
+# Lập lịch các cụm trên các tiến trình: khối lượng công việc của cụm được ước lượng
+# bằng (số khách)^CLUSTER_WORK_EXPONENT * (1 + độ chặt time window), cụm nặng nhất chạy trước.
+CLUSTER_WORK_EXPONENT = 1.5
+# Nếu True, số vòng lặp ALNS của mỗi cụm được co giãn theo khối lượng ước lượng để các
+# cụm kết thúc gần cùng lúc (cụm trung bình giữ ALNS_MAIN_ITERATIONS), giới hạn trong
+# khoảng CLUSTER_ITERATION_SCALE_BOUNDS (bội số của ALNS_MAIN_ITERATIONS).
+SCALE_CLUSTER_ITERATIONS = False
+CLUSTER_ITERATION_SCALE_BOUNDS = (0.25, 4.0)
+
 # Lưu ý: Các tham số về xe (SE_VEHICLE_SPEED, FE_VEHICLE_SPEED, ...) đã có trong
 # config của ALNS nên không cần thêm lại. Chúng ta sẽ sử dụng chung.
 
@@ -122,3 +200,34 @@ MAX_SCHEDULING_FLEXIBILITY = 900.0
 # Thư mục gốc để lưu tất cả kết quả chạy
 RESULTS_BASE_DIR = "results"
 
+# ==============================================================================
+# 10. CẤU HÌNH BENCHMARK (run_benchmark.py)
+# ==============================================================================
+# Số khách hàng của các instance tổng hợp (sinh bằng generate_cus.py, mỗi kích thước một seed cố định)
+BENCHMARK_SIZES = (100, 500, 1000, 5000)
+# Số vòng lặp ALNS cố định cho mỗi instance (đo số vòng lặp/giây và chi phí cuối cùng)
+BENCHMARK_ALNS_ITERATIONS = 200
+# Số vệ tinh = max(BENCHMARK_MIN_SATELLITES, số khách // BENCHMARK_CUSTOMERS_PER_SATELLITE)
+BENCHMARK_CUSTOMERS_PER_SATELLITE = 100
+BENCHMARK_MIN_SATELLITES = 3
+# Tải trọng xe FE/SE và tốc độ xe (mét/phút, tọa độ instance là UTM) của instance tổng hợp
+BENCHMARK_FE_CAPACITY = 1500
+BENCHMARK_SE_CAPACITY = 300
+BENCHMARK_VEHICLE_SPEED = 350.0
+# Thư mục chứa instance đã sinh (dùng lại giữa các lần chạy) và file kết quả benchmark_*.json.
+# Tách riêng khỏi RESULTS_BASE_DIR để không bị xóa bởi CLEAR_OLD_RESULTS_ON_START.
+BENCHMARK_DIR = "benchmarks"
+
+# ----- 10.1. Micro-benchmark (run_microbenchmarks.py) -----
+# Kích thước instance tổng hợp dùng để dựng route/lời giải cho các phép đo
+MICROBENCH_INSTANCE_SIZE = 500
+# Thời gian chạy tối thiểu (giây) của mỗi phép đo (ít nhất MICROBENCH_MIN_OPS lần gọi)
+MICROBENCH_MIN_TIME = 0.5
+MICROBENCH_MIN_OPS = 20
+# Số lần gọi được đo cấp phát bộ nhớ (tracemalloc, chạy riêng sau phần đo thời gian)
+MICROBENCH_ALLOC_SAMPLES = 50
+# Độ dài SE route (số khách), số SE route trên một FE route và số khách bị phá hủy trước rollback
+MICROBENCH_ROUTE_LENGTHS = (5, 10, 20, 40)
+MICROBENCH_SE_ROUTES_PER_FE = (1, 2, 4, 8)
+MICROBENCH_ROLLBACK_Q = (2, 10, 50)
+
@@ -2,15 +2,92 @@
 
 from __future__ import annotations
 import copy
-from typing import Dict, List, Set, TYPE_CHECKING
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
 
 from .. import config
-from .transaction import RouteMemento
+from .transaction import RouteMemento, new_route_version, active_undo_log
 
 if TYPE_CHECKING:
     from .problem_parser import ProblemInstance, Customer, Satellite, PickupCustomer
-class FERoute:
+    from .transaction import ChangeContext
+
+
+# --- Khóa Zobrist cho dấu vân tay (fingerprint) của lời giải ---
+# Mỗi cung (a, b) của SE route có một khóa 64-bit giả ngẫu nhiên (tính bằng
+# splitmix64 thay vì bảng N×N). Hash của SE route là XOR các khóa cung nên cập
+# nhật được O(1) khi chèn/xóa; FE route gộp hash (đã trộn) của các SE route nó
+# phục vụ, và Solution gộp hash (đã trộn) của các FE route.
+_MASK64 = (1 << 64) - 1
+
+def _splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+def _arc_key(from_id: int, to_id: int) -> int:
+    return _splitmix64((from_id << 32) | to_id)
+
+def _mix_se_hash(se_hash: int) -> int:
+    return _splitmix64(se_hash ^ 0x5E5E5E5E5E5E5E5E)
+
+def _mix_fe_hash(fe_hash: int) -> int:
+    return _splitmix64(fe_hash ^ 0xFEFEFEFEFEFEFEFE)
+
+
+class _TrackedRoute:
+    """
+    Phần dùng chung của FERoute/SERoute cho cơ chế sao lưu copy-on-write:
+    mỗi thay đổi đều đi qua _on_modify() để giao dịch đang theo dõi route kịp
+    chụp trạng thái cũ, và để phiên bản của route được tăng lên.
+    """
+    _version: int = 0
+    _memento: Optional[RouteMemento] = None
+    _pending_context: Optional["ChangeContext"] = None
+
+    def _on_modify(self):
+        context = self._pending_context
+        if context is not None:
+            self._pending_context = None
+            context.capture_route(self)
+        self._version = new_route_version()
+
+    def _log_attrs(self, *attr_names: str):
+        """Ghi giá trị cũ của các thuộc tính sắp bị gán lại vào undo log (nếu có)."""
+        undo_log = active_undo_log()
+        if undo_log is not None:
+            undo_log.append(('attrs', self, {name: getattr(self, name) for name in attr_names}))
+
+    def _log_set_change(self, attr_name: str, item, added: bool):
+        undo_log = active_undo_log()
+        if undo_log is not None:
+            undo_log.append(('set_add' if added else 'set_discard', self, attr_name, item))
+
+    def backup(self) -> RouteMemento:
+        # Route chưa đổi kể từ lần chụp trước -> dùng lại ảnh chụp bất biến đó.
+        if self._memento is None or self._memento.version != self._version:
+            self._memento = RouteMemento(self)
+        return self._memento
+
+    def __getstate__(self):
+        # Không sao chép/pickle bộ đệm memento và giao dịch đang theo dõi.
+        state = self.__dict__.copy()
+        state.pop('_memento', None); state.pop('_pending_context', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._version = new_route_version()
+
+
+_FE_STATE_ATTRS = ('serviced_se_routes', 'schedule', 'total_dist', 'total_time', 'total_travel_time', 'route_deadline', 'zobrist_hash')
+_SE_TOTAL_ATTRS = ('total_dist', 'total_travel_time', 'total_load_pickup', 'total_load_delivery', 'zobrist_hash')
+_SE_STATE_ATTRS = ('nodes_id', 'service_start_times', 'waiting_times', 'forward_time_slacks', 'serving_fe_routes') + _SE_TOTAL_ATTRS
+
+
+class FERoute(_TrackedRoute):
     def __init__(self, problem: "ProblemInstance"):
+        self._version = new_route_version()
         self.problem = problem
         self.serviced_se_routes: Set[SERoute] = set()
         self.schedule: List[Dict] = []
@@ -18,6 +95,7 @@ class FERoute:
         self.total_time: float = 0.0
         self.total_travel_time: float = 0.0
         self.route_deadline: float = float('inf')
+        self.zobrist_hash: int = 0
 
     def __repr__(self) -> str:
         if not self.schedule: return "--- Empty FERoute ---"
@@ -36,10 +114,32 @@ class FERoute:
                          f"{event['arrival_time']:>9.2f}| {event['departure_time']:>11.2f}")
         return "\n".join(lines)
 
-    def add_serviced_se_route(self, se_route: "SERoute"): self.serviced_se_routes.add(se_route)
-    def remove_serviced_se_route(self, se_route: "SERoute"): self.serviced_se_routes.discard(se_route)
+    def add_serviced_se_route(self, se_route: "SERoute"):
+        if se_route in self.serviced_se_routes: return
+        self._on_modify(); self._log_set_change('serviced_se_routes', se_route, added=True)
+        self.serviced_se_routes.add(se_route)
+        self._toggle_se_hash(se_route.zobrist_hash)
+    def remove_serviced_se_route(self, se_route: "SERoute"):
+        if se_route not in self.serviced_se_routes: return
+        self._on_modify(); self._log_set_change('serviced_se_routes', se_route, added=False)
+        self.serviced_se_routes.discard(se_route)
+        self._toggle_se_hash(se_route.zobrist_hash)
+
+    def _toggle_se_hash(self, *se_hashes: int):
+        """Thêm/bớt (XOR) đóng góp của các SE route vào hash của FE route."""
+        self._on_modify()
+        self._log_attrs('zobrist_hash')
+        for se_hash in se_hashes: self.zobrist_hash ^= _mix_se_hash(se_hash)
+
+    def set_schedule(self, schedule: List[Dict]):
+        self._on_modify()
+        self._log_attrs('schedule')
+        self.schedule = schedule
+        self.calculate_route_properties()
     
     def calculate_route_properties(self):
+        self._on_modify()
+        self._log_attrs('total_dist', 'total_time', 'total_travel_time', 'route_deadline')
         if len(self.schedule) < 2: 
             self.total_dist, self.total_time, self.total_travel_time, self.route_deadline = 0.0, 0.0, 0.0, float('inf')
             return
@@ -54,18 +154,23 @@ class FERoute:
         deadlines = {c.deadline for se in self.serviced_se_routes for c in se.get_customers() if hasattr(c, 'deadline')}
         self.route_deadline = min(deadlines) if deadlines else float('inf')
 
-    def backup(self) -> RouteMemento: return RouteMemento(self)
     def restore(self, memento: RouteMemento):
-        self.serviced_se_routes = memento.serviced_se_routes
-        self.schedule = memento.schedule
+        if memento.version == self._version: return
+        self._on_modify()
+        self._log_attrs(*_FE_STATE_ATTRS)
+        self.serviced_se_routes = set(memento.serviced_se_routes)
+        self.schedule = list(memento.schedule)
         self.total_dist = memento.total_dist
         self.total_time = memento.total_time
         self.total_travel_time = memento.total_travel_time
         self.route_deadline = memento.route_deadline
+        self.zobrist_hash = memento.zobrist_hash
+        self._version, self._memento = memento.version, memento
 
 
-class SERoute:
+class SERoute(_TrackedRoute):
     def __init__(self, satellite: "Satellite", problem: "ProblemInstance", start_time: float = 0.0):
+        self._version = new_route_version()
         self.problem = problem
         self.satellite = satellite
         self.nodes_id: List[int] = [satellite.dist_id, satellite.coll_id]
@@ -77,30 +182,52 @@ class SERoute:
         self.total_travel_time: float = 0.0
         self.total_load_pickup: float = 0.0
         self.total_load_delivery: float = 0.0
+        self.zobrist_hash: int = _arc_key(satellite.dist_id, satellite.coll_id)
         self.calculate_full_schedule_and_slacks()
 
-    def calculate_full_schedule_and_slacks(self):
+    def calculate_full_schedule_and_slacks(self, start_time: Optional[float] = None):
+        # Lịch trình được dựng trên các dict MỚI rồi mới gán lại, để undo log chỉ
+        # cần giữ tham chiếu tới các dict cũ thay vì sao chép chúng.
+        self._on_modify()
+        self._log_attrs('service_start_times', 'waiting_times', 'forward_time_slacks')
+        first_id, last_id = self.nodes_id[0], self.nodes_id[-1]
+        service_start_times = {first_id: self.service_start_times.get(first_id, 0.0) if start_time is None else start_time}
+        waiting_times = {first_id: self.waiting_times.get(first_id, 0.0)}
+        forward_time_slacks = {last_id: self.forward_time_slacks.get(last_id, float('inf'))}
         for i in range(len(self.nodes_id) - 1):
             prev_id, curr_id = self.nodes_id[i], self.nodes_id[i+1]
             prev_obj = self.problem.node_objects[prev_id % self.problem.total_nodes]
             curr_obj = self.problem.node_objects[curr_id % self.problem.total_nodes]
             st_prev = prev_obj.service_time if prev_obj.type != 'Satellite' else 0.0
-            departure_prev = self.service_start_times.get(prev_id, 0.0) + st_prev
+            departure_prev = service_start_times.get(prev_id, 0.0) + st_prev
             arrival_curr = departure_prev + self.problem.get_travel_time(prev_obj.id, curr_obj.id)
             start_service = max(arrival_curr, getattr(curr_obj, 'ready_time', 0))
-            self.service_start_times[curr_id] = start_service
-            self.waiting_times[curr_id] = start_service - arrival_curr
+            service_start_times[curr_id] = start_service
+            waiting_times[curr_id] = start_service - arrival_curr
         n = len(self.nodes_id)
-        if self.nodes_id: self.forward_time_slacks.setdefault(self.nodes_id[n-1], float('inf'))
         for i in range(n - 2, -1, -1):
             node_id, succ_id = self.nodes_id[i], self.nodes_id[i+1]
             node_obj = self.problem.node_objects[node_id % self.problem.total_nodes]
             due_time = getattr(node_obj, 'due_time', float('inf'))
             st_node = node_obj.service_time if node_obj.type != 'Satellite' else 0.0
-            departure_node = self.service_start_times.get(node_id, 0.0) + st_node
-            arrival_succ = self.service_start_times.get(succ_id, 0.0) - self.waiting_times.get(succ_id, 0.0)
+            departure_node = service_start_times.get(node_id, 0.0) + st_node
+            arrival_succ = service_start_times.get(succ_id, 0.0) - waiting_times.get(succ_id, 0.0)
             slack_between = arrival_succ - departure_node
-            self.forward_time_slacks[node_id] = min(self.forward_time_slacks.get(succ_id, float('inf')) + slack_between, due_time - self.service_start_times.get(node_id, 0.0))
+            forward_time_slacks[node_id] = min(forward_time_slacks.get(succ_id, float('inf')) + slack_between, due_time - service_start_times.get(node_id, 0.0))
+        self.service_start_times, self.waiting_times, self.forward_time_slacks = service_start_times, waiting_times, forward_time_slacks
+
+    def set_start_time(self, start_time: float):
+        """Đặt thời điểm xuất phát tại vệ tinh và tính lại lịch trình."""
+        self.calculate_full_schedule_and_slacks(start_time)
+
+    def add_serving_fe_route(self, fe_route: "FERoute"):
+        if fe_route in self.serving_fe_routes: return
+        self._on_modify(); self._log_set_change('serving_fe_routes', fe_route, added=True)
+        self.serving_fe_routes.add(fe_route)
+    def remove_serving_fe_route(self, fe_route: "FERoute"):
+        if fe_route not in self.serving_fe_routes: return
+        self._on_modify(); self._log_set_change('serving_fe_routes', fe_route, added=False)
+        self.serving_fe_routes.discard(fe_route)
 
     def __repr__(self) -> str:
         path_ids = [nid % self.problem.total_nodes for nid in self.nodes_id]
@@ -135,6 +262,11 @@ class SERoute:
         prev_obj = self.problem.node_objects[self.nodes_id[pos-1] % self.problem.total_nodes]; succ_obj = self.problem.node_objects[self.nodes_id[pos] % self.problem.total_nodes]
         dist_change = (self.problem.get_distance(prev_obj.id, customer.id) + self.problem.get_distance(customer.id, succ_obj.id) - self.problem.get_distance(prev_obj.id, succ_obj.id))
         time_change = (self.problem.get_travel_time(prev_obj.id, customer.id) + self.problem.get_travel_time(customer.id, succ_obj.id) - self.problem.get_travel_time(prev_obj.id, succ_obj.id))
+        self._on_modify()
+        undo_log = active_undo_log()
+        if undo_log is not None: undo_log.append(('se_insert', self, pos, {name: getattr(self, name) for name in _SE_TOTAL_ATTRS}))
+        prev_id, succ_id = self.nodes_id[pos-1], self.nodes_id[pos]
+        self._update_hash(_arc_key(prev_id, succ_id) ^ _arc_key(prev_id, customer.id) ^ _arc_key(customer.id, succ_id))
         self.nodes_id.insert(pos, customer.id); self.total_dist += dist_change; self.total_travel_time += time_change
         if customer.type == 'DeliveryCustomer': self.total_load_delivery += customer.demand
         else: self.total_load_pickup += customer.demand
@@ -146,23 +278,76 @@ class SERoute:
         prev_obj = self.problem.node_objects[self.nodes_id[pos-1] % self.problem.total_nodes]; succ_obj = self.problem.node_objects[self.nodes_id[pos+1] % self.problem.total_nodes]
         dist_change = (self.problem.get_distance(prev_obj.id, customer.id) + self.problem.get_distance(customer.id, succ_obj.id) - self.problem.get_distance(prev_obj.id, succ_obj.id))
         time_change = (self.problem.get_travel_time(prev_obj.id, customer.id) + self.problem.get_travel_time(customer.id, succ_obj.id) - self.problem.get_travel_time(prev_obj.id, succ_obj.id))
+        self._on_modify()
+        undo_log = active_undo_log()
+        if undo_log is not None: undo_log.append(('se_remove', self, pos, customer.id, {name: getattr(self, name) for name in _SE_TOTAL_ATTRS}))
+        prev_id, succ_id = self.nodes_id[pos-1], self.nodes_id[pos+1]
+        self._update_hash(_arc_key(prev_id, succ_id) ^ _arc_key(prev_id, customer.id) ^ _arc_key(customer.id, succ_id))
         self.total_dist -= dist_change; self.total_travel_time -= time_change; self.nodes_id.pop(pos)
         if customer.type == 'DeliveryCustomer': self.total_load_delivery -= customer.demand
         else: self.total_load_pickup -= customer.demand
         self.calculate_full_schedule_and_slacks()
+
+    def remove_customers(self, customer_ids: Set[int]):
+        """
+        Xóa nhiều khách hàng trong một lượt: dựng nodes_id mới, cập nhật tổng chi phí/tải và
+        hash theo các cung thay đổi, rồi chỉ tính lại lịch trình một lần (thay vì mỗi khách một lần).
+        Undo log chỉ giữ tham chiếu tới list nodes_id cũ (không sao chép).
+        """
+        old_nodes = self.nodes_id
+        new_nodes = [nid for nid in old_nodes if nid not in customer_ids]
+        if len(new_nodes) == len(old_nodes): return
+        self._on_modify()
+        self._log_attrs('nodes_id', *_SE_TOTAL_ATTRS)
+        problem = self.problem; total_nodes = problem.total_nodes
+        # Mỗi chuỗi khách hàng bị xóa liên tiếp a -> x ... y -> b được thay bằng cung a -> b
+        arc_delta, dist_change, time_change = 0, 0.0, 0.0
+        prev_kept, in_removed_run = old_nodes[0], False
+        for j in range(1, len(old_nodes)):
+            prev_id, node_id = old_nodes[j-1], old_nodes[j]
+            if node_id in customer_ids:
+                customer = problem.node_objects[node_id]
+                if customer.type == 'DeliveryCustomer': self.total_load_delivery -= customer.demand
+                else: self.total_load_pickup -= customer.demand
+            elif not in_removed_run:
+                prev_kept = node_id; continue
+            else:
+                arc_delta ^= _arc_key(prev_kept, node_id)
+                dist_change -= problem.get_distance(prev_kept % total_nodes, node_id % total_nodes)
+                time_change -= problem.get_travel_time(prev_kept % total_nodes, node_id % total_nodes)
+            arc_delta ^= _arc_key(prev_id, node_id)
+            dist_change += problem.get_distance(prev_id % total_nodes, node_id % total_nodes)
+            time_change += problem.get_travel_time(prev_id % total_nodes, node_id % total_nodes)
+            in_removed_run = node_id in customer_ids
+            if not in_removed_run: prev_kept = node_id
+        self.nodes_id = new_nodes
+        self.total_dist -= dist_change; self.total_travel_time -= time_change
+        self._update_hash(arc_delta)
+        self.calculate_full_schedule_and_slacks()
         
+    def _update_hash(self, arc_delta: int):
+        old_hash = self.zobrist_hash
+        self.zobrist_hash = old_hash ^ arc_delta
+        for fe_route in self.serving_fe_routes: fe_route._toggle_se_hash(old_hash, self.zobrist_hash)
+
     def get_customers(self) -> List["Customer"]: return [self.problem.node_objects[nid] for nid in self.nodes_id[1:-1]]
-    def backup(self) -> RouteMemento: return RouteMemento(self)
+    @property
+    def num_customers(self) -> int: return len(self.nodes_id) - 2
     def restore(self, memento: RouteMemento):
-        self.nodes_id = memento.nodes_id
+        if memento.version == self._version: return
+        self._on_modify()
+        self._log_attrs(*_SE_STATE_ATTRS)
+        self.nodes_id = list(memento.nodes_id)
         self.total_dist = memento.total_dist
         self.total_travel_time = memento.total_travel_time
         self.total_load_pickup = memento.total_load_pickup
         self.total_load_delivery = memento.total_load_delivery
-        self.service_start_times = memento.service_start_times
-        self.waiting_times = memento.waiting_times
-        self.forward_time_slacks = memento.forward_time_slacks
-        self.serving_fe_routes = memento.serving_fe_routes
+        self.zobrist_hash = memento.zobrist_hash
+        self.service_start_times = dict(memento.service_start_times)
+        self.waiting_times = dict(memento.waiting_times)
+        self.forward_time_slacks = dict(memento.forward_time_slacks)
+        self.serving_fe_routes = set(memento.serving_fe_routes)
+        self._version, self._memento = memento.version, memento
 
 class Solution:
     def __init__(self, problem: "ProblemInstance"):
@@ -170,18 +355,52 @@ class Solution:
         self.fe_routes: List[FERoute] = []
         self.se_routes: List[SERoute] = []
         self.customer_to_se_route_map: Dict[int, SERoute] = {}
+        # Chỉ mục satellite id -> các SE route xuất phát từ vệ tinh đó (cập nhật cùng customer_to_se_route_map)
+        self.satellite_to_se_routes: Dict[int, List[SERoute]] = {}
         self.unserved_customers: List["Customer"] = []
 
-    def add_fe_route(self, fe_route: FERoute): self.fe_routes.append(fe_route)
-    def add_se_route(self, se_route: SERoute): self.se_routes.append(se_route); self.update_customer_map()
+    def add_fe_route(self, fe_route: FERoute): self._append_route('fe_routes', fe_route)
+    def add_se_route(self, se_route: SERoute): self._append_route('se_routes', se_route); self.update_customer_map()
     def remove_fe_route(self, fe_route: FERoute):
-        if fe_route in self.fe_routes: self.fe_routes.remove(fe_route)
+        if fe_route in self.fe_routes: self._remove_route('fe_routes', fe_route)
     def remove_se_route(self, se_route: SERoute):
-        if se_route in self.se_routes: self.se_routes.remove(se_route)
+        if se_route in self.se_routes: self._remove_route('se_routes', se_route)
         self.update_customer_map()
-    def link_routes(self, fe_route: FERoute, se_route: SERoute): fe_route.add_serviced_se_route(se_route); se_route.serving_fe_routes.add(fe_route)
-    def unlink_routes(self, fe_route: FERoute, se_route: SERoute): fe_route.remove_serviced_se_route(se_route); se_route.serving_fe_routes.discard(fe_route)
-    def update_customer_map(self): self.customer_to_se_route_map = {c.id: r for r in self.se_routes for c in r.get_customers()}
+
+    def _append_route(self, list_name: str, route):
+        undo_log = active_undo_log()
+        if undo_log is not None: undo_log.append(('list_append', self, list_name))
+        getattr(self, list_name).append(route)
+
+    def _remove_route(self, list_name: str, route):
+        routes = getattr(self, list_name)
+        index = routes.index(route)
+        undo_log = active_undo_log()
+        if undo_log is not None: undo_log.append(('list_remove', self, list_name, index, route))
+        routes.pop(index)
+    def link_routes(self, fe_route: FERoute, se_route: SERoute): fe_route.add_serviced_se_route(se_route); se_route.add_serving_fe_route(fe_route)
+    def unlink_routes(self, fe_route: FERoute, se_route: SERoute): fe_route.remove_serviced_se_route(se_route); se_route.remove_serving_fe_route(fe_route)
+    def fingerprint(self) -> int:
+        """
+        Dấu vân tay 64-bit (kiểu Zobrist) của lời giải, dùng để phát hiện trạng thái
+        trùng lặp hoặc làm khóa cho cache. Hash của từng route được cập nhật tăng dần
+        khi chèn/xóa/link; ở đây chỉ gộp hash của các FE route (O(số FE route)).
+        """
+        fingerprint = 0
+        for fe_route in self.fe_routes: fingerprint ^= _mix_fe_hash(fe_route.zobrist_hash)
+        return fingerprint
+
+    def update_customer_map(self):
+        """Dựng lại các chỉ mục customer_to_se_route_map và satellite_to_se_routes từ danh sách SE route."""
+        undo_log = active_undo_log()
+        if undo_log is not None:
+            undo_log.append(('attrs', self, {'customer_to_se_route_map': self.customer_to_se_route_map,
+                                             'satellite_to_se_routes': self.satellite_to_se_routes}))
+        customer_map, satellite_map = {}, {}
+        for r in self.se_routes:
+            satellite_map.setdefault(r.satellite.id, []).append(r)
+            for cust_id in r.nodes_id[1:-1]: customer_map[cust_id] = r
+        self.customer_to_se_route_map, self.satellite_to_se_routes = customer_map, satellite_map
     
     def get_objective_cost(self) -> float:
         primary_cost = 0.0
@@ -1,6 +1,7 @@
 # --- START OF FILE problem_parser.py ---
 
 import pandas as pd
+import numpy as np
 import math
 from .. import config
 
@@ -108,6 +109,76 @@ class ProblemInstance:
     def get_travel_time(self, n1, n2):
         return self.get_distance(n1, n2) / self.vehicle_speed if self.vehicle_speed > 0 else float('inf')
 
+    def get_array_cache(self) -> dict:
+        """
+        Cache của các mảng NumPy dẫn xuất từ instance (ma trận, mảng thuộc tính nút...). Cache gắn
+        với node_objects hiện tại: bản sao nông có tập nút khác (bài toán con của một cụm) sẽ
+        có cache riêng thay vì dùng nhầm mảng của bài toán gốc.
+        """
+        cache = self.__dict__.get('_array_cache')
+        if cache is None or cache['node_objects'] is not self.node_objects:
+            cache = {'node_objects': self.node_objects}
+            self._array_cache = cache
+        return cache
+
+    def get_node_index(self) -> np.ndarray:
+        """
+        Chỉ số gọn của các nút: get_node_index()[node_id] là hàng/cột của nút trong các mảng
+        NumPy của instance (get_distance_array, get_node_arrays...), -1 nếu id không thuộc instance.
+        Bài toán con giữ node id toàn cục, nên các mảng được cấp phát theo số nút thực có
+        (len(node_objects)) chứ không theo node id lớn nhất.
+        """
+        cache = self.get_array_cache()
+        if 'node_index' not in cache:
+            index = np.full(max(self.node_objects) + 1 if self.node_objects else 0, -1, dtype=np.int64)
+            index[list(self.node_objects)] = np.arange(len(self.node_objects))
+            cache['node_index'] = index
+        return cache['node_index']
+
+    def get_distance_array(self) -> np.ndarray:
+        """Ma trận khoảng cách dạng NumPy, đánh chỉ số theo get_node_index(). Được tạo một lần rồi cache."""
+        cache = self.get_array_cache()
+        if 'distance' not in cache:
+            index = self.get_node_index()
+            matrix = np.full((len(self.node_objects), len(self.node_objects)), np.inf)
+            for n1, row in self.dist_matrix.items():
+                matrix[index[n1], index[list(row.keys())]] = list(row.values())
+            cache['distance'] = matrix
+        return cache['distance']
+
+    def get_travel_time_array(self) -> np.ndarray:
+        """Ma trận thời gian di chuyển (khoảng cách / vehicle_speed), cache như get_distance_array."""
+        cache = self.get_array_cache()
+        if 'travel_time' not in cache:
+            distance = self.get_distance_array()
+            cache['travel_time'] = distance / self.vehicle_speed if self.vehicle_speed > 0 else np.full_like(distance, np.inf)
+        return cache['travel_time']
+
+    def get_node_arrays(self):
+        """
+        Trả về các mảng NumPy thuộc tính của nút, đánh chỉ số theo get_node_index()
+        (demand, load_delta, ready_time, due_time, deadline). Được tạo một lần rồi cache.
+        load_delta là thay đổi tải trên xe SE khi phục vụ: -demand (giao), +demand (lấy).
+        """
+        cache = self.get_array_cache()
+        arrays = cache.get('node_arrays')
+        if arrays is None:
+            size, index = len(self.node_objects), self.get_node_index()
+            arrays = {
+                'demand': np.zeros(size), 'load_delta': np.zeros(size),
+                'ready_time': np.zeros(size), 'due_time': np.full(size, np.inf), 'deadline': np.full(size, np.inf),
+            }
+            for node in self.node_objects.values():
+                if not isinstance(node, Customer): continue
+                row = index[node.id]
+                arrays['demand'][row] = node.demand
+                arrays['load_delta'][row] = -node.demand if node.type == 'DeliveryCustomer' else node.demand
+                arrays['ready_time'][row] = node.ready_time
+                arrays['due_time'][row] = node.due_time
+                if isinstance(node, PickupCustomer): arrays['deadline'][row] = node.deadline
+            cache['node_arrays'] = arrays
+        return arrays
+
     def _precompute_neighbors(self):
         self.customer_neighbors = {}
         k = config.PRUNING_K_CUSTOMER_NEIGHBORS
@@ -1,34 +1,102 @@
 # --- START OF FILE transaction.py ---
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, Dict, List, Union
+import itertools
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
+
+from .. import config
 
 if TYPE_CHECKING:
     from .data_structures import SERoute, FERoute, Solution
+
+# Bộ đếm phiên bản dùng chung cho mọi route. Mỗi lần route bị thay đổi sẽ nhận
+# một số mới (không bao giờ lặp lại), nhờ đó memento có thể được tái sử dụng.
+_route_version_counter = itertools.count(1)
+
+def new_route_version() -> int:
+    return next(_route_version_counter)
+
+# Giao dịch ở chế độ undo log đang hoạt động (nếu có). Các phương thức thay đổi
+# của route/solution ghi thao tác nghịch đảo vào log của giao dịch này.
+_active_log_context: Optional["ChangeContext"] = None
+
+def active_log_context() -> Optional["ChangeContext"]:
+    return _active_log_context
+
+def active_undo_log() -> Optional[List[Tuple]]:
+    context = _active_log_context
+    return context.undo_log if context is not None else None
+
+
+# --- Các hàm hoàn tác cho từng loại bản ghi trong undo log ---
+def _touch(obj):
+    on_modify = getattr(obj, '_on_modify', None)
+    if on_modify is not None: on_modify()
+
+def _undo_attrs(entry):
+    _, obj, old_values = entry
+    _touch(obj); obj.__dict__.update(old_values)
+
+def _undo_se_insert(entry):
+    _, route, pos, old_totals = entry
+    _touch(route); route.nodes_id.pop(pos); route.__dict__.update(old_totals)
+
+def _undo_se_remove(entry):
+    _, route, pos, node_id, old_totals = entry
+    _touch(route); route.nodes_id.insert(pos, node_id); route.__dict__.update(old_totals)
+
+def _undo_set_add(entry):
+    _, obj, attr_name, item = entry
+    _touch(obj); getattr(obj, attr_name).discard(item)
+
+def _undo_set_discard(entry):
+    _, obj, attr_name, item = entry
+    _touch(obj); getattr(obj, attr_name).add(item)
+
+def _undo_list_append(entry):
+    _, obj, list_name = entry
+    getattr(obj, list_name).pop()
+
+def _undo_list_remove(entry):
+    _, obj, list_name, index, item = entry
+    getattr(obj, list_name).insert(index, item)
+
+_UNDO_HANDLERS = {
+    'attrs': _undo_attrs, 'se_insert': _undo_se_insert, 'se_remove': _undo_se_remove,
+    'set_add': _undo_set_add, 'set_discard': _undo_set_discard,
+    'list_append': _undo_list_append, 'list_remove': _undo_list_remove,
+}
+
+
 class RouteMemento:
     """
     Lưu trữ trạng thái có thể khôi phục của một đối tượng Route (cả SE và FE).
+    Ảnh chụp chỉ gồm tuple/frozenset bất biến nên có thể chia sẻ giữa nhiều
+    giao dịch; 'version' cho biết route chưa đổi kể từ lúc chụp hay chưa.
     """
     def __init__(self, route: Union["SERoute", "FERoute"]):
+        self.version = route._version
         # Kiểm tra xem có phải là SERoute không bằng cách tìm thuộc tính 'nodes_id'
         if hasattr(route, 'nodes_id'):
-            self.nodes_id = route.nodes_id.copy()
+            self.nodes_id = tuple(route.nodes_id)
             self.total_dist = route.total_dist
             self.total_travel_time = route.total_travel_time # <<< DÒNG MỚI >>>
             self.total_load_pickup = route.total_load_pickup
             self.total_load_delivery = route.total_load_delivery
-            self.service_start_times = route.service_start_times.copy()
-            self.waiting_times = route.waiting_times.copy()
-            self.forward_time_slacks = route.forward_time_slacks.copy()
-            self.serving_fe_routes = route.serving_fe_routes.copy()
+            self.service_start_times = tuple(route.service_start_times.items())
+            self.waiting_times = tuple(route.waiting_times.items())
+            self.forward_time_slacks = tuple(route.forward_time_slacks.items())
+            self.serving_fe_routes = frozenset(route.serving_fe_routes)
+            self.zobrist_hash = route.zobrist_hash
         # Kiểm tra xem có phải là FERoute không bằng cách tìm thuộc tính 'schedule'
         elif hasattr(route, 'schedule'):
-            self.serviced_se_routes = route.serviced_se_routes.copy()
-            self.schedule = route.schedule.copy()
+            self.serviced_se_routes = frozenset(route.serviced_se_routes)
+            self.schedule = tuple(route.schedule)
             self.total_dist = route.total_dist
             self.total_time = route.total_time # Đây là duration, giữ nguyên tên
             self.total_travel_time = route.total_travel_time # <<< DÒNG MỚI >>>
             self.route_deadline = route.route_deadline
+            self.zobrist_hash = route.zobrist_hash
         else:
             raise TypeError(f"Unsupported route type for Memento: {type(route)}")
 
@@ -37,15 +105,72 @@ class ChangeContext:
     """
     Quản lý một "giao dịch" các thay đổi trên một đối tượng Solution.
     Cho phép thực hiện rollback nếu nước đi bị từ chối.
+
+    Có hai chế độ (mặc định theo config.TRANSACTION_MODE):
+    - "MEMENTO": sao lưu theo kiểu copy-on-write. backup_route() chỉ đăng ký route,
+      ảnh chụp thật sự được tạo ở lần thay đổi đầu tiên của route trong giao dịch.
+      Thứ tự các route trong se_routes/fe_routes được chụp lại khi mở giao dịch, nên
+      rollback trả route bị xóa về đúng vị trí cũ (lượt chạy tái lập được).
+    - "UNDO_LOG": mọi thao tác cơ bản (chèn/xóa tại vị trí, link/unlink, thêm/xóa
+      route, tính lại lịch trình) được ghi lại cùng dữ liệu để đảo ngược; rollback
+      chỉ phát lại các thao tác nghịch đảo, tốn thời gian tỉ lệ với số thao tác.
+    Giao dịch kết thúc bằng commit() hoặc rollback(). Nên dùng trong khối with: nếu có
+    ngoại lệ trước khi giao dịch kết thúc, các thay đổi được hoàn tác và context không
+    còn là giao dịch undo log đang hoạt động của tiến trình.
+
+    Ở chế độ UNDO_LOG có thể lồng các savepoint để đánh giá thử một thay đổi:
+        sp = context.savepoint(); ...thay đổi...; context.rollback_to(sp); context.release(sp)
     """
-    def __init__(self, solution: "Solution"):
+    def __init__(self, solution: "Solution", mode: Optional[str] = None):
         self.solution = solution
+        self.mode = mode or config.TRANSACTION_MODE
+        if self.mode not in ("MEMENTO", "UNDO_LOG"):
+            raise ValueError(f"Unknown transaction mode: {self.mode}")
         self.affected_routes_mementos: Dict[Union["SERoute", "FERoute"], RouteMemento] = {}
+        self.watched_routes: Set[Union["SERoute", "FERoute"]] = set()
         self.newly_created_routes: List[Union["SERoute", "FERoute"]] = []
         self.removed_routes: List[Union["SERoute", "FERoute"]] = []
+        self.undo_log: List[Tuple] = []
+        # Mỗi savepoint lưu (độ dài undo log, số khách hàng chưa phục vụ) tại thời điểm tạo.
+        self._savepoints: List[Tuple[int, int]] = []
+        # Repair chỉ nối thêm vào unserved_customers, nên chỉ cần nhớ độ dài ban đầu.
+        self._unserved_count = len(solution.unserved_customers)
+        # MEMENTO: danh sách route ban đầu (chỉ là tham chiếu), dùng khi có route bị thêm/xóa
+        self._route_lists = (list(solution.se_routes), list(solution.fe_routes)) if self.mode == "MEMENTO" else None
+        self._previous_log_context: Optional["ChangeContext"] = None
+        self._finished = False
+        if self.mode == "UNDO_LOG":
+            global _active_log_context
+            self._previous_log_context, _active_log_context = _active_log_context, self
+
+    def _deactivate(self):
+        global _active_log_context
+        self._finished = True
+        if _active_log_context is self:
+            _active_log_context = self._previous_log_context
+
+    def __enter__(self) -> "ChangeContext":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if self._finished: return False
+        if exc_type is not None:
+            self.rollback()
+        else:
+            self._deactivate(); self._detach_watched_routes()
+        return False
 
     def backup_route(self, route: Union["SERoute", "FERoute"]):
-        """Sao lưu trạng thái của một route TRƯỚC KHI nó bị thay đổi."""
+        """Đăng ký một route TRƯỚC KHI nó bị thay đổi (sao lưu lười)."""
+        if self.mode == "UNDO_LOG":
+            return
+        if route in self.affected_routes_mementos or route in self.watched_routes:
+            return
+        self.watched_routes.add(route)
+        route._pending_context = self
+
+    def capture_route(self, route: Union["SERoute", "FERoute"]):
+        """Được route gọi ngay trước lần thay đổi đầu tiên của nó."""
         if route not in self.affected_routes_mementos:
             self.affected_routes_mementos[route] = route.backup()
 
@@ -57,21 +182,64 @@ class ChangeContext:
         """Theo dõi một route đã bị xóa trong giao dịch này."""
         self.removed_routes.append(route)
 
+    def _detach_watched_routes(self):
+        for route in self.watched_routes:
+            if route._pending_context is self:
+                route._pending_context = None
+        self.watched_routes.clear()
+
+    def savepoint(self) -> int:
+        """Tạo một savepoint lồng bên trong giao dịch và trả về mã của nó."""
+        if self.mode != "UNDO_LOG":
+            raise RuntimeError("Savepoints are only supported in UNDO_LOG mode")
+        self._savepoints.append((len(self.undo_log), len(self.solution.unserved_customers)))
+        return len(self._savepoints) - 1
+
+    def _check_savepoint(self, savepoint: int):
+        if not 0 <= savepoint < len(self._savepoints):
+            raise ValueError(f"Unknown or already released savepoint: {savepoint}")
+
+    def rollback_to(self, savepoint: int):
+        """Hoàn tác mọi thay đổi sau savepoint; savepoint vẫn còn hiệu lực."""
+        self._check_savepoint(savepoint)
+        log_length, unserved_count = self._savepoints[savepoint]
+        self._undo_until(log_length)
+        del self.solution.unserved_customers[unserved_count:]
+        del self._savepoints[savepoint + 1:]
+
+    def release(self, savepoint: int):
+        """Bỏ savepoint (và các savepoint lồng bên trong); các thay đổi được giữ lại."""
+        self._check_savepoint(savepoint)
+        del self._savepoints[savepoint:]
+
+    def _undo_until(self, log_length: int):
+        undo_log = self.undo_log
+        while len(undo_log) > log_length:
+            entry = undo_log.pop()
+            _UNDO_HANDLERS[entry[0]](entry)
+
+    def commit(self):
+        """Chấp nhận các thay đổi và giải phóng các route đang được theo dõi."""
+        self._deactivate()
+        self._detach_watched_routes()
+        self.affected_routes_mementos.clear()
+        self.undo_log.clear()
+        self._savepoints.clear()
+
     def rollback(self):
         """Hoàn tác tất cả các thay đổi đã được theo dõi trong context này."""
-        from .data_structures import SERoute, FERoute
-        
-        for route in self.removed_routes:
-            if isinstance(route, SERoute):
-                if route not in self.solution.se_routes: self.solution.se_routes.append(route)
-            elif isinstance(route, FERoute):
-                if route not in self.solution.fe_routes: self.solution.fe_routes.append(route)
-
-        for route in self.newly_created_routes:
-            if isinstance(route, SERoute):
-                if route in self.solution.se_routes: self.solution.se_routes.remove(route)
-            elif isinstance(route, FERoute):
-                if route in self.solution.fe_routes: self.solution.fe_routes.remove(route)
+        self._deactivate()
+        del self.solution.unserved_customers[self._unserved_count:]
+        if self.mode == "UNDO_LOG":
+            self._undo_until(0)
+            self._savepoints.clear()
+            return
+
+        self._detach_watched_routes()
+
+        if self.removed_routes or self.newly_created_routes:
+            # Khôi phục nguyên thứ tự route (không nối route bị xóa vào cuối danh sách)
+            self.solution.se_routes[:], self.solution.fe_routes[:] = self._route_lists
 
         for route, memento in self.affected_routes_mementos.items():
             route.restore(memento)
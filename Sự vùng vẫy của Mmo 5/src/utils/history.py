@@ -0,0 +1,133 @@
+# src/utils/history.py
+from __future__ import annotations
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import config
+from .progress import MoveType
+
+# Một hàng của lịch sử chạy ALNS (accepted_move_type là giá trị MoveType)
+RUN_HISTORY_DTYPE = np.dtype([
+    ('iteration', '<i4'), ('best_cost', '<f8'), ('current_cost', '<f8'), ('temperature', '<f8'),
+    ('accepted_move_type', 'u1'), ('q_removed', '<i4'), ('is_large_destroy', '?'),
+])
+
+
+def _grown(array: np.ndarray, min_rows: int) -> np.ndarray:
+    """Trả về bản sao của `array` với số hàng gấp đôi (ít nhất min_rows), giữ nguyên dữ liệu cũ."""
+    new_array = np.zeros((max(min_rows, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    new_array[:len(array)] = array
+    return new_array
+
+
+class RunHistory:
+    """
+    Lịch sử từng vòng lặp ALNS, lưu theo cột trong một mảng có cấu trúc được cấp phát trước
+    (RUN_HISTORY_DTYPE). Với decimation = k chỉ giữ các vòng lặp chia hết cho k và mọi vòng lặp
+    tìm được best mới; số lượng từng loại nước đi (move_counts) vẫn được đếm trên tất cả vòng lặp.
+    history['best_cost'] trả về cột tương ứng (view, không sao chép).
+    """
+    def __init__(self, capacity: Optional[int] = None, decimation: Optional[int] = None):
+        self.decimation = max(1, decimation if decimation is not None else config.HISTORY_DECIMATION)
+        rows = capacity // self.decimation + 1 if capacity else 1024
+        self._data = np.zeros(rows, dtype=RUN_HISTORY_DTYPE)
+        self._size = 0
+        self.move_counts = np.zeros(len(MoveType), dtype=np.int64)
+
+    def append(self, iteration: int, best_cost: float, current_cost: float, temperature: float,
+               move_type: MoveType, q_removed: int, is_large_destroy: bool):
+        self.move_counts[move_type] += 1
+        if iteration % self.decimation != 0 and move_type != MoveType.NEW_BEST: return
+        if self._size == len(self._data): self._data = _grown(self._data, self._size + 1)
+        self._data[self._size] = (iteration, best_cost, current_cost, temperature, move_type, q_removed, is_large_destroy)
+        self._size += 1
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.data[field]
+
+    def move_type_counts(self) -> dict:
+        """{nhãn loại nước đi: số lần} cho các loại đã xuất hiện."""
+        return {move.label: int(self.move_counts[move]) for move in MoveType if self.move_counts[move] > 0}
+
+    @classmethod
+    def from_arrays(cls, data: np.ndarray, move_counts: np.ndarray, decimation: int = 1) -> "RunHistory":
+        history = cls(capacity=len(data), decimation=decimation)
+        history._data[:len(data)] = data
+        history._size = len(data)
+        history.move_counts[:] = move_counts
+        return history
+
+
+class OperatorHistory:
+    """
+    Trọng số toán tử sau mỗi segment: ma trận (số segment x số toán tử) cho destroy và repair,
+    cột theo thứ tự destroy_names / repair_names.
+    """
+    def __init__(self, destroy_names: Sequence[str], repair_names: Sequence[str], capacity: Optional[int] = None):
+        self.destroy_names = list(destroy_names)
+        self.repair_names = list(repair_names)
+        rows = capacity // config.SEGMENT_LENGTH + 1 if capacity else 64
+        self._iterations = np.zeros(rows, dtype=np.int32)
+        self._destroy = np.zeros((rows, len(self.destroy_names)), dtype=np.float64)
+        self._repair = np.zeros((rows, len(self.repair_names)), dtype=np.float64)
+        self._size = 0
+
+    def append(self, iteration: int, destroy_weights: Sequence[float], repair_weights: Sequence[float]):
+        if self._size == len(self._iterations):
+            self._iterations = _grown(self._iterations, self._size + 1)
+            self._destroy = _grown(self._destroy, self._size + 1)
+            self._repair = _grown(self._repair, self._size + 1)
+        self._iterations[self._size] = iteration
+        self._destroy[self._size] = destroy_weights
+        self._repair[self._size] = repair_weights
+        self._size += 1
+
+    @property
+    def iterations(self) -> np.ndarray:
+        return self._iterations[:self._size]
+
+    @property
+    def destroy_weights(self) -> np.ndarray:
+        return self._destroy[:self._size]
+
+    @property
+    def repair_weights(self) -> np.ndarray:
+        return self._repair[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_arrays(cls, destroy_names: Sequence[str], repair_names: Sequence[str], iterations: np.ndarray,
+                    destroy_weights: np.ndarray, repair_weights: np.ndarray) -> "OperatorHistory":
+        history = cls(destroy_names, repair_names, capacity=None)
+        for row in zip(iterations, destroy_weights, repair_weights): history.append(*row)
+        return history
+
+
+def save_history(file_path: str, run_history: RunHistory, op_history: OperatorHistory):
+    """Lưu lịch sử ALNS vào một file .npz (nén) để phân tích hoặc vẽ lại sau này."""
+    np.savez_compressed(
+        file_path, run=run_history.data, move_counts=run_history.move_counts,
+        decimation=np.int32(run_history.decimation), weight_iterations=op_history.iterations,
+        destroy_weights=op_history.destroy_weights, repair_weights=op_history.repair_weights,
+        destroy_names=np.array(op_history.destroy_names, dtype=str), repair_names=np.array(op_history.repair_names, dtype=str),
+    )
+
+
+def load_history(file_path: str) -> Tuple[RunHistory, OperatorHistory]:
+    """Đọc lại file của save_history, trả về (run_history, op_history)."""
+    with np.load(file_path) as data:
+        run_history = RunHistory.from_arrays(data['run'], data['move_counts'], int(data['decimation']))
+        op_history = OperatorHistory.from_arrays(
+            data['destroy_names'].tolist(), data['repair_names'].tolist(),
+            data['weight_iterations'], data['destroy_weights'], data['repair_weights'])
+    return run_history, op_history
@@ -1,15 +1,195 @@
 # src/utils/logger.py
+import os
 import sys
+import time
+import queue
+import atexit
+import threading
+from enum import IntEnum
+from typing import Dict, Union
+
+from .. import config
+
+
+class LogLevel(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+
+def _resolve_level(level: Union[str, int]) -> int:
+    return LogLevel[level.upper()] if isinstance(level, str) else int(level)
+
+def log_enabled(level: Union[str, int]) -> bool:
+    """True nếu thông báo ở mức `level` sẽ được in (so với config.LOG_LEVEL)."""
+    return _resolve_level(level) >= _resolve_level(config.LOG_LEVEL)
+
+def log(message: str = "", level: Union[str, int] = LogLevel.INFO, **print_kwargs):
+    """print() có mức log: bỏ qua thông báo dưới config.LOG_LEVEL."""
+    if log_enabled(level): print(message, **print_kwargs)
+
+
+# ==============================================================================
+# GHI LOG BẤT ĐỒNG BỘ
+# ==============================================================================
+
+def _write_text(stream, text: str):
+    """stream.write(text); ký tự mà terminal không mã hóa được (vd. console cp1252) được thay bằng '?'."""
+    try:
+        stream.write(text)
+    except UnicodeEncodeError:
+        encoding = getattr(stream, 'encoding', None) or 'ascii'
+        stream.write(text.encode(encoding, errors='replace').decode(encoding))
+
+
+class _LogWriter:
+    """
+    Luồng nền ghi log ra terminal và một file. Thông điệp được đưa vào hàng đợi có giới hạn
+    (đầy thì người ghi phải chờ) và được ghi theo lô; file được đẩy xuống đĩa tối đa một lần
+    mỗi flush_interval giây. Mọi Logger cùng file dùng chung một writer nên thứ tự giữa
+    stdout và stderr được giữ nguyên. Lỗi khi ghi không làm dừng luồng; nếu luồng đã dừng,
+    put/flush/close ghi đồng bộ thay vì chờ mãi.
+    """
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, filename: str, max_queue: int, batch_size: int, flush_interval: float):
+        self.file = open(filename, 'a', encoding='utf-8')
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._error = None
+        self._start()
+
+    def _start(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._closed = False
+        self._last_flush = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, item) -> bool:
+        """Đưa item vào hàng đợi; False nếu luồng ghi đã dừng (người gọi phải tự ghi đồng bộ)."""
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=self._POLL_INTERVAL); return True
+            except queue.Full:
+                pass
+        return False
+
+    def _drain(self) -> list:
+        items = []
+        try:
+            while True: items.append(self._queue.get_nowait())
+        except queue.Empty:
+            return items
+
+    def put(self, stream, message: str):
+        if self._closed or not self._enqueue((stream, message)):
+            self._write_batch(self._drain() + [(stream, message)])
+
+    def flush(self):
+        """Chờ tới khi mọi thông điệp đã đưa vào được ghi và đẩy xuống đĩa."""
+        done = threading.Event()
+        if not self._closed and self._enqueue((None, done)):
+            while not done.wait(self._POLL_INTERVAL):
+                if not self._thread.is_alive(): break
+        if not done.is_set():
+            self._write_batch(self._drain())
+            self.file.flush()
+
+    def close(self):
+        if self._closed: return
+        if self._enqueue((None, None)): self._thread.join()
+        self._closed = True
+        self._write_batch(self._drain())
+        self.file.flush()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size: batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if self._write_batch(batch): return
+
+    def _write_batch(self, batch: list) -> bool:
+        """Ghi một lô thông điệp và báo hiệu các flush đang chờ; trả về True nếu lô có yêu cầu dừng."""
+        streams, chunks, events, stop = [], [], [], False
+        for stream, item in batch:
+            if stream is not None:
+                chunks.append(item)
+                if not streams or streams[-1][0] is not stream: streams.append((stream, []))
+                streams[-1][1].append(item)
+            elif item is None: stop = True
+            else: events.append(item)
+
+        try:
+            # Các đoạn liên tiếp cùng stream được gộp thành một lần ghi
+            for stream, parts in streams:
+                try: _write_text(stream, "".join(parts))
+                except Exception as error: self._report_error(error)
+            for stream in {id(s): s for s, _ in streams}.values():
+                try: stream.flush()
+                except Exception as error: self._report_error(error)
+            if chunks: self.file.write("".join(chunks))
+
+            now = time.perf_counter()
+            if events or stop or now - self._last_flush >= self.flush_interval:
+                self.file.flush(); self._last_flush = now
+        except Exception as error:
+            self._report_error(error)
+        finally:
+            for event in events: event.set()
+        return stop
+
+    def _report_error(self, error: Exception):
+        # Chỉ ghi lại lỗi đầu tiên (vào file log) để không lặp lại ở mỗi lô
+        if self._error is not None: return
+        self._error = error
+        try: self.file.write(f"[LogWriter] write failed: {error!r}\n")
+        except Exception: pass
+
+
+_writers: Dict[str, _LogWriter] = {}
+
+def _get_writer(filename: str) -> _LogWriter:
+    key = os.path.abspath(filename)
+    if key not in _writers:
+        _writers[key] = _LogWriter(filename, config.LOG_QUEUE_SIZE, config.LOG_BATCH_SIZE, config.LOG_FLUSH_INTERVAL)
+    return _writers[key]
+
+def close_all_loggers():
+    """Ghi nốt các thông điệp đang chờ và dừng các luồng ghi (tự gọi khi thoát chương trình)."""
+    for writer in _writers.values(): writer.close()
+
+def _restart_writers_after_fork():
+    # Tiến trình con (fork) không có luồng ghi của tiến trình cha: tạo lại hàng đợi và luồng.
+    # Các thông điệp đang chờ trong hàng đợi cũ do tiến trình cha ghi.
+    for writer in _writers.values():
+        if not writer._closed: writer._start()
+
+def _flush_writers_before_fork():
+    # Đảm bảo luồng ghi đang rảnh (không giữ khóa của file/terminal) tại thời điểm fork
+    for writer in _writers.values(): writer.flush()
+
+atexit.register(close_all_loggers)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_flush_writers_before_fork, after_in_child=_restart_writers_after_fork)
+
 
 class Logger(object):
+    """
+    Thay cho sys.stdout/sys.stderr: ghi mọi thông điệp ra `stream` và file `filename`
+    thông qua luồng ghi nền (write() chỉ đưa thông điệp vào hàng đợi).
+    """
     def __init__(self, filename="log.txt", stream=sys.stdout):
         self.terminal = stream
-        self.log = open(filename, 'a', encoding='utf-8')
+        self._writer = _get_writer(filename)
 
     def write(self, message):
-        self.terminal.write(message)
-        self.log.write(message)
+        if message: self._writer.put(self.terminal, message)
 
     def flush(self):
-        self.terminal.flush()
-        self.log.flush()
\ No newline at end of file
+        self._writer.flush()
@@ -7,8 +7,11 @@ import os
 
 from typing import TYPE_CHECKING, Dict, List
 
+from .progress import MoveType
+
 if TYPE_CHECKING:
     from ..core.data_structures import Solution, ProblemInstance
+    from .history import RunHistory, OperatorHistory
 
 # ==============================================================================
 # SECTION 1: VISUALIZATION OF THE SOLUTION ITSELF
@@ -93,7 +96,7 @@ def plot_solution_visualization(solution: "Solution", save_dir: str):
 # SECTION 2: PLOTTING OF ALGORITHM PERFORMANCE HISTORY
 # ==============================================================================
 
-def _plot_convergence(history: dict, save_dir: str):
+def _plot_convergence(history: "RunHistory", save_dir: str):
     """Vẽ biểu đồ hội tụ của chi phí và nhiệt độ."""
     fig, ax1 = plt.subplots(figsize=(15, 7))
     color = 'tab:blue'
@@ -116,10 +119,10 @@ def _plot_convergence(history: dict, save_dir: str):
     plt.title('Algorithm Convergence', fontsize=16)
     plt.savefig(os.path.join(save_dir, "1_convergence.png"), dpi=300)
 
-def _plot_acceptance_criteria(history: dict, save_dir: str):
+def _plot_acceptance_criteria(history: "RunHistory", save_dir: str):
     """Vẽ biểu đồ tròn phân phối các loại nước đi được chấp nhận."""
     plt.figure(figsize=(8, 8))
-    move_counts = pd.Series(history['accepted_move_type']).value_counts()
+    move_counts = pd.Series(history.move_type_counts(), dtype='int64').sort_values(ascending=False)
     colors = {'new_best': 'gold', 'better': 'limegreen', 'sa_accepted': 'coral', 'rejected': 'lightgrey'}
     
     if not move_counts.empty:
@@ -132,23 +135,21 @@ def _plot_acceptance_criteria(history: dict, save_dir: str):
         print("  - Skipping acceptance criteria plot (no data).")
 
 
-def _plot_operator_weights(operator_history: dict, save_dir: str):
+def _plot_operator_weights(operator_history: "OperatorHistory", save_dir: str):
     """Vẽ biểu đồ tiến hóa trọng số của các toán tử."""
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12), sharex=True)
     
     # Destroy operators
-    destroy_df = pd.DataFrame(operator_history['destroy_weights'])
-    for op_name in destroy_df.columns:
-        ax1.plot(operator_history['iteration'], destroy_df[op_name], label=op_name, marker='o', markersize=4, alpha=0.8)
+    for k, op_name in enumerate(operator_history.destroy_names):
+        ax1.plot(operator_history.iterations, operator_history.destroy_weights[:, k], label=op_name, marker='o', markersize=4, alpha=0.8)
     ax1.set_title('Destroy Operator Weights Evolution', fontsize=14)
     ax1.set_ylabel('Weight')
     ax1.legend()
     ax1.grid(True, linestyle=':', alpha=0.6)
     
     # Repair operators
-    repair_df = pd.DataFrame(operator_history['repair_weights'])
-    for op_name in repair_df.columns:
-        ax2.plot(operator_history['iteration'], repair_df[op_name], label=op_name, marker='o', markersize=4, alpha=0.8)
+    for k, op_name in enumerate(operator_history.repair_names):
+        ax2.plot(operator_history.iterations, operator_history.repair_weights[:, k], label=op_name, marker='o', markersize=4, alpha=0.8)
     ax2.set_title('Repair Operator Weights Evolution', fontsize=14)
     ax2.set_xlabel('Iteration')
     ax2.set_ylabel('Weight')
@@ -159,10 +160,11 @@ def _plot_operator_weights(operator_history: dict, save_dir: str):
     fig.suptitle('Operator Weight Evolution', fontsize=18)
     plt.savefig(os.path.join(save_dir, "3_operator_weights.png"), dpi=300)
 
-def _plot_destroy_impact(history: dict, save_dir: str):
+def _plot_destroy_impact(history: "RunHistory", save_dir: str):
     """Vẽ biểu đồ phân tích tác động của các lần phá hủy."""
     plt.figure(figsize=(15, 7))
-    df = pd.DataFrame(history)
+    df = pd.DataFrame(history.data)
+    df['accepted_move_type'] = [MoveType(value).label for value in df['accepted_move_type']]
     palette = {'new_best': 'gold', 'better': 'limegreen', 'sa_accepted': 'coral', 'rejected': 'lightgrey'}
     
     sns.scatterplot(
@@ -286,11 +288,12 @@ def plot_solution_visualization(solution: "Solution", save_dir: str):
     plt.close(fig) # Đóng figure để giải phóng bộ nhớ
     print(f"Solution visualization saved to {file_path}")
 
-def plot_alns_history(run_history: Dict, op_history: Dict, save_dir: str):
+def plot_alns_history(run_history: "RunHistory", op_history: "OperatorHistory", save_dir: str):
     """
-    Hàm chính để vẽ và lưu tất cả các biểu đồ phân tích về quá trình chạy ALNS.
+    Hàm chính để vẽ và lưu tất cả các biểu đồ phân tích về quá trình chạy ALNS
+    (nhận trực tiếp lịch sử từ run_alns_phase hoặc load_history).
     """
-    if run_history and run_history['iteration']:
+    if run_history is not None and len(run_history) > 0:
         print("  - Plotting convergence history...")
         _plot_convergence(run_history, save_dir=save_dir)
         
@@ -302,7 +305,7 @@ def plot_alns_history(run_history: Dict, op_history: Dict, save_dir: str):
     else:
         print("  - Skipping ALNS run history plots (no data).")
 
-    if op_history and op_history['iteration']:
+    if op_history is not None and len(op_history) > 0:
         print("  - Plotting operator weights evolution...")
         _plot_operator_weights(op_history, save_dir=save_dir)
     else:
@@ -0,0 +1,107 @@
+# src/utils/profiler.py
+import sys
+import time
+import functools
+import importlib
+from typing import Dict, List, Optional, Tuple
+
+# Các điểm nóng được đo: (module, lớp hoặc None nếu là hàm của module, tên thuộc tính)
+_HOT_PATHS: List[Tuple[str, Optional[str], str]] = [
+    ('..algorithm.lns.insertion_logic', None, 'find_k_best_global_insertion_options_combined'),
+    ('..algorithm.lns.insertion_logic', None, '_recalculate_fe_route_and_check_feasibility'),
+    ('..core.data_structures', 'SERoute', 'calculate_full_schedule_and_slacks'),
+    ('..core.data_structures', 'VRP2E_State', 'copy'),
+    ('..core.data_structures', 'Solution', 'update_customer_map'),
+    ('..core.transaction', 'ChangeContext', 'rollback'),
+]
+
+# Tên điểm đo -> [số lần gọi, tổng thời gian (giây)]
+_stats: Dict[str, List[float]] = {}
+# (đối tượng chứa, tên thuộc tính, hàm gốc) của các chỗ đã được thay bằng hàm đo
+_patched: List[Tuple[object, str, object]] = []
+
+
+def _timed(name: str, func):
+    stat = _stats.setdefault(name, [0, 0.0])
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stat[0] += 1
+            stat[1] += perf_counter() - start
+    return wrapper
+
+def is_profiling_enabled() -> bool:
+    return bool(_patched)
+
+def enable_profiling():
+    """
+    Bật đo đếm các điểm nóng bằng cách thay các hàm/phương thức trong _HOT_PATHS bằng
+    phiên bản có đếm số lần gọi và thời gian. Hàm của module được thay ở mọi module của
+    package đã import nó (kể cả `from ... import`). Khi không bật, mã chạy hoàn toàn
+    không có chi phí đo. Tiến trình con tạo bằng fork thừa hưởng trạng thái đã bật.
+    """
+    if _patched: return
+    package = __package__.rsplit('.', 1)[0]
+    for module_name, class_name, attr_name in _HOT_PATHS:
+        module = importlib.import_module(module_name, __package__)
+        if class_name is not None:
+            owner = getattr(module, class_name)
+            original = owner.__dict__[attr_name]
+            setattr(owner, attr_name, _timed(f"{class_name}.{attr_name}", original))
+            _patched.append((owner, attr_name, original))
+            continue
+        original = getattr(module, attr_name)
+        wrapper = _timed(attr_name, original)
+        for loaded in list(sys.modules.values()):
+            if loaded is None or not (loaded.__name__ == package or loaded.__name__.startswith(package + '.')): continue
+            if loaded.__dict__.get(attr_name) is original:
+                setattr(loaded, attr_name, wrapper)
+                _patched.append((loaded, attr_name, original))
+
+def disable_profiling():
+    """Khôi phục các hàm gốc (số liệu đã đo vẫn được giữ lại)."""
+    while _patched:
+        owner, attr_name, original = _patched.pop()
+        setattr(owner, attr_name, original)
+
+def reset_profiling():
+    for stat in _stats.values(): stat[0], stat[1] = 0, 0.0
+
+def get_profile_stats() -> Dict[str, Tuple[int, float]]:
+    """{điểm đo: (số lần gọi, tổng thời gian giây)} - gọn để trả về từ tiến trình con."""
+    return {name: (int(calls), total) for name, (calls, total) in _stats.items()}
+
+def merge_profile_stats(stats: Dict[str, Tuple[int, float]]):
+    """Cộng số liệu đo được ở tiến trình khác (get_profile_stats) vào số liệu của tiến trình này."""
+    for name, (calls, total) in stats.items():
+        stat = _stats.setdefault(name, [0, 0.0])
+        stat[0] += calls; stat[1] += total
+
+def profile_report(wall_time: Optional[float] = None, processes: int = 1) -> str:
+    """
+    Bảng số lần gọi, tổng thời gian, thời gian trung bình và tỷ lệ so với wall_time của lượt chạy.
+    Thời gian là bao gồm (inclusive): ví dụ rollback có thể chứa cả calculate_full_schedule_and_slacks.
+    Khi số liệu được gộp từ `processes` tiến trình song song, thời gian là tổng của các tiến trình
+    và tỷ lệ được tính so với processes * wall_time (nên không vượt quá 100%).
+    """
+    capacity = wall_time * max(1, processes) if wall_time else None
+    share_header = "% of run" if processes <= 1 else "% of CPU"
+    lines = [f"{'Hot path':<48}| {'Calls':>10}| {'Total (s)':>10}| {'Mean (us)':>10}| {share_header:>9}"]
+    for name, (calls, total) in sorted(_stats.items(), key=lambda item: -item[1][1]):
+        mean_us = total / calls * 1e6 if calls else 0.0
+        share = f"{100 * total / capacity:>8.1f}%" if capacity else f"{'-':>9}"
+        lines.append(f"{name:<48}| {int(calls):>10}| {total:>10.3f}| {mean_us:>10.1f}| {share}")
+    if wall_time: lines.append(f"Wall time of run: {wall_time:.2f}s (times are inclusive; nested hot paths overlap)")
+    if wall_time and processes > 1:
+        lines.append(f"Times are summed over {processes} worker processes; % is relative to {processes} x wall time")
+    return "\n".join(lines)
+
+def write_profile_report(file_path: str, wall_time: Optional[float] = None, processes: int = 1):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(profile_report(wall_time, processes) + "\n")
+    print(f"Hot-path profile saved to {file_path}")
@@ -0,0 +1,170 @@
+# src/utils/progress.py
+from __future__ import annotations
+import json
+import struct
+import sys
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import config
+from .logger import LogLevel, log_enabled
+
+
+class MoveType(IntEnum):
+    """Kết quả của một vòng lặp tìm kiếm (dùng chung cho sự kiện tiến trình và lịch sử)."""
+    REJECTED = 0
+    SA_ACCEPTED = 1
+    BETTER = 2
+    NEW_BEST = 3
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+class ProgressEvent:
+    """Sự kiện của một vòng lặp: chi phí, nhiệt độ, chỉ số toán tử (theo thứ tự trong start()) và loại nước đi."""
+    __slots__ = ('iteration', 'best_cost', 'current_cost', 'candidate_cost', 'temperature',
+                 'destroy_op', 'repair_op', 'move_type', 'q')
+
+    def __init__(self, iteration: int, best_cost: float, current_cost: float, candidate_cost: float,
+                 temperature: float, destroy_op: int, repair_op: int, move_type: MoveType, q: int):
+        self.iteration = iteration
+        self.best_cost = best_cost
+        self.current_cost = current_cost
+        self.candidate_cost = candidate_cost
+        self.temperature = temperature
+        self.destroy_op = destroy_op
+        self.repair_op = repair_op
+        self.move_type = move_type
+        self.q = q
+
+    def as_tuple(self) -> Tuple:
+        return (self.iteration, self.best_cost, self.current_cost, self.candidate_cost, self.temperature,
+                self.destroy_op, self.repair_op, int(self.move_type), self.q)
+
+
+# ==============================================================================
+# CÁC SINK NHẬN SỰ KIỆN
+# ==============================================================================
+
+class NullSink:
+    """
+    Sink không làm gì. Vòng lặp kiểm tra `enabled` trước khi tạo sự kiện,
+    nên khi tắt chi phí chỉ là một phép so sánh mỗi vòng lặp.
+    """
+    enabled = False
+
+    def start(self, phase: str, destroy_names: Sequence[str], repair_names: Sequence[str]): pass
+    def emit(self, event: ProgressEvent): pass
+    def close(self): pass
+
+
+class ConsoleSink(NullSink):
+    """
+    In tiến trình ra console, tối đa một dòng mỗi `min_interval` giây
+    (các sự kiện trong khoảng đó bị bỏ qua, chỉ được đếm).
+    """
+    enabled = True
+
+    def __init__(self, min_interval: float = 1.0, stream=None):
+        self.min_interval = min_interval
+        self.stream = stream
+        self._last_print = float('-inf')
+        self._skipped = 0
+        self.phase, self.destroy_names, self.repair_names = "", [], []
+
+    def start(self, phase: str, destroy_names: Sequence[str], repair_names: Sequence[str]):
+        self.phase, self.destroy_names, self.repair_names = phase, list(destroy_names), list(repair_names)
+        self._last_print, self._skipped = float('-inf'), 0
+
+    def emit(self, event: ProgressEvent):
+        now = time.perf_counter()
+        if now - self._last_print < self.min_interval:
+            self._skipped += 1
+            return
+        self._last_print = now
+        ops = "/".join(names[k] if 0 <= k < len(names) else "-" for names, k in
+                       ((self.destroy_names, event.destroy_op), (self.repair_names, event.repair_op)))
+        skipped = f" (+{self._skipped} events)" if self._skipped else ""
+        self._skipped = 0
+        print(f"  [{self.phase}] Iter {event.iteration:>5} | Best: {event.best_cost:<10.2f} | Current: {event.current_cost:<10.2f} | "
+              f"Temp: {event.temperature:<8.2f} | Ops: {ops} | {event.move_type.label}{skipped}", file=self.stream or sys.stdout)
+
+
+# Bản ghi nhị phân của một sự kiện (little-endian, không padding)
+PROGRESS_RECORD_DTYPE = np.dtype([
+    ('iteration', '<i4'), ('best_cost', '<f8'), ('current_cost', '<f8'), ('candidate_cost', '<f8'),
+    ('temperature', '<f8'), ('destroy_op', '<i2'), ('repair_op', '<i2'), ('move_type', 'u1'), ('q', '<i4'),
+])
+_CHUNK_HEADER = struct.Struct('<cI')
+
+
+class BinaryFileSink(NullSink):
+    """
+    Ghi sự kiện vào file nhị phân theo từng khối có đệm. File là chuỗi các khối:
+    b'H' + độ dài + JSON (phase, tên toán tử) khi bắt đầu một pha, và
+    b'R' + số bản ghi + các bản ghi PROGRESS_RECORD_DTYPE. Đọc lại bằng read_progress_file.
+    """
+    enabled = True
+
+    def __init__(self, file_path: str, buffer_size: int = 4096):
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self._file = open(file_path, 'wb')
+        self._buffer: List[Tuple] = []
+
+    def start(self, phase: str, destroy_names: Sequence[str], repair_names: Sequence[str]):
+        self._flush()
+        header = json.dumps({'phase': phase, 'destroy_ops': list(destroy_names), 'repair_ops': list(repair_names)}).encode('utf-8')
+        self._file.write(_CHUNK_HEADER.pack(b'H', len(header)) + header)
+
+    def emit(self, event: ProgressEvent):
+        self._buffer.append(event.as_tuple())
+        if len(self._buffer) >= self.buffer_size: self._flush()
+
+    def _flush(self):
+        if not self._buffer: return
+        records = np.array(self._buffer, dtype=PROGRESS_RECORD_DTYPE)
+        self._file.write(_CHUNK_HEADER.pack(b'R', len(records)) + records.tobytes())
+        self._buffer = []
+
+    def close(self):
+        if self._file.closed: return
+        self._flush()
+        self._file.close()
+
+
+def read_progress_file(file_path: str) -> List[Tuple[Dict, np.ndarray]]:
+    """Đọc file của BinaryFileSink, trả về danh sách (header, mảng bản ghi) cho từng pha."""
+    phases: List[Tuple[Dict, List[np.ndarray]]] = []
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        kind, length = _CHUNK_HEADER.unpack_from(data, offset)
+        offset += _CHUNK_HEADER.size
+        if kind == b'H':
+            phases.append((json.loads(data[offset:offset + length].decode('utf-8')), []))
+            offset += length
+        else:
+            size = length * PROGRESS_RECORD_DTYPE.itemsize
+            if not phases: phases.append(({}, []))
+            phases[-1][1].append(np.frombuffer(data, dtype=PROGRESS_RECORD_DTYPE, count=length, offset=offset))
+            offset += size
+    return [(header, np.concatenate(chunks) if chunks else np.zeros(0, dtype=PROGRESS_RECORD_DTYPE)) for header, chunks in phases]
+
+
+def create_progress_sink(kind: Optional[str] = None, file_path: Optional[str] = None) -> NullSink:
+    """
+    Tạo sink theo tên ("null", "console", "binary"); mặc định config.PROGRESS_SINK.
+    Sink "binary" cần file_path (nếu thiếu sẽ dùng sink console). Sink console là thông báo
+    mức DEBUG: khi config.LOG_LEVEL cao hơn, trả về NullSink.
+    """
+    kind = (kind or config.PROGRESS_SINK).lower()
+    if kind == "binary" and file_path: return BinaryFileSink(file_path)
+    if kind == "null" or not log_enabled(LogLevel.DEBUG): return NullSink()
+    return ConsoleSink(config.PROGRESS_CONSOLE_INTERVAL)
@@ -0,0 +1,42 @@
+# src/utils/rng.py
+from typing import Optional, Union
+
+import numpy as np
+
+from .. import config
+
+# Seed của một lượt chạy: số nguyên, SeedSequence (ví dụ luồng con của stream_seed) hoặc None = config.RANDOM_SEED
+SeedLike = Union[int, np.random.SeedSequence, None]
+
+
+def make_seed_sequence(seed: SeedLike = None) -> np.random.SeedSequence:
+    if isinstance(seed, np.random.SeedSequence): return seed
+    return np.random.SeedSequence(config.RANDOM_SEED if seed is None else seed)
+
+def make_rng(seed: SeedLike = None) -> np.random.Generator:
+    """Bộ sinh số ngẫu nhiên (numpy Generator, PCG64) riêng của một lượt chạy."""
+    return np.random.default_rng(make_seed_sequence(seed))
+
+def stream_seed(seed: SeedLike, stream_id: int) -> np.random.SeedSequence:
+    """
+    Luồng con thứ stream_id của seed, độc lập thống kê với các luồng con khác và với seed gốc.
+    Giống SeedSequence(seed).spawn(n)[stream_id] nhưng chỉ phụ thuộc vào (seed, stream_id):
+    worker/cụm k luôn nhận cùng một luồng dù số worker hay thứ tự chạy thay đổi.
+    """
+    root = make_seed_sequence(seed)
+    return np.random.SeedSequence(root.entropy, spawn_key=tuple(root.spawn_key) + (stream_id,), pool_size=root.pool_size)
+
+
+# Bộ sinh dùng chung của tiến trình, chỉ dành cho lời gọi không truyền rng (tạo từ config.RANDOM_SEED ở lần dùng đầu)
+_fallback_rng: Optional[np.random.Generator] = None
+
+def resolve_rng(rng: Optional[np.random.Generator] = None) -> np.random.Generator:
+    """
+    Trả về rng nếu được truyền vào, ngược lại là bộ sinh dùng chung của tiến trình. Các vòng lặp
+    ALNS/LNS luôn truyền rng của lượt chạy xuống toán tử; bộ sinh dùng chung chỉ để các lời gọi
+    trực tiếp (không truyền rng) vẫn chạy được và vẫn tái lập được trong một tiến trình.
+    """
+    if rng is not None: return rng
+    global _fallback_rng
+    if _fallback_rng is None: _fallback_rng = make_rng()
+    return _fallback_rng
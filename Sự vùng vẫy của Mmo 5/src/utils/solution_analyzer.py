@@ -1,26 +1,11 @@
 # src/utils/solution_analyzer.py
 from __future__ import annotations
-from typing import TYPE_CHECKING
-import sys
-# Thêm dòng này:
-from ..core.problem_parser import PickupCustomer 
+from typing import TYPE_CHECKING, Dict, List, Optional
+import numpy as np
 
 if TYPE_CHECKING:
     from ..core.data_structures import Solution
 
-class Logger(object):
-    def __init__(self, filename="log.txt", stream=sys.stdout):
-        self.terminal = stream
-        self.log = open(filename, 'a', encoding='utf-8')
-
-    def write(self, message):
-        self.terminal.write(message)
-        self.log.write(message)
-
-    def flush(self):
-        self.terminal.flush()
-        self.log.flush()
-
 # ==============================================================================
 # HÀM NỘI BỘ (PRIVATE)
 # ==============================================================================
@@ -133,45 +118,148 @@ def print_solution_details(solution: "Solution", execution_time: float):
             print(f"Servicing Satellites: {serviced_sats if serviced_sats else 'None'}")
             print(fe_route) # Lệnh này sẽ gọi hàm __repr__ của lớp FERoute
 
-def validate_solution_feasibility(solution: "Solution"):
-    print("\n\n" + "="*60 + "\n--- ENHANCED SOLUTION FEASIBILITY VALIDATION ---\n" + "="*60)
-    errors = []
+class ValidationReport:
+    """
+    Kết quả kiểm tra tính khả thi của lời giải, có cấu trúc.
+    Mỗi vi phạm là một dict gồm 'kind', 'route' (vd: 'SE#3', 'FE#0' hoặc None), 'node_id' và 'message'.
+    """
+    def __init__(self):
+        self.violations: List[Dict] = []
+
+    def add(self, kind: str, message: str, route: Optional[str] = None, node_id: Optional[int] = None):
+        self.violations.append({'kind': kind, 'route': route, 'node_id': node_id, 'message': message})
+
+    @property
+    def is_feasible(self) -> bool:
+        return not self.violations
+
+    def by_kind(self) -> Dict[str, List[Dict]]:
+        grouped: Dict[str, List[Dict]] = {}
+        for v in self.violations: grouped.setdefault(v['kind'], []).append(v)
+        return grouped
+
+    def by_route(self) -> Dict[Optional[str], List[Dict]]:
+        grouped: Dict[Optional[str], List[Dict]] = {}
+        for v in self.violations: grouped.setdefault(v['route'], []).append(v)
+        return grouped
+
+    def messages(self) -> List[str]:
+        return [v['message'] for v in self.violations]
+
+    def summary(self) -> str:
+        if self.is_feasible: return "feasible"
+        counts = ", ".join(f"{kind}={len(items)}" for kind, items in self.by_kind().items())
+        return f"{len(self.violations)} violation(s): {counts}"
+
+    def __repr__(self) -> str:
+        return f"ValidationReport({self.summary()})"
+
+def check_solution_feasibility(solution: "Solution", tol: float = 1e-6) -> ValidationReport:
+    """
+    Kiểm tra tính khả thi của lời giải trong một lượt duy nhất, không in gì ra.
+    Thu thập trình tự khách hàng của mọi SE route vào các mảng phẳng rồi kiểm tra
+    tải, time window và deadline bằng NumPy (dùng mảng thuộc tính nút của ProblemInstance).
+    """
+    report = ValidationReport()
     problem = solution.problem
-    
-    # ... (Copy toàn bộ code của hàm validate_solution_feasibility cũ vào đây) ...
-    # Phần này bạn đã có và nó đã đúng
-    all_served_ids = set(solution.customer_to_se_route_map.keys())
-    all_problem_ids = {c.id for c in problem.customers}
-    total_customers_in_routes = sum(len(r.get_customers()) for r in solution.se_routes)
-    if len(all_served_ids) != total_customers_in_routes: errors.append(f"MISMATCH: customer_map ({len(all_served_ids)}) vs. customers_in_routes ({total_customers_in_routes})")
-    if len(all_served_ids) + len(solution.unserved_customers) != len(all_problem_ids): errors.append(f"MISMATCH: Served ({len(all_served_ids)}) + Unserved ({len(solution.unserved_customers)}) != Total ({len(all_problem_ids)})")
-    for i, se_route in enumerate(solution.se_routes):
-        current_load = se_route.total_load_delivery
-        if current_load > problem.se_vehicle_capacity + 1e-6: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Initial delivery load ({current_load:.2f}) exceeds capacity ({problem.se_vehicle_capacity:.2f})")
-        for cust_id in se_route.nodes_id[1:-1]:
-            cust = problem.node_objects[cust_id]
-            if cust.type == 'DeliveryCustomer': current_load -= cust.demand
-            else: current_load += cust.demand
-            if current_load < -1e-6 or current_load > problem.se_vehicle_capacity + 1e-6: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Load violation at customer {cust.id}. Load: {current_load:.2f}, Capacity: {problem.se_vehicle_capacity:.2f}")
-        for cust in se_route.get_customers():
-            start_time = se_route.service_start_times.get(cust.id)
-            if start_time is None: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Customer {cust.id} is in route but has no start time."); continue
-            if start_time < cust.ready_time - 1e-6: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Customer {cust.id} served too early (Start: {start_time:.2f} < Ready: {cust.ready_time:.2f})")
-            if start_time > cust.due_time + 1e-6: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Customer {cust.id} served too late (Start: {start_time:.2f} > Due: {cust.due_time:.2f})")
-        if not se_route.serving_fe_routes: errors.append(f"SE Route #{i} (Sat {se_route.satellite.id}): Is not served by any FE route.")
+    arrays = problem.get_node_arrays()
+    se_cap, fe_cap = problem.se_vehicle_capacity, problem.fe_vehicle_capacity
+    se_routes = solution.se_routes
+
+    # --- 1. Gom dữ liệu của các SE route thành mảng phẳng ---
+    flat_ids: List[int] = []
+    flat_starts: List[float] = []
+    lengths = np.zeros(len(se_routes), dtype=np.int64)
+    initial_loads = np.zeros(len(se_routes))
+    se_index = {}
+    for i, se_route in enumerate(se_routes):
+        cust_ids = se_route.nodes_id[1:-1]
+        flat_ids.extend(cust_ids)
+        flat_starts.extend([se_route.service_start_times.get(c, np.nan) for c in cust_ids])
+        lengths[i] = len(cust_ids)
+        initial_loads[i] = se_route.total_load_delivery
+        se_index[se_route] = i
+    ids = np.asarray(flat_ids, dtype=np.int64)
+    rows = problem.get_node_index()[ids]
+    starts = np.asarray(flat_starts, dtype=float)
+    route_of = np.repeat(np.arange(len(se_routes)), lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(se_routes) else np.zeros(0, dtype=np.int64)
+    labels = [f"SE#{i}" for i in range(len(se_routes))]
+
+    # --- 2. Tính nhất quán giữa customer map, route và danh sách chưa phục vụ ---
+    n_served = len(solution.customer_to_se_route_map)
+    if n_served != len(ids):
+        report.add('customer_map_mismatch', f"MISMATCH: customer_map ({n_served}) vs. customers_in_routes ({len(ids)})")
+    if n_served + len(solution.unserved_customers) != len(problem.customers):
+        report.add('coverage_mismatch', f"MISMATCH: Served ({n_served}) + Unserved ({len(solution.unserved_customers)}) != Total ({len(problem.customers)})")
+    if len(ids):
+        unique_ids, counts = np.unique(ids, return_counts=True)
+        for cust_id in unique_ids[counts > 1].tolist():
+            report.add('duplicate_customer', f"Customer {cust_id} appears in more than one route position.", node_id=cust_id)
+
+    # --- 3. Tải trên SE route (tổng tích lũy theo từng đoạn route) ---
+    for i in np.flatnonzero(initial_loads > se_cap + tol).tolist():
+        report.add('se_capacity', f"SE Route #{i} (Sat {se_routes[i].satellite.id}): Initial delivery load ({initial_loads[i]:.2f}) exceeds capacity ({se_cap:.2f})", route=labels[i])
+    if len(ids):
+        cumulative = np.cumsum(arrays['load_delta'][rows])
+        before_route = np.concatenate(([0.0], cumulative))[offsets]
+        loads = initial_loads[route_of] + cumulative - np.repeat(before_route, lengths)
+        for k in np.flatnonzero((loads < -tol) | (loads > se_cap + tol)).tolist():
+            i = route_of[k]
+            report.add('se_load', f"SE Route #{i} (Sat {se_routes[i].satellite.id}): Load violation at customer {ids[k]}. Load: {loads[k]:.2f}, Capacity: {se_cap:.2f}", route=labels[i], node_id=int(ids[k]))
+
+        # --- 4. Time window của khách hàng ---
+        ready, due = arrays['ready_time'][rows], arrays['due_time'][rows]
+        missing = np.isnan(starts)
+        for k in np.flatnonzero(missing).tolist():
+            i = route_of[k]
+            report.add('missing_start_time', f"SE Route #{i} (Sat {se_routes[i].satellite.id}): Customer {ids[k]} is in route but has no start time.", route=labels[i], node_id=int(ids[k]))
+        with np.errstate(invalid='ignore'):
+            early = ~missing & (starts < ready - tol)
+            late = ~missing & (starts > due + tol)
+        for k in np.flatnonzero(early).tolist():
+            i = route_of[k]
+            report.add('time_window_early', f"SE Route #{i} (Sat {se_routes[i].satellite.id}): Customer {ids[k]} served too early (Start: {starts[k]:.2f} < Ready: {ready[k]:.2f})", route=labels[i], node_id=int(ids[k]))
+        for k in np.flatnonzero(late).tolist():
+            i = route_of[k]
+            report.add('time_window_late', f"SE Route #{i} (Sat {se_routes[i].satellite.id}): Customer {ids[k]} served too late (Start: {starts[k]:.2f} > Due: {due[k]:.2f})", route=labels[i], node_id=int(ids[k]))
+
+    for i, se_route in enumerate(se_routes):
+        if not se_route.serving_fe_routes:
+            report.add('se_unlinked', f"SE Route #{i} (Sat {se_route.satellite.id}): Is not served by any FE route.", route=labels[i])
+
+    # --- 5. FE route: tải, deadline hiệu lực và liên kết hai chiều ---
+    # Deadline nhỏ nhất của từng SE route (inf nếu route rỗng hoặc không có khách lấy hàng)
+    se_min_deadline = np.full(len(se_routes), np.inf)
+    non_empty = lengths > 0
+    if non_empty.any():
+        se_min_deadline[non_empty] = np.minimum.reduceat(arrays['deadline'][rows], offsets[non_empty])
     for i, fe_route in enumerate(solution.fe_routes):
-        if not fe_route.schedule and fe_route.serviced_se_routes: errors.append(f"FE Route #{i}: Has no schedule but services {len(fe_route.serviced_se_routes)} SE routes."); continue
-        if not fe_route.schedule: continue
+        label = f"FE#{i}"
+        if not fe_route.schedule:
+            if fe_route.serviced_se_routes:
+                report.add('fe_missing_schedule', f"FE Route #{i}: Has no schedule but services {len(fe_route.serviced_se_routes)} SE routes.", route=label)
+            continue
         for event in fe_route.schedule:
             load_after = event['load_after']
-            if load_after < -1e-6 or load_after > problem.fe_vehicle_capacity + 1e-6: errors.append(f"FE Route #{i}: Capacity violation. Load: {load_after:.2f}, Capacity: {problem.fe_vehicle_capacity:.2f} after activity '{event['activity']}' at node {event['node_id']}")
+            if load_after < -tol or load_after > fe_cap + tol:
+                report.add('fe_capacity', f"FE Route #{i}: Capacity violation. Load: {load_after:.2f}, Capacity: {fe_cap:.2f} after activity '{event['activity']}' at node {event['node_id']}", route=label, node_id=event['node_id'])
         arrival_at_depot = fe_route.schedule[-1]['arrival_time']
-        all_deadlines = {cust.deadline for se in fe_route.serviced_se_routes for cust in se.get_customers() if isinstance(cust, PickupCustomer)}
-        if all_deadlines and arrival_at_depot > min(all_deadlines) + 1e-6: errors.append(f"FE Route #{i}: Violates effective deadline (Arrival: {arrival_at_depot:.2f} > Deadline: {min(all_deadlines):.2f})")
+        deadline = min((se_min_deadline[se_index[se]] for se in fe_route.serviced_se_routes if se in se_index), default=np.inf)
+        if arrival_at_depot > deadline + tol:
+            report.add('fe_deadline', f"FE Route #{i}: Violates effective deadline (Arrival: {arrival_at_depot:.2f} > Deadline: {deadline:.2f})", route=label)
         for se_route in fe_route.serviced_se_routes:
-            if fe_route not in se_route.serving_fe_routes: errors.append(f"FE Route #{i}: Link inconsistency. It serves SE (Sat {se_route.satellite.id}), but the SE route does not link back.")
-    if not errors: print("\n[VALIDATION SUCCESS] Solution appears to be feasible and consistent.")
+            if fe_route not in se_route.serving_fe_routes:
+                report.add('link_inconsistency', f"FE Route #{i}: Link inconsistency. It serves SE (Sat {se_route.satellite.id}), but the SE route does not link back.", route=label)
+    return report
+
+def validate_solution_feasibility(solution: "Solution") -> ValidationReport:
+    """In báo cáo kiểm tra tính khả thi (dùng chung check_solution_feasibility) và trả về report."""
+    print("\n\n" + "="*60 + "\n--- ENHANCED SOLUTION FEASIBILITY VALIDATION ---\n" + "="*60)
+    report = check_solution_feasibility(solution)
+    if report.is_feasible: print("\n[VALIDATION SUCCESS] Solution appears to be feasible and consistent.")
     else:
         print("\n[VALIDATION FAILED] Found the following potential issues:")
-        for i, error in enumerate(errors): print(f"  {i+1}. {error}")
-    print("="*60)
\ No newline at end of file
+        for i, error in enumerate(report.messages()): print(f"  {i+1}. {error}")
+    print("="*60)
+    return report
@@ -7,6 +7,16 @@ from ..core.data_structures import Solution
 if TYPE_CHECKING:
     from ..core.problem_parser import ProblemInstance
 
+def merge_into(merged_solution: Solution, sub_solution: Solution) -> Solution:
+    """
+    Gộp một lời giải con vào lời giải tổng thể (dùng khi các cụm được giải xong lần lượt).
+    """
+    merged_solution.fe_routes.extend(sub_solution.fe_routes)
+    merged_solution.se_routes.extend(sub_solution.se_routes)
+    merged_solution.unserved_customers.extend(sub_solution.unserved_customers)
+    merged_solution.update_customer_map()
+    return merged_solution
+
 def merge_solutions(sub_solutions: List[Solution], original_problem: "ProblemInstance") -> Solution:
     """
     Hợp nhất một danh sách các lời giải con thành một lời giải tổng thể.
@@ -14,11 +24,7 @@ def merge_solutions(sub_solutions: List[Solution], original_problem: "ProblemIns
     merged_solution = Solution(original_problem)
     
     for sub_sol in sub_solutions:
-        merged_solution.fe_routes.extend(sub_sol.fe_routes)
-        merged_solution.se_routes.extend(sub_sol.se_routes)
-        merged_solution.unserved_customers.extend(sub_sol.unserved_customers)
-        
-    merged_solution.update_customer_map()
+        merge_into(merged_solution, sub_sol)
     
     print(f"\n--- Merged {len(sub_solutions)} sub-solutions into one final solution ---")
     return merged_solution
\ No newline at end of file
@@ -5,7 +5,6 @@ import os
 import sys
 import shutil
 import datetime
-import random
 import copy
 import math
 import pandas as pd
@@ -18,6 +17,7 @@ from src.core.data_structures import Solution
 from src.algorithm.solution_generator import generate_initial_solution
 from src.algorithm.lns_algorithm import run_alns_phase
 from src.utils.logger import Logger
+from src.utils.rng import make_rng
 from src.utils.solution_analyzer import print_solution_details, validate_solution_feasibility
 from src.utils.plotter import plot_solution_visualization, plot_customer_clusters # <--- IMPORT MỚI
 from src.utils.solution_merger import merge_solutions
@@ -98,7 +98,7 @@ def main():
     sys.stderr = Logger(log_file_path, sys.stderr)
     shutil.copy('src/config.py', os.path.join(run_dir, 'config_snapshot.py'))
     start_time = time.time()
-    random.seed(config.RANDOM_SEED)
+    rng = make_rng(config.RANDOM_SEED)
     print("="*70 + "\nRUNNING CLUSTERED SOLVER\n" + "="*70)
 
     # --- 2. GIAI ĐOẠN PHÂN CỤM ---
@@ -140,8 +140,8 @@ def main():
         # === NÂNG CẤP: XUẤT FILE CSV CHO BÀI TOÁN CON ===
         export_subproblem_to_csv(sub_problem, cluster_id, save_dir=run_dir)
         
-        initial_state = generate_initial_solution(sub_problem, lns_iterations=config.LNS_INITIAL_ITERATIONS, q_percentage=config.Q_PERCENTAGE_INITIAL)
-        best_state, (_, _) = run_alns_phase(initial_state=initial_state, iterations=config.ALNS_MAIN_ITERATIONS, destroy_operators=destroy_operators_map, repair_operators=repair_operators_map)
+        initial_state = generate_initial_solution(sub_problem, lns_iterations=config.LNS_INITIAL_ITERATIONS, q_percentage=config.Q_PERCENTAGE_INITIAL, rng=rng)
+        best_state, (_, _) = run_alns_phase(initial_state=initial_state, iterations=config.ALNS_MAIN_ITERATIONS, destroy_operators=destroy_operators_map, repair_operators=repair_operators_map, rng=rng)
         
         sub_solution = best_state.solution
         